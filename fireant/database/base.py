@@ -23,6 +23,19 @@ class Database(object):
 
     slow_query_log_min_seconds = 15
 
+    # The number of seconds that the values of a dimension pivoted in the database query are cached for
+    pivot_values_cache_seconds = 300
+
+    # Whether the database platform supports analytic (window) functions such as SUM() OVER (...)
+    supports_window_functions = True
+
+    # Whether the database platform supports a subquery with a LIMIT in an IN condition, such as
+    # "a" IN (SELECT ... LIMIT 10)
+    supports_limit_in_subquery = True
+
+    # Whether the database platform supports comparing row values, such as ("a","b") IN (...) or ("a","b")<(1,2)
+    supports_row_value_comparisons = True
+
     def __init__(
         self,
         host=None,
@@ -30,12 +43,48 @@ class Database(object):
         database=None,
         max_result_set_size=200000,
         middlewares=[],
+        pushdown_operations=False,
+        pushdown_pagination=False,
+        pushdown_pivot=False,
+        categorical_dimensions=False,
+        downcast_metrics=False,
     ):
+        """
+        :param max_result_set_size:
+            The maximum number of rows fetched for a single query.
+        :param middlewares:
+            A list of middlewares applied when executing queries.
+        :param pushdown_operations:
+            When True, operations that can be expressed with window functions are computed in the database query
+            instead of in pandas after fetching the data. This has no effect if the database platform does not support
+            window functions.
+        :param pushdown_pagination:
+            When True, pagination is applied in the database query instead of in pandas after fetching the data. For
+            widgets that paginate by series, the query is filtered to the page of series selected in a subquery.
+        :param pushdown_pivot:
+            When True, a dimension pivoted by every widget is pivoted in the database query with a conditional
+            aggregate of each metric for each of its values, instead of unstacking the result data frame in pandas.
+            This only applies when the values of the dimension fit in the columns of every widget.
+        :param categorical_dimensions:
+            When True, the values of text dimensions are converted to categoricals when the result set is fetched, so
+            that the index of the result data frame is built, joined and sorted from integer codes instead of strings.
+        :param downcast_metrics:
+            When True, the metrics of the result sets are downcast when they are fetched. Integers are converted to the
+            smallest integer type that holds their values, and floats to float32 for metrics with a precision when
+            their values are exact to that precision as float32. Operations that need the full range and precision of
+            the values upcast them, and the float metrics are converted back to float64 before they are transformed
+            into the widgets.
+        """
         self.host = host
         self.port = port
         self.database = database
         self.max_result_set_size = max_result_set_size
         self.middlewares = middlewares + [connection_middleware]
+        self.pushdown_operations = pushdown_operations
+        self.pushdown_pagination = pushdown_pagination
+        self.pushdown_pivot = pushdown_pivot
+        self.categorical_dimensions = categorical_dimensions
+        self.downcast_metrics = downcast_metrics
 
     def connect(self):
         """
@@ -103,3 +152,52 @@ class Database(object):
 
     def fetch_dataframe(self, query, **kwargs):
         return self.fetch_dataframes(query, **kwargs)[0]
+
+    def server_side_cursor(self, connection):
+        """
+        Returns a cursor for fetching a result set in batches of rows. Database platforms with drivers that load the
+        whole result set when a query is executed return a server-side cursor instead, so that rows are only sent when
+        they are fetched.
+        """
+        return connection.cursor()
+
+    def fetch_dataframe_batches(self, query, batch_size, connection=None):
+        """
+        Fetches the result set of a query in batches of rows with a server-side cursor, so that only one batch is held
+        in memory at a time. The connection is kept open until every batch has been fetched. Middlewares are not
+        applied, since they handle the whole result sets of queries.
+
+        :param query:
+            The query to execute.
+        :param batch_size:
+            The maximum number of rows in each batch.
+        :param connection:
+            (Optional) The connection to execute this query with.
+        :return:
+            A generator of data frames. There is always at least one data frame, which has no rows when the result set
+            is empty.
+        """
+        if connection is None:
+            with self.connect() as connection:
+                yield from self.fetch_dataframe_batches(
+                    query, batch_size, connection=connection
+                )
+            return
+
+        cursor = self.server_side_cursor(connection)
+        try:
+            cursor.execute(str(query))
+            rows = list(cursor.fetchmany(batch_size))
+            # The columns of a server-side cursor are only described once rows have been fetched
+            columns = [column[0] for column in cursor.description]
+
+            while True:
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                if len(rows) < batch_size:
+                    break
+
+                rows = list(cursor.fetchmany(batch_size))
+                if not rows:
+                    break
+        finally:
+            cursor.close()
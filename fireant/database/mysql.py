@@ -58,6 +58,12 @@ class MySQLDatabase(Database):
     # The pypika query class to use for constructing queries
     query_cls = MySQLQuery
 
+    # Window functions are only available as of MySQL 8.0
+    supports_window_functions = False
+
+    # MySQL rejects a LIMIT in a subquery of an IN condition
+    supports_limit_in_subquery = False
+
     def __init__(self, host='localhost', port=3306, database=None,
                  user=None, password=None, charset='utf8mb4', **kwags):
         super(MySQLDatabase, self).__init__(host, port, database, **kwags)
@@ -102,6 +108,11 @@ class MySQLDatabase(Database):
                                 user=self.user, password=self.password,
                                 charset=self.charset, cursorclass=pymysql.cursors.Cursor)
 
+    def server_side_cursor(self, connection):
+        # Unbuffered cursors read the rows from the server as they are fetched
+        import pymysql
+        return connection.cursor(pymysql.cursors.SSCursor)
+
     def trunc_date(self, field, interval):
         return Trunc(field, str(interval))
 
@@ -1,3 +1,5 @@
+import uuid
+
 from pypika import (
     PostgreSQLQuery,
     Table,
@@ -53,6 +55,10 @@ class PostgreSQLDatabase(Database):
             password=self.password,
         )
 
+    def server_side_cursor(self, connection):
+        # A named cursor is declared on the server, which keeps the result set until the rows are fetched
+        return connection.cursor(name="fireant_{}".format(uuid.uuid4().hex))
+
     def trunc_date(self, field, interval):
         return DateTrunc(field, str(interval))
 
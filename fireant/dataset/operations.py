@@ -6,18 +6,33 @@ from fireant.dataset.totals import get_totals_marker_for_dtype
 from fireant.utils import (
     alias_selector,
     reduce_data_frame_levels,
+    upcast_numeric,
 )
 from .fields import (
     DataType,
     Field,
 )
-from ..reference_helpers import reference_alias
+from ..reference_helpers import (
+    reference_alias,
+    reference_type_alias,
+)
 
 
 def _extract_key_or_arg(data_frame, key):
     return data_frame[key] if key in data_frame else key
 
 
+def _is_grouped(values):
+    return isinstance(values.index, pd.MultiIndex) and not values.empty
+
+
+def _divide_rows(values, divisors):
+    # Divides each row of a series or a data frame by the divisor at the same position
+    if isinstance(values, pd.DataFrame):
+        return values.div(divisors, axis=0)
+    return values / divisors
+
+
 class Operation:
     """
     The `Operation` class represents an operation in the `DataSet` API.
@@ -58,7 +73,17 @@ class _BaseOperation(Operation):
 
     @property
     def metrics(self):
-        return [metric for metric in self.args if isinstance(metric, Field)]
+        return [
+            metric
+            for arg in self.args
+            for metric in (
+                [arg]
+                if isinstance(arg, Field)
+                else arg.metrics
+                if isinstance(arg, Operation)
+                else []
+            )
+        ]
 
     @property
     def operations(self):
@@ -69,6 +94,20 @@ class _BaseOperation(Operation):
             for op_and_children in [operation] + operation.operations
         ]
 
+    def apply_references(self, data_frame, references):
+        """
+        Applies this operation once for each of a list of references. Operations which can compute the results for
+        several references in a single pass over the data frame override this.
+
+        :param data_frame:
+            The data frame containing the values of the operation's arguments.
+        :param references:
+            A list of references, where `None` stands for the base values.
+        :return:
+            A list of series, one for each reference.
+        """
+        return [self.apply(data_frame, reference) for reference in references]
+
     def _group_levels(self, index):
         """
         Get the index levels that need to be grouped. This is to avoid apply the cumulative function across separate
@@ -103,40 +142,98 @@ class _Cumulative(_BaseOperation):
         return self.apply_cumulative(data_frame, reference)
 
     def apply_cumulative(self, data_frame, reference):
+        (arg,) = self.args
+        df_key = alias_selector(reference_alias(arg, reference))
+
+        return self.accumulate(upcast_numeric(data_frame[df_key], arg.precision))
+
+    def apply_references(self, data_frame, references):
+        (arg,) = self.args
+        results = {}
+
+        # Accumulate the values for all references at once, so the data frame is only grouped a single time.
+        accumulated_references = [
+            reference
+            for reference in references
+            if not (reference and reference.delta_percent)
+        ]
+        if accumulated_references:
+            df_keys = [
+                alias_selector(reference_alias(arg, reference))
+                for reference in accumulated_references
+            ]
+            accumulated = self.accumulate(
+                upcast_numeric(data_frame[df_keys], arg.precision)
+            )
+            for i, reference in enumerate(accumulated_references):
+                results[reference_alias(self, reference)] = accumulated.iloc[:, i]
+
+        # Delta percent references are calculated from the base result, which is not in the data frame yet if it is
+        # computed in this call.
+        base_values_after_operation = results.get(reference_alias(self, None))
+        for reference in references:
+            if reference and reference.delta_percent:
+                results[reference_alias(self, reference)] = self.apply_cumulative_for_delta_percent(
+                    data_frame, reference, base_values_after_operation
+                )
+
+        return [results[reference_alias(self, reference)] for reference in references]
+
+    def accumulate(self, values):
+        """
+        Applies the cumulative function to a series or to each column of a data frame. When the values have multiple
+        index levels, they are accumulated within each group of the index levels after the first. Downcast metrics are
+        upcast before they are passed to this, since the accumulated values can outgrow their range and precision.
+
+        :param values:
+            A series or data frame with the values to accumulate.
+        :return:
+            The accumulated values, of the same shape as the input.
+        """
         raise NotImplementedError()
 
-    def apply_cumulative_for_delta_percent(self, data_frame, reference):
+    def apply_cumulative_for_delta_percent(self, data_frame, reference, base_values_after_operation=None):
         """
         When a delta percent reference is combined with a cumulative operation, the delta percent values need to be
         calculated based on the result of performing the operation on both the base values as well as
         the reference values. The correct result can not be obtained by simply applying the operation to the delta
         percent values.
 
-        This function could be simplified if the passed in data_frame also contained the original reference values
-        instead of only the delta percent values. Currently this function recalculates those original values using the
-        delta percent values.
+        The original reference values are used if they are in the data frame. Otherwise they are recalculated using the
+        delta percent values. The result of the operation on the base values is read from the data frame unless it is
+        given.
         """
         operation_metric = self.args[0]
 
-        # get the base values on which this reference is based on
-        base_df_key = alias_selector(operation_metric.alias)
-        base_values = data_frame[base_df_key]
-
-        # get references delta percent values
-        reference_df_key = alias_selector(reference_alias(operation_metric, reference))
-        reference_delta_percent_values = data_frame[reference_df_key] / 100
-
-        # overwrite the percentage values with the original values (by recalculating them using the delta_percent value)
-        data_frame[reference_df_key] = base_values / (
-            reference_delta_percent_values + 1
+        reference_values_key = alias_selector(
+            reference_type_alias(operation_metric, reference)
+        )
+        if reference_values_key in data_frame:
+            reference_values = data_frame[reference_values_key]
+
+        else:
+            # get the base values on which this reference is based on
+            base_df_key = alias_selector(operation_metric.alias)
+            base_values = data_frame[base_df_key]
+
+            # get references delta percent values
+            reference_df_key = alias_selector(
+                reference_alias(operation_metric, reference)
+            )
+            reference_delta_percent_values = data_frame[reference_df_key] / 100
+
+            # restore the original values by recalculating them using the delta_percent value
+            reference_values = base_values / (reference_delta_percent_values + 1)
+
+        # now apply the operation on the original reference values
+        reference_values_after_operation = self.accumulate(
+            upcast_numeric(reference_values, operation_metric.precision)
         )
-
-        # now apply the operation on the restored original reference values
-        reference_values_after_operation = self.apply_cumulative(data_frame, reference)
 
         # get the base values on which the operation is already performed
-        base_values_after_operation_key = alias_selector(self.alias)
-        base_values_after_operation = data_frame[base_values_after_operation_key]
+        if base_values_after_operation is None:
+            base_values_after_operation_key = alias_selector(self.alias)
+            base_values_after_operation = data_frame[base_values_after_operation_key]
 
         # recalculate the delta using the values on which the operation is already performed
         ref_delta_df = base_values_after_operation.subtract(
@@ -147,46 +244,40 @@ class _Cumulative(_BaseOperation):
 
 
 class CumSum(_Cumulative):
-    def apply_cumulative(self, data_frame, reference):
-        (arg,) = self.args
-        df_key = alias_selector(reference_alias(arg, reference))
+    def accumulate(self, values):
+        if _is_grouped(values):
+            levels = self._group_levels(values.index)
 
-        if isinstance(data_frame.index, pd.MultiIndex) and not data_frame.empty:
-            levels = self._group_levels(data_frame.index)
+            return values.groupby(level=levels).cumsum()
 
-            return data_frame[df_key].groupby(level=levels).cumsum()
-
-        return data_frame[df_key].cumsum()
+        return values.cumsum()
 
 
 class CumProd(_Cumulative):
-    def apply_cumulative(self, data_frame, reference):
-        (arg,) = self.args
-        df_key = alias_selector(reference_alias(arg, reference))
-
-        if isinstance(data_frame.index, pd.MultiIndex) and not data_frame.empty:
-            levels = self._group_levels(data_frame.index)
+    def accumulate(self, values):
+        if _is_grouped(values):
+            levels = self._group_levels(values.index)
 
-            return data_frame[df_key].groupby(level=levels).cumprod()
+            return values.groupby(level=levels).cumprod()
 
-        return data_frame[df_key].cumprod()
+        return values.cumprod()
 
 
 class CumMean(_Cumulative):
     @staticmethod
     def cummean(x):
-        return x.cumsum() / np.arange(1, len(x) + 1)
+        return _divide_rows(x.cumsum(), np.arange(1, len(x) + 1))
 
-    def apply_cumulative(self, data_frame, reference):
-        arg = self.args[0]
-        df_key = alias_selector(reference_alias(arg, reference))
+    def accumulate(self, values):
+        if _is_grouped(values):
+            levels = self._group_levels(values.index)
 
-        if isinstance(data_frame.index, pd.MultiIndex) and not data_frame.empty:
-            levels = self._group_levels(data_frame.index)
+            # Use grouped cumulative primitives instead of applying `cummean` per group, so the cost grows with the
+            # number of rows rather than the number of groups.
+            groups = values.groupby(level=levels)
+            return _divide_rows(groups.cumsum(), groups.cumcount().values + 1)
 
-            return data_frame[df_key].groupby(level=levels).apply(self.cummean)
-
-        return self.cummean(data_frame[df_key])
+        return self.cummean(values)
 
 
 class RollingOperation(_BaseOperation):
@@ -224,16 +315,52 @@ class RollingMean(RollingOperation):
     def rolling_mean(self, x):
         return x.rolling(self.window, self.min_periods).mean()
 
+    def grouped_rolling_mean(self, x, levels):
+        """
+        Computes the rolling mean within each group of index levels with a single grouped rolling window, instead of
+        applying `rolling_mean` to each group.
+
+        :param x:
+            The series or data frame to compute the rolling mean for. The rolling mean of a data frame is computed for
+            each of its columns.
+        :param levels:
+            The index levels to group the values by.
+        :return:
+            A series or data frame aligned with `x` containing the rolling mean values.
+        """
+        mean = x.groupby(level=levels).rolling(self.window, self.min_periods).mean()
+
+        # The group keys are prepended to the index of the result, and groups with a null key are left out
+        mean.index = mean.index.droplevel(list(range(len(levels))))
+        return mean.reindex(x.index)
+
+    def rolling_mean_for_values(self, values):
+        if isinstance(values.index, pd.MultiIndex):
+            levels = self._group_levels(values.index)
+
+            return self.grouped_rolling_mean(values, levels)
+
+        return self.rolling_mean(values)
+
     def apply(self, data_frame, reference):
         (arg,) = self.args
         df_alias = alias_selector(reference_alias(arg, reference))
 
-        if isinstance(data_frame.index, pd.MultiIndex):
-            levels = self._group_levels(data_frame.index)
+        return self.rolling_mean_for_values(
+            upcast_numeric(data_frame[df_alias], arg.precision)
+        )
 
-            return data_frame[df_alias].groupby(level=levels).apply(self.rolling_mean)
+    def apply_references(self, data_frame, references):
+        # Compute the rolling means for all references at once, so the data frame is only grouped a single time.
+        (arg,) = self.args
+        df_aliases = [
+            alias_selector(reference_alias(arg, reference)) for reference in references
+        ]
+        rolling_means = self.rolling_mean_for_values(
+            upcast_numeric(data_frame[df_aliases], arg.precision)
+        )
 
-        return self.rolling_mean(data_frame[df_alias])
+        return [rolling_means.iloc[:, i] for i in range(len(df_aliases))]
 
 
 class Share(_BaseOperation):
@@ -265,17 +392,17 @@ class Share(_BaseOperation):
     def apply(self, data_frame, reference):
         metric, over = self.args
         f_metric_alias = alias_selector(reference_alias(metric, reference))
+        metric_values = upcast_numeric(data_frame[f_metric_alias], metric.precision)
 
         if over is None:
-            df = data_frame[f_metric_alias]
-            return 100 * df / df
+            return 100 * metric_values / metric_values
 
         if not isinstance(data_frame.index, pd.MultiIndex):
             marker = get_totals_marker_for_dtype(data_frame.index.dtype)
-            totals = data_frame.loc[marker, f_metric_alias]
+            totals = metric_values.loc[marker]
             if totals == 0:
                 return np.nan
-            return 100 * data_frame[f_metric_alias] / totals
+            return 100 * metric_values / totals
 
         f_over_alias = alias_selector(over.alias)
         idx = data_frame.index.names.index(f_over_alias)
@@ -283,9 +410,7 @@ class Share(_BaseOperation):
         over_dim_value = get_totals_marker_for_dtype(data_frame.index.levels[idx].dtype)
         totals_alias = (slice(None),) * idx + (slice(over_dim_value, over_dim_value),)
 
-        totals = reduce_data_frame_levels(
-            data_frame.loc[totals_alias, f_metric_alias], group_levels
-        )
+        totals = reduce_data_frame_levels(metric_values.loc[totals_alias], group_levels)
 
         def apply_totals(group_df):
             if not isinstance(totals, pd.Series):
@@ -298,9 +423,51 @@ class Share(_BaseOperation):
             return pd.Series(share.values, index=group_df.index)
 
         return (
-            data_frame[f_metric_alias]
-            .groupby(level=group_levels)
+            metric_values.groupby(level=group_levels)
             .apply(apply_totals)
             .reorder_levels(order=data_frame.index.names)
             .sort_index()
         )
+
+
+def apply_operations(data_frame, operations, references):
+    """
+    Evaluates operations and adds a column to the data frame for each operation and reference.
+
+    The operations are expected in evaluation order, as returned by `find_operations_for_widgets`. Each operation is
+    evaluated for the base values and the values of each selected reference in a single call, so operations which
+    group the data frame only group it once. For delta and delta percent references, the operation is evaluated on the
+    delta values, the same as when it is evaluated for each reference on its own. Operations which were already
+    computed in the database query are skipped.
+
+    :param data_frame:
+        The data frame returned by `fetch_data`.
+    :param operations:
+        A list of operations in evaluation order.
+    :param references:
+        A list of references selected in the query.
+    :return:
+        The data frame with the operation columns added.
+    """
+    for operation in operations:
+        missing_references = [
+            reference
+            for reference in [None] + list(references)
+            if alias_selector(reference_alias(operation, reference)) not in data_frame
+        ]
+        if not missing_references:
+            continue
+
+        if isinstance(operation, _BaseOperation):
+            results = operation.apply_references(data_frame, missing_references)
+        else:
+            # Operations only implementing `apply` are evaluated once for each reference
+            results = [
+                operation.apply(data_frame, reference)
+                for reference in missing_references
+            ]
+
+        for reference, result in zip(missing_references, results):
+            data_frame[alias_selector(reference_alias(operation, reference))] = result
+
+    return data_frame
@@ -1,6 +1,9 @@
 import numpy as np
 from fireant import utils
-from fireant.utils import immutable
+from fireant.utils import (
+    immutable,
+    upcast_numeric,
+)
 from pypika import functions as fn
 from pypika.queries import QueryBuilder
 
@@ -112,5 +115,8 @@ def reference_term(
 
 
 def calculate_delta_percent(ref_df, ref_delta_df):
-    # pandas raises an exception when dividing by zero
-    return 100.0 * ref_delta_df.divide(ref_df.replace(0, np.nan))
+    # pandas raises an exception when dividing by zero. Downcast metrics are upcast, since the ratio of two values is
+    # not exact to their precision.
+    return 100.0 * upcast_numeric(ref_delta_df).divide(
+        upcast_numeric(ref_df).replace(0, np.nan)
+    )
@@ -64,34 +64,30 @@ def _scrub_totals_for_multilevel_index_df(data_frame, dimensions):
     if data_frame.empty:
         return data_frame
 
-    # Get the totals marker value for each index level
-    markers = [get_totals_marker_for_dtype(level.dtype)
-               for level in data_frame.index.levels]
-
-    # Create a boolean data frame indicating whether or not the index value equals the totals marker for the dtype
-    # corresponding to each index level
-    is_total_marker = pd.DataFrame([[value == marker
-                                     for value, marker in zip(values, markers)]
-                                    for values in data_frame.index],
-                                   index=data_frame.index)
+    # Create a boolean array indicating whether or not the index value equals the totals marker for the dtype
+    # corresponding to each index level. The codes of the index levels are compared with the code of the marker, so the
+    # values of the rows do not need to be compared one by one.
+    index = data_frame.index
+    marker_codes = [level.get_indexer([get_totals_marker_for_dtype(level.dtype)])[0]
+                    for level in index.levels]
+    is_total_marker = np.array([(level_codes == marker_code) & (marker_code != -1)
+                                for level_codes, marker_code in zip(index.labels, marker_codes)]).T
 
     """
     If a row in the data frame is for totals for one index level, all of the subsequent index levels will also use a
-    totals marker. In order to avoid filtering the wrong rows, a new data frame is created similar to `is_totals_marker`
+    totals marker. In order to avoid filtering the wrong rows, a new array is created similar to `is_totals_marker`
     except a cell is only set to True if that value is a totals marker for the corresponding index level, the leaves of
     the dimension value tree.
 
     This is achieved by rolling an XOR function across each index level with the previous level.
     """
-    first_column = is_total_marker.columns[0]
-    is_totals_marker_leaf = pd.DataFrame(is_total_marker[first_column])
-    for column, prev_column in zip(is_total_marker.columns[1:], list(is_total_marker.columns[:-1])):
-        is_totals_marker_leaf[column] = np.logical_xor(is_total_marker[column], is_total_marker[prev_column])
+    is_totals_marker_leaf = is_total_marker.copy()
+    is_totals_marker_leaf[:, 1:] = np.logical_xor(is_total_marker[:, 1:], is_total_marker[:, :-1])
 
     # Create a boolean vector for each dimension to mark if that dimension is rolled up
     rollup_dimensions = np.array([isinstance(dimension, Rollup)
                                   for dimension in dimensions])
 
-    # Create a boolean pd.Series where False means to remove the row from the data frame.
+    # Create a boolean array where False means to remove the row from the data frame.
     mask = (~(~rollup_dimensions & is_totals_marker_leaf)).all(axis=1)
-    return data_frame.loc[mask]
+    return data_frame[mask]
@@ -1,3 +1,4 @@
+import json
 import re
 from datetime import (
     date,
@@ -8,7 +9,10 @@ import numpy as np
 import pandas as pd
 
 from fireant.dataset.fields import DataType
-from fireant.dataset.totals import TOTALS_MARKERS
+from fireant.dataset.totals import (
+    NUMBER_TOTALS,
+    TOTALS_MARKERS,
+)
 from fireant.utils import filter_kwargs
 
 RAW_VALUE = "raw"
@@ -99,6 +103,24 @@ def json_value(value):
     return value
 
 
+def _json_safe(value):
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    return json_value(value)
+
+
+def encode_json(value):
+    """
+    Encodes a value as JSON bytes. The values nested in dicts, lists and tuples are made safe for JSON with
+    `json_value`, so NaNs become null and infinite numbers become "inf".
+    """
+    return json.dumps(_json_safe(value), separators=(",", ":")).encode("utf-8")
+
+
 def safe_value(value):
     if value is None or value is "" or pd.isnull(value):
         return NULL_VALUE
@@ -147,6 +169,33 @@ def raw_value(value, field, date_as=date_as_string):
     return formatter(value, date_as=date_as, interval_key="iso")
 
 
+def raw_values(values, field, date_as=date_as_string):
+    """
+    Converts an array of raw metric values into safe types, the same as `raw_value` converts each value. Numeric values
+    are converted with array operations.
+
+    :param values:
+        A numpy array or pandas series of raw metric values.
+    :param field:
+        The dataset field that the values represent.
+    :param date_as:
+    :return:
+        A list of the converted values.
+    """
+    if field.data_type == DataType.date or np.asarray(values).dtype.kind not in "fi":
+        return [
+            raw_value(value, field, date_as=date_as)
+            for value in pd.Series(values).tolist()
+        ]
+
+    values = np.asarray(values)
+    converted = values.astype(object)
+    converted[~np.isfinite(values)] = None
+    if values.dtype.kind == "i":
+        converted[values == NUMBER_TOTALS] = TOTALS_VALUE
+    return converted.tolist()
+
+
 def _format_number_field_value(value, **kwargs):
     number = _format_decimal(value, **kwargs)
     return wrap_styling(number, **kwargs)
@@ -199,3 +248,113 @@ def display_value(
 
     formatter = FIELD_DISPLAY_FORMATTER.get(field.data_type, _identity)
     return formatter(value, date_as=date_as, use_raw_value=use_raw_value, **format_kwargs)
+
+
+def _format_numbers(numbers, field, use_raw_value=False):
+    """
+    Formats a list of numbers for display, the same as `display_value` formats each number for a number field. The
+    format pattern is only built once for the whole list.
+    """
+    thousands = getattr(field, "thousands", None) or ""
+    precision = getattr(field, "precision", None)
+    prefix = getattr(field, "prefix", None) or ""
+    suffix = getattr(field, "suffix", None) or ""
+
+    if precision is not None:
+        formatted = map("{{:{}.{}f}}".format(thousands, precision).format, numbers)
+    else:
+        formatted = (
+            number.rstrip("0").rstrip(".")
+            for number in map("{{:{}f}}".format(thousands).format, numbers)
+        )
+
+    if (prefix or suffix) and not use_raw_value:
+        return [prefix + number + suffix for number in formatted]
+    return list(formatted)
+
+
+def display_values(
+    values, field, date_as=date_as_string, nan_value=NAN_VALUE, null_value=NULL_VALUE, use_raw_value=False,
+):
+    """
+    Converts an array of metric values into display values, the same as `display_value` converts each value. Numeric
+    values of number fields are formatted with array operations, dates and booleans are formatted once for each distinct
+    value and any other values are formatted one at a time.
+
+    :param values:
+        A numpy array or pandas series of raw metric values.
+    :param field:
+        The dataset field that the values represent.
+    :param date_as:
+        A format function for datetimes.
+    :return:
+        A list of the display values.
+    """
+    if field.data_type == DataType.number and np.asarray(values).dtype.kind in "fi":
+        values = np.asarray(values)
+        displayed = np.full(len(values), nan_value, dtype=object)
+        is_totals = (
+            values == NUMBER_TOTALS
+            if values.dtype.kind == "i"
+            else np.zeros(len(values), dtype=bool)
+        )
+        is_number = np.isfinite(values) & ~is_totals
+
+        displayed[np.isinf(values)] = INF_VALUE
+        displayed[is_totals] = TOTALS_LABEL
+        displayed[is_number] = _format_numbers(
+            values[is_number].tolist(), field, use_raw_value=use_raw_value
+        )
+        return displayed.tolist()
+
+    def format_value(value):
+        return display_value(
+            value,
+            field,
+            date_as=date_as,
+            nan_value=nan_value,
+            null_value=null_value,
+            use_raw_value=use_raw_value,
+        )
+
+    values = pd.Series(values)
+    if values.dtype.kind in "Mb":
+        # Missing dates are factorized to -1, which selects the nan value appended to the distinct values
+        codes, distinct_values = pd.factorize(values)
+        displayed = np.array(
+            [format_value(value) for value in distinct_values] + [nan_value],
+            dtype=object,
+        )
+        return displayed[codes].tolist()
+
+    return [format_value(value) for value in values.tolist()]
+
+
+def format_series(
+    series, field, date_as=date_as_string, nan_value=NAN_VALUE, null_value=NULL_VALUE, use_raw_value=False,
+):
+    """
+    Converts a series of metric values into a series of display values with the same index, like `display_values`.
+
+    :param series:
+        A pandas series of raw metric values.
+    :param field:
+        The dataset field that the values represent.
+    :param date_as:
+        A format function for datetimes.
+    :return:
+        A pandas series of the display values.
+    """
+    return pd.Series(
+        display_values(
+            series,
+            field,
+            date_as=date_as,
+            nan_value=nan_value,
+            null_value=null_value,
+            use_raw_value=use_raw_value,
+        ),
+        index=series.index,
+        name=series.name,
+        dtype=object,
+    )
@@ -3,6 +3,7 @@ from typing import List
 
 from fireant.dataset.fields import Field
 from fireant.queries.builder.dataset_query_builder import DataSetQueryBuilder
+from fireant.queries.builder.query_builder import QueryException
 from fireant.queries.finders import (
     find_dataset_fields,
     find_field_in_modified_field,
@@ -299,6 +300,21 @@ class DataSetBlenderQueryBuilder(DataSetQueryBuilder):
     more widgets is required. All others are optional.
     """
 
+    def _find_window_function_operations(self, operations):
+        # Operations are not computed in the blended query, so they are always applied in pandas
+        return []
+
+    def _pushdown_series_pagination(self, share_dimensions):
+        # The blended query is not paginated, so the pagination is always applied in pandas
+        return False
+
+    def _pushdown_row_pagination(self, operations, window_operations, share_dimensions):
+        return False
+
+    def _pushdown_pivot(self, operations):
+        # The blended query selects the metrics of each dataset from a subquery, so the widgets pivot the result set
+        return None
+
     @property
     def sql(self):
         """
@@ -314,6 +330,9 @@ class DataSetBlenderQueryBuilder(DataSetQueryBuilder):
         # First run validation for the query on all widgets
         self._validate()
 
+        if self._page_token is not None:
+            raise QueryException("Page tokens can not be used with blended datasets.")
+
         datasets, field_maps = _datasets_and_field_maps(self.dataset)
         metrics = find_metrics_for_widgets(self._widgets)
         metrics_aliases = {metric.alias for metric in metrics}
@@ -3,13 +3,20 @@ from typing import (
     Iterable,
 )
 
+from fireant.dataset.operations import (
+    RollingOperation,
+    apply_operations,
+)
+from fireant.dataset.fields import Field
 from fireant.dataset.totals import scrub_totals_from_share_results
-from fireant.reference_helpers import reference_alias
 from fireant.utils import (
     alias_selector,
     immutable,
 )
+from pypika import Order
+from pypika.terms import AggregateFunction
 
+from .dimension_choices_query_builder import DimensionChoicesQueryBuilder
 from .query_builder import (
     QueryBuilder,
     QueryException,
@@ -18,15 +25,38 @@ from .query_builder import (
     add_hints,
 )
 from .. import special_cases
-from ..execution import fetch_data
+from ..execution import (
+    fetch_all_data,
+    fetch_data,
+    fetch_data_batches,
+    fetch_paginated_data,
+    fetch_pivot_values,
+    fetch_pivoted_data,
+    transform_widget,
+    transform_widgets,
+    upcast_metrics,
+)
 from ..finders import (
     find_and_group_references_for_dimensions,
     find_metrics_for_widgets,
     find_operations_for_widgets,
     find_share_dimensions,
+    find_totals_dimensions,
+    find_window_function_operations,
+)
+from ..pagination import (
+    make_page_token,
+    paginate,
+    read_page_token,
+)
+from ..results import (
+    LazyQueryResults,
+    QueryResults,
+)
+from ..sql_transformer import (
+    make_count_query,
+    make_slicer_query_with_totals_and_references,
 )
-from ..pagination import paginate
-from ..sql_transformer import make_slicer_query_with_totals_and_references
 
 
 class DataSetQueryBuilder(
@@ -41,6 +71,7 @@ class DataSetQueryBuilder(
         super(DataSetQueryBuilder, self).__init__(dataset, dataset.table)
         self._totals_dimensions = set()
         self._apply_filter_to_totals = []
+        self._page_token = None
 
     def __call__(self, *args, **kwargs):
         return self
@@ -60,6 +91,20 @@ class DataSetQueryBuilder(
         self._filters += [f for f in filters]
         self._apply_filter_to_totals += [apply_to_totals] * len(filters)
 
+    @immutable
+    def page_after(self, page_token):
+        """
+        Sets the page token of the query. Instead of skipping a number of rows with an offset, the query is filtered to
+        the rows that come after the last row of the page that the token was created for. This is known as keyset
+        pagination and costs the same for every page, no matter how deep.
+
+        :param page_token:
+            The `next_page_token` returned when fetching the previous page.
+        :return:
+            A copy of the query with the page token set.
+        """
+        self._page_token = page_token
+
     @property
     def reference_groups(self):
         return list(
@@ -68,6 +113,205 @@ class DataSetQueryBuilder(
             ).values()
         )
 
+    def _find_window_function_operations(self, operations):
+        return find_window_function_operations(
+            self.dataset.database,
+            self._dimensions,
+            operations,
+            self._references,
+            self._filters,
+        )
+
+    def _find_share_dimensions(self, operations, window_operations):
+        # Share operations computed with window functions do not need the totals for the over-dimension
+        return find_share_dimensions(
+            self._dimensions,
+            [operation for operation in operations if operation not in window_operations],
+        )
+
+    def _has_pagination_pushdown(self):
+        return self.dataset.database.pushdown_pagination and (
+            self._limit is not None or bool(self._offset)
+        )
+
+    def _has_group_pagination(self):
+        return 1 < len(self._dimensions) and any(
+            getattr(widget, "group_pagination", False) for widget in self._widgets
+        )
+
+    def _pushdown_series_pagination(self, share_dimensions):
+        """
+        Returns whether the pagination of series is applied in the database query. This is the case when the database
+        has pagination pushdown enabled, the query is paginated and the result data frame would be paginated by
+        series.
+        """
+        if not self._has_pagination_pushdown() or not self._has_group_pagination():
+            return False
+
+        # The series in the page are selected with a limited subquery in an IN condition, which compares row values when
+        # there are several series dimensions.
+        database = self.dataset.database
+        if not database.supports_limit_in_subquery:
+            return False
+        if 2 < len(self._dimensions) and not database.supports_row_value_comparisons:
+            return False
+
+        # Aggregate filters apply to the rows of each series rather than the whole series, so the series in the page
+        # could not be selected without them.
+        if any(fltr.is_aggregate for fltr in self._filters):
+            return False
+
+        # The totals of a series dimension are paginated like a series of their own, which can not be expressed in the
+        # subquery selecting the series.
+        series_dimension_aliases = {dimension.alias for dimension in self._dimensions[1:]}
+        return not any(
+            dimension.alias in series_dimension_aliases
+            for dimension in find_totals_dimensions(self._dimensions, share_dimensions)
+        )
+
+    def _pushdown_row_pagination(self, operations, window_operations, share_dimensions):
+        """
+        Returns whether the rows of the result set are limited in the database query. This is the case when the
+        database has pagination pushdown enabled or a page token is used, the query is paginated, the result data frame
+        would not be paginated by series and none of the steps after fetching the data need the full result set.
+        """
+        if self._page_token is None and not self._has_pagination_pushdown():
+            return False
+
+        if self._has_group_pagination():
+            return False
+
+        return not self._needs_full_result_set(
+            operations, window_operations, share_dimensions
+        )
+
+    def _needs_full_result_set(self, operations, window_operations, share_dimensions):
+        """
+        Returns whether any of the steps after fetching the data need the full result set, so that the rows of the
+        base query can not be fetched in parts.
+        """
+        # References and totals are fetched with separate queries that are merged with the results of the base query
+        if self._references or find_totals_dimensions(
+            self._dimensions, share_dimensions
+        ):
+            return True
+
+        # Operations applied in pandas and the trimming of rolling windows need the full result set. Window functions
+        # are evaluated before the limit, so other operations computed in the query are not affected.
+        return not all(
+            operation in window_operations
+            and not isinstance(operation, RollingOperation)
+            for operation in operations
+        )
+
+    def _pushdown_pivot(self, operations):
+        """
+        Returns the dimension that is pivoted in the database query, or None if the result data frame is pivoted by
+        the widgets. A dimension is pivoted in the query when the database has pivot pushdown enabled and every widget
+        pivots that one dimension and no other.
+
+        The pivoted result set has a row for each combination of the other dimensions, so it can not be combined with
+        references, totals, operations or aggregate filters, which all apply to the rows of each value of the pivoted
+        dimension, and rows can not be paginated.
+        """
+        if not self.dataset.database.pushdown_pivot:
+            return None
+
+        if self._references or operations or find_totals_dimensions(self._dimensions, ()):
+            return None
+
+        if self._limit is not None or self._offset or self._page_token is not None:
+            return None
+
+        if any(fltr.is_aggregate for fltr in self._filters):
+            return None
+
+        pivots = {
+            tuple(dimension.alias for dimension in getattr(widget, "pivot", ()))
+            for widget in self._widgets
+        }
+        if len(pivots) != 1 or len(self._dimensions) < 2:
+            return None
+
+        (pivot_aliases,) = pivots
+        if len(pivot_aliases) != 1:
+            return None
+
+        # Each aggregate function in the metric definitions is aggregated conditionally for each value
+        metrics = find_metrics_for_widgets(self._widgets)
+        if not all(
+            metric.definition.find_(AggregateFunction)
+            and not metric.definition.find_(Field)
+            for metric in metrics
+        ):
+            return None
+
+        return next(
+            dimension
+            for dimension in self._dimensions
+            if dimension.alias == pivot_aliases[0]
+        )
+
+    def _fetch_pivot_values(self, dimension, hint=None):
+        """
+        Fetches the values of a dimension pivoted in the database query with a dimension choices query, filtered the
+        same way as this query.
+
+        :return:
+            The values of the dimension, or None if there are more values than fit in the columns of every widget or if
+            one of the values is null.
+        """
+        max_values = min(
+            max(widget.max_columns // len(widget.items), 1) for widget in self._widgets
+        )
+
+        choices_query = (
+            DimensionChoicesQueryBuilder(self.dataset, dimension)
+            .filter(*self._filters)
+            .limit(max_values + 1)
+        )
+        (query,) = add_hints(choices_query.sql, hint)
+        values = fetch_pivot_values(self.dataset.database, query, dimension)
+
+        if len(values) > max_values or values.hasnans:
+            return None
+        return values
+
+    def _row_pagination_orders(self):
+        """
+        Returns the orders used when the rows are paginated in the database query. Rows are sorted in descending order
+        unless ascending is specified, the same as in `_simple_paginate`. The dimensions that are not ordered by are
+        added in ascending order, so that every row has a unique position and page tokens always point between rows.
+        """
+        orders = [
+            (field, Order.asc if orientation is Order.asc else Order.desc)
+            for field, orientation in self.orders
+        ]
+
+        order_aliases = {field.alias for field, _ in orders}
+        return orders + [
+            (dimension, Order.asc)
+            for dimension in self._dimensions
+            if dimension.alias not in order_aliases
+        ]
+
+    def _read_page_token(self, orders):
+        """
+        Returns the values of the orders in the last row of the previous page, read from the page token.
+        """
+        try:
+            last_row = read_page_token(self._page_token)
+        except ValueError as e:
+            raise QueryException(str(e)) from e
+
+        order_keys = [alias_selector(field.alias) for field, _ in orders]
+        if [key for key, _ in last_row] != order_keys:
+            raise QueryException(
+                "The page token was created for a query with different orders."
+            )
+
+        return [value for _, value in last_row]
+
     @property
     def sql(self):
         """
@@ -80,14 +324,42 @@ class DataSetQueryBuilder(
 
         :return: a list of Pypika's Query subclass instances.
         """
+        return self._make_sql()
+
+    def _make_sql(self, pivot=None):
+        """
+        Builds the queries like `sql`.
+
+        :param pivot:
+            A tuple of a dimension and a list of its values to pivot in the query. See `_pushdown_pivot`.
+        """
         # First run validation for the query on all widgets
         self._validate()
 
         metrics = find_metrics_for_widgets(self._widgets)
         operations = find_operations_for_widgets(self._widgets)
-        share_dimensions = find_share_dimensions(self._dimensions, operations)
+        window_operations = self._find_window_function_operations(operations)
+        share_dimensions = self._find_share_dimensions(operations, window_operations)
+        pushdown_series_pagination = self._pushdown_series_pagination(share_dimensions)
+        pushdown_row_pagination = self._pushdown_row_pagination(
+            operations, window_operations, share_dimensions
+        )
 
-        return make_slicer_query_with_totals_and_references(
+        if self._page_token is not None and not pushdown_row_pagination:
+            raise QueryException(
+                "Page tokens can only be used for queries paginated by rows without references, totals or "
+                "operations that are applied after fetching the data."
+            )
+
+        # Rows of a pivoted query are sorted when the result set is reduced, the same as when unstacking
+        orders = self.orders if pivot is None else []
+        page_after = None
+        if pushdown_row_pagination:
+            orders = self._row_pagination_orders()
+            if self._page_token is not None:
+                page_after = self._read_page_token(orders)
+
+        queries = make_slicer_query_with_totals_and_references(
             self.dataset.database,
             self.table,
             self.dataset.joins,
@@ -96,57 +368,297 @@ class DataSetQueryBuilder(
             operations,
             self._filters,
             self._references,
-            orders=self.orders,
+            orders=orders,
             share_dimensions=share_dimensions,
+            window_operations=window_operations,
+            series_limit=self._limit if pushdown_series_pagination else None,
+            series_offset=self._offset if pushdown_series_pagination else None,
+            page_after=page_after,
+            pivot=pivot,
+            nulls_last=pushdown_row_pagination,
         )
 
-    def fetch(self, hint=None) -> Iterable[Dict]:
+        if pushdown_row_pagination:
+            # Without references and totals there is only the base query
+            (query,) = queries
+            if self._limit is not None:
+                query = query.limit(self._limit)
+            if self._offset:
+                query = query.offset(self._offset)
+            queries = [query]
+
+        return queries
+
+    def fetch(
+        self, hint=None, stream=False, max_processes=1, lazy=False
+    ) -> Iterable[Dict]:
         """
         Fetch the data for this query and transform it into the widgets.
 
         :param hint:
             A query hint label used with database vendors which support it. Adds a label comment to the query.
+        :param stream:
+            When true, each widget is transformed with `transform_stream` instead of `transform`, which returns a
+            generator of the widget configuration encoded in chunks of bytes, as JSON or, for CSV widgets, as CSV.
+        :param max_processes:
+            The maximum number of widgets that are transformed at the same time in a thread pool. The widgets share the
+            data frame of the result set. This has no effect when streaming, since the widgets are only transformed
+            when the generators are consumed, or when lazy.
+        :param lazy:
+            When true, the widgets are not transformed until they are accessed. A `LazyQueryResults` is returned instead
+            of a list, which transforms each widget the first time it is accessed by its index and holds the result
+            data frame as `data_frame`.
         :return:
-            A list of dict (JSON) objects containing the widget configurations.
+            A list of dict (JSON) objects containing the widget configurations. The total number of rows before
+            pagination is set as `total_rows` on the list. When the rows were paginated in the database query and the
+            page is full, a token for the next page is set as `next_page_token`.
         """
-        queries = add_hints(self.sql, hint)
-
+        metrics = find_metrics_for_widgets(self._widgets)
         operations = find_operations_for_widgets(self._widgets)
-        share_dimensions = find_share_dimensions(self._dimensions, operations)
+        window_operations = self._find_window_function_operations(operations)
+        share_dimensions = self._find_share_dimensions(operations, window_operations)
+        pushdown_series_pagination = self._pushdown_series_pagination(share_dimensions)
+        pushdown_row_pagination = self._pushdown_row_pagination(
+            operations, window_operations, share_dimensions
+        )
 
-        data_frame = fetch_data(
-            self.dataset.database,
-            queries,
-            self._dimensions,
-            share_dimensions,
-            self.reference_groups,
+        pivot_dimension = self._pushdown_pivot(operations)
+        pivot_values = (
+            self._fetch_pivot_values(pivot_dimension, hint)
+            if pivot_dimension is not None
+            else None
         )
 
-        # Apply operations
-        for operation in operations:
-            for reference in [None] + self._references:
-                df_key = alias_selector(reference_alias(operation, reference))
-                data_frame[df_key] = operation.apply(data_frame, reference)
+        if pivot_values is not None:
+            (query,) = add_hints(
+                self._make_sql(pivot=(pivot_dimension, pivot_values)), hint
+            )
+            data_frame = fetch_pivoted_data(
+                self.dataset.database,
+                query,
+                self._dimensions,
+                metrics,
+                pivot_dimension,
+                pivot_values,
+            )
+
+        elif pushdown_row_pagination:
+            queries = add_hints(self.sql, hint)
+            # The rows before the page token are counted as well, so the count query is built without it
+            (unpaged_query,) = add_hints(self.page_after(None).sql[:1], hint)
+            count_query = make_count_query(self.dataset.database, unpaged_query)
+            data_frame, total_rows = fetch_paginated_data(
+                self.dataset.database,
+                queries,
+                count_query,
+                self._dimensions,
+                share_dimensions,
+                self.reference_groups,
+                metrics,
+            )
 
-        data_frame = scrub_totals_from_share_results(data_frame, self._dimensions)
+        else:
+            data_frame = fetch_data(
+                self.dataset.database,
+                add_hints(self.sql, hint),
+                self._dimensions,
+                share_dimensions,
+                self.reference_groups,
+                metrics,
+            )
+
+        # Apply operations. Operations already computed in the database query with a window function are skipped.
+        data_frame = apply_operations(data_frame, operations, self._references)
+
+        if share_dimensions:
+            data_frame = scrub_totals_from_share_results(data_frame, self._dimensions)
         data_frame = special_cases.apply_operations_to_data_frame(
             operations, data_frame
         )
+
+        if not pushdown_row_pagination:
+            # The number of series paginated in the database query is not known
+            total_rows = None if pushdown_series_pagination else len(data_frame)
+
+        # When the data was paginated in the database query, only the order still needs to be applied
+        paginated_in_database = pushdown_series_pagination or pushdown_row_pagination
+        if pushdown_row_pagination:
+            orders = self._row_pagination_orders()
+        elif pivot_values is not None:
+            # The pivoted dimension and the metrics are levels of the columns, and the rows are already sorted
+            orders = []
+        else:
+            orders = self.orders
         data_frame = paginate(
             data_frame,
             self._widgets,
-            orders=self.orders,
-            limit=self._limit,
-            offset=self._offset,
+            orders=orders,
+            limit=None if paginated_in_database else self._limit,
+            offset=None if paginated_in_database else self._offset,
         )
 
-        # Apply transformations
-        return [
-            widget.transform(
-                data_frame, self.dataset, self._dimensions, self._references
+        if self.dataset.database.downcast_metrics:
+            data_frame = upcast_metrics(data_frame, metrics, self.reference_groups)
+
+        # A page with fewer rows than the limit is the last one
+        next_page_token = (
+            make_page_token(data_frame, orders)
+            if pushdown_row_pagination
+            and self._limit is not None
+            and 0 < len(data_frame) == self._limit
+            else None
+        )
+
+        # Apply transformations. Widgets that pivot the result set the same way share the pivoted data frame.
+        pivot_cache = {}
+        if lazy:
+            return LazyQueryResults(
+                data_frame,
+                self._widgets,
+                lambda widget: transform_widget(
+                    widget,
+                    data_frame,
+                    self.dataset,
+                    self._dimensions,
+                    self._references,
+                    stream=stream,
+                    pivot_cache=pivot_cache,
+                ),
+                total_rows=total_rows,
+                next_page_token=next_page_token,
             )
-            for widget in self._widgets
-        ]
+
+        if stream:
+            results = [
+                transform_widget(
+                    widget,
+                    data_frame,
+                    self.dataset,
+                    self._dimensions,
+                    self._references,
+                    stream=True,
+                    pivot_cache=pivot_cache,
+                )
+                for widget in self._widgets
+            ]
+        else:
+            results = transform_widgets(
+                self._widgets,
+                data_frame,
+                self.dataset,
+                self._dimensions,
+                self._references,
+                max_processes,
+                pivot_cache=pivot_cache,
+            )
+
+        return QueryResults(
+            results,
+            total_rows=total_rows,
+            next_page_token=next_page_token,
+        )
+
+    def export(self, file, batch_size=10000, progress=None, hint=None) -> int:
+        """
+        Fetch the full result set for this query and write it to a file with the first widget, in batches of rows.
+        Unlike `fetch`, the number of rows is not limited to the `max_result_set_size` of the database, and the limit
+        and offset of the query are ignored.
+
+        When nothing applied after fetching the data needs the full result set, that is when there are no references,
+        no totals and every operation is computed in the query with a window function, other than rolling operations,
+        the rows are fetched with a server-side cursor and passed to the widget in batches. The widget can then write
+        each batch before the next one is fetched, so the result set is never held in memory as a whole. Otherwise, the
+        result set is fetched in full and passed to the widget in batches afterwards.
+
+        :param file:
+            A file-like object opened in binary mode, which the output of the widget is written to.
+        :param batch_size:
+            The number of rows in each batch.
+        :param progress:
+            (Optional) A function that is called with the number of rows exported so far after each batch is written.
+        :param hint:
+            A query hint label used with database vendors which support it. Adds a label comment to the query.
+        :return:
+            The number of rows exported.
+        """
+        query_builder = self.limit(None).offset(None).page_after(None)
+        database = query_builder.dataset.database
+
+        metrics = find_metrics_for_widgets(query_builder._widgets)
+        operations = find_operations_for_widgets(query_builder._widgets)
+        window_operations = query_builder._find_window_function_operations(operations)
+        share_dimensions = query_builder._find_share_dimensions(
+            operations, window_operations
+        )
+
+        if query_builder._needs_full_result_set(
+            operations, window_operations, share_dimensions
+        ):
+            data_frame = fetch_all_data(
+                database,
+                add_hints(query_builder.sql, hint),
+                query_builder._dimensions,
+                share_dimensions,
+                query_builder.reference_groups,
+                metrics,
+            )
+            data_frame = apply_operations(
+                data_frame, operations, query_builder._references
+            )
+
+            if share_dimensions:
+                data_frame = scrub_totals_from_share_results(
+                    data_frame, query_builder._dimensions
+                )
+            data_frame = special_cases.apply_operations_to_data_frame(
+                operations, data_frame
+            )
+            data_frame = paginate(
+                data_frame, query_builder._widgets, orders=query_builder.orders
+            )
+
+            batches = (
+                data_frame.iloc[start : start + batch_size]
+                for start in range(0, max(len(data_frame), 1), batch_size)
+            )
+            if database.downcast_metrics:
+                # The metrics are upcast one batch at a time, so the result set is kept downcast
+                batches = (
+                    upcast_metrics(batch, metrics, query_builder.reference_groups)
+                    for batch in batches
+                )
+
+        else:
+            # The rows are ordered in the query the same way as when they are paginated in the query
+            query_builder._orders = query_builder._row_pagination_orders()
+            (query,) = add_hints(query_builder.sql, hint)
+            batches = fetch_data_batches(
+                database,
+                query,
+                query_builder._dimensions,
+                batch_size,
+            )
+
+        exported_rows = 0
+
+        def count_rows(batches):
+            nonlocal exported_rows
+            for batch in batches:
+                exported_rows += len(batch)
+                yield batch
+
+        widget = query_builder._widgets[0]
+        for chunk in widget.transform_batches(
+            count_rows(batches),
+            query_builder.dataset,
+            query_builder._dimensions,
+            query_builder._references,
+        ):
+            file.write(chunk)
+            if progress is not None:
+                progress(exported_rows)
+
+        return exported_rows
 
     def plot(self):
         try:
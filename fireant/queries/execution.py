@@ -1,23 +1,44 @@
+import threading
+import time
 from functools import reduce
+from multiprocessing.pool import ThreadPool
 from typing import (
     Iterable,
     Sized,
     Union,
 )
 
+import numpy as np
 import pandas as pd
 
 from fireant.database import Database
-from fireant.dataset.fields import Field
+from fireant.dataset.fields import (
+    DataType,
+    Field,
+)
 from fireant.dataset.references import calculate_delta_percent
-from fireant.dataset.totals import get_totals_marker_for_dtype
-
+from fireant.dataset.totals import (
+    TEXT_TOTALS,
+    get_totals_marker_for_dtype,
+)
+from fireant.middleware.slow_query_logger import query_logger
+from fireant.reference_helpers import reference_type_alias
 from fireant.utils import (
     alias_selector,
     chunks,
+    upcast_numeric,
 )
 from .finders import find_totals_dimensions
 from .pandas_workaround import df_subtract
+from .result_set import ResultSet
+
+# The values of pivoted dimensions for each choices query, with the time that they expire
+_pivot_values_cache = {}
+_pivot_values_cache_lock = threading.Lock()
+
+# Floats with an absolute value below this, divided by ten to the power of their precision, are rounded to the same
+# value at their precision when they are converted to float32, which has 24 bits of precision.
+_FLOAT32_EXACT_LIMIT = 2 ** 23
 
 
 def fetch_data(
@@ -26,6 +47,7 @@ def fetch_data(
     dimensions: Iterable[Field],
     share_dimensions: Iterable[Field] = (),
     reference_groups=(),
+    metrics: Iterable[Field] = (),
 ):
     queries = [
         str(
@@ -34,7 +56,322 @@ def fetch_data(
         for query in queries
     ]
     results = database.fetch_dataframes(*queries)
-    return reduce_result_set(results, reference_groups, dimensions, share_dimensions)
+    metric_precisions = _metric_precisions(metrics, reference_groups)
+    if database.downcast_metrics:
+        results = _downcast_results(results, queries, metric_precisions)
+    return reduce_result_set(
+        results,
+        reference_groups,
+        dimensions,
+        share_dimensions,
+        categorical_dimensions=database.categorical_dimensions,
+        metric_precisions=metric_precisions,
+    )
+
+
+def fetch_paginated_data(
+    database: Database,
+    queries: Union[Sized, Iterable],
+    count_query,
+    dimensions: Iterable[Field],
+    share_dimensions: Iterable[Field] = (),
+    reference_groups=(),
+    metrics: Iterable[Field] = (),
+):
+    """
+    Fetches the data for queries that are paginated in the database along with a query that counts the rows of the
+    result set without pagination. The count query is executed in the same call as the data queries, so it runs
+    concurrently with them when a concurrency middleware is used.
+
+    :return:
+        A tuple of the data frame and the total number of rows.
+    """
+    queries = [
+        str(
+            query.limit(min(query._limit or float("inf"), database.max_result_set_size))
+        )
+        for query in queries
+    ]
+    *results, count_result = database.fetch_dataframes(*queries, str(count_query))
+    total_rows = int(count_result.iloc[0, 0])
+    metric_precisions = _metric_precisions(metrics, reference_groups)
+    if database.downcast_metrics:
+        results = _downcast_results(results, queries, metric_precisions)
+
+    data_frame = reduce_result_set(
+        results,
+        reference_groups,
+        dimensions,
+        share_dimensions,
+        categorical_dimensions=database.categorical_dimensions,
+        metric_precisions=metric_precisions,
+    )
+    return data_frame, total_rows
+
+
+def fetch_data_batches(
+    database: Database, query, dimensions: Iterable[Field], batch_size: int,
+):
+    """
+    Fetches the data for a single query in batches of rows, without limiting the number of rows to the
+    `max_result_set_size` of the database. This only reduces the result set the same way as `reduce_result_set` for
+    queries without references and totals.
+
+    :return:
+        A generator of data frames indexed by the dimensions.
+    """
+    dimension_keys = [alias_selector(dimension.alias) for dimension in dimensions]
+
+    for data_frame in database.fetch_dataframe_batches(str(query), batch_size):
+        yield data_frame.set_index(dimension_keys) if dimension_keys else data_frame
+
+
+def fetch_all_data(
+    database: Database,
+    queries: Union[Sized, Iterable],
+    dimensions: Iterable[Field],
+    share_dimensions: Iterable[Field] = (),
+    reference_groups=(),
+    metrics: Iterable[Field] = (),
+):
+    """
+    Fetches the data like `fetch_data`, but without limiting the number of rows to the `max_result_set_size` of the
+    database.
+    """
+    queries = [str(query) for query in queries]
+    results = database.fetch_dataframes(*queries)
+    metric_precisions = _metric_precisions(metrics, reference_groups)
+    if database.downcast_metrics:
+        results = _downcast_results(results, queries, metric_precisions)
+    return reduce_result_set(
+        results,
+        reference_groups,
+        dimensions,
+        share_dimensions,
+        categorical_dimensions=database.categorical_dimensions,
+        metric_precisions=metric_precisions,
+    )
+
+
+def upcast_metrics(data_frame: pd.DataFrame, metrics: Iterable[Field], reference_groups=()):
+    """
+    Converts the float metrics that were downcast when the result sets were fetched back to float64. Since only values
+    with no more decimals than the precision of their metric are downcast, rounding them to the precision restores the
+    values exactly, so the widgets get the same values as without downcasting. Integer metrics are kept downcast, since
+    they are serialized the same way.
+    """
+    if not any(dtype == np.float32 for dtype in data_frame.dtypes):
+        return data_frame
+
+    data_frame = data_frame.copy(deep=False)
+    _upcast_columns(
+        data_frame, _metric_precisions(metrics, reference_groups), kinds="f"
+    )
+    return data_frame
+
+
+def _upcast_columns(data_frame, metric_precisions, kinds="fi"):
+    # Upcasts the downcast columns of a data frame in place, restoring floats by rounding them to their precision
+    for key, dtype in list(data_frame.dtypes.items()):
+        if dtype.kind in kinds and dtype.itemsize < 8:
+            data_frame[key] = upcast_numeric(data_frame[key], metric_precisions.get(key))
+
+
+def _metric_precisions(metrics, reference_groups):
+    # The keys of the metric columns in the result sets, for the base query and the query of each reference type
+    references = [None] + [
+        reference for reference_group in reference_groups for reference in reference_group
+    ]
+    return {
+        alias_selector(reference_type_alias(metric, reference)): metric.precision
+        for metric in metrics
+        for reference in references
+    }
+
+
+def _downcast_results(results, queries, metric_precisions):
+    """
+    Downcasts the metric columns of each result set and logs the number of bytes saved for each query.
+    """
+    downcast_results = []
+    for query, result in zip(queries, results):
+        result, saved_bytes = _downcast_data_frame(result, metric_precisions)
+        if saved_bytes:
+            query_logger.info(
+                "[{saved_bytes} bytes saved by downcasting metrics]: {query}".format(
+                    saved_bytes=saved_bytes, query=query
+                )
+            )
+        downcast_results.append(result)
+
+    return downcast_results
+
+
+def _downcast_data_frame(data_frame, metric_precisions):
+    """
+    Converts integer metrics to the smallest integer type that holds their values, and float metrics with a precision
+    to float32 if their values have no more decimals than the precision and are small enough for float32 to restore
+    them exactly when rounded to the precision. Float metrics with any other values are kept as they are.
+
+    :return:
+        A tuple of the data frame and the number of bytes saved. The data frame is returned as it is when no metric is
+        downcast, otherwise the other columns are shared with it.
+    """
+    downcast = {}
+    for key, precision in metric_precisions.items():
+        if key not in data_frame:
+            continue
+
+        values = data_frame[key].values
+        if values.dtype.kind == "i":
+            downcast_values = pd.to_numeric(data_frame[key], downcast="integer").values
+        elif values.dtype == np.float64 and precision is not None:
+            not_null = values[~np.isnan(values)]
+            if len(not_null) and np.abs(not_null).max() >= _FLOAT32_EXACT_LIMIT / 10 ** precision:
+                continue
+            if not np.array_equal(not_null, not_null.round(precision)):
+                continue
+            downcast_values = values.astype(np.float32)
+        else:
+            continue
+
+        if downcast_values.dtype != values.dtype:
+            downcast[key] = downcast_values
+
+    if not downcast:
+        return data_frame, 0
+
+    saved_bytes = sum(
+        data_frame[key].values.nbytes - values.nbytes for key, values in downcast.items()
+    )
+    data_frame = data_frame.copy(deep=False)
+    for key, values in downcast.items():
+        data_frame[key] = values
+    return data_frame, saved_bytes
+
+
+def fetch_pivot_values(database: Database, query, dimension: Field):
+    """
+    Fetches the distinct values of a dimension that is pivoted in the database query. The values are cached for
+    `pivot_values_cache_seconds` of the database, so that repeated queries do not fetch them again.
+
+    :param database:
+    :param query:
+        A query selecting the distinct values of the dimension, such as the query of a `DimensionChoicesQueryBuilder`.
+    :param dimension:
+        The pivoted dimension.
+    :return:
+        An index of the values, sorted the same way as when they are unstacked in pandas.
+    """
+    query = str(query)
+    key = (type(database), database.host, database.port, database.database, query)
+
+    with _pivot_values_cache_lock:
+        expires, values = _pivot_values_cache.get(key, (0, None))
+    if time.monotonic() < expires:
+        return values
+
+    data_frame = database.fetch_dataframe(query)
+    values = pd.Index(data_frame[alias_selector(dimension.alias)]).unique().sort_values()
+
+    now = time.monotonic()
+    with _pivot_values_cache_lock:
+        for expired_key in [k for k, (e, _) in _pivot_values_cache.items() if e <= now]:
+            del _pivot_values_cache[expired_key]
+        _pivot_values_cache[key] = (now + database.pivot_values_cache_seconds, values)
+
+    return values
+
+
+def fetch_pivoted_data(
+    database: Database,
+    query,
+    dimensions: Iterable[Field],
+    metrics: Iterable[Field],
+    pivot_dimension: Field,
+    pivot_values,
+):
+    """
+    Fetches the data for a query with a dimension pivoted in the query. The result data frame is indexed by the other
+    dimensions and has a column for each metric and value of the pivoted dimension, the same as when the result set is
+    unstacked in pandas.
+
+    :return:
+        A data frame with columns indexed by the metric aliases and the values of the pivoted dimension.
+    """
+    query = query.limit(min(query._limit or float("inf"), database.max_result_set_size))
+    data_frame = database.fetch_dataframe(str(query))
+
+    dimension_keys = [
+        alias_selector(dimension.alias)
+        for dimension in dimensions
+        if dimension.alias != pivot_dimension.alias
+    ]
+    data_frame = data_frame.set_index(dimension_keys).sort_index(na_position="first")
+    data_frame.columns = pd.MultiIndex.from_product(
+        [[alias_selector(metric.alias) for metric in metrics], pivot_values],
+        names=[None, alias_selector(pivot_dimension.alias)],
+    )
+
+    return data_frame
+
+
+def transform_widget(
+    widget, data_frame: pd.DataFrame, dataset, dimensions, references, stream=False, pivot_cache=None
+):
+    """
+    Transforms the result set into a widget with `transform`, or with `transform_stream` when `stream` is true. The
+    pivot cache is only passed to widgets that share their pivoted data frames.
+
+    :param pivot_cache:
+        A dict of the pivoted data frames, shared by the widgets transformed from the same result set.
+    :return:
+        The result of the widget.
+    """
+    transform = widget.transform_stream if stream else widget.transform
+    if pivot_cache is not None and getattr(widget, "shares_pivots", False):
+        return transform(data_frame, dataset, dimensions, references, pivot_cache=pivot_cache)
+    return transform(data_frame, dataset, dimensions, references)
+
+
+def transform_widgets(
+    widgets, data_frame: pd.DataFrame, dataset, dimensions, references, max_processes=1, pivot_cache=None
+):
+    """
+    Transforms the result set into each widget. When `max_processes` is greater than one, widgets are transformed at
+    the same time in a thread pool, sharing the data frame. Widgets that are not thread safe are transformed in the
+    calling thread while the others are running.
+
+    :param pivot_cache:
+        A dict of the pivoted data frames, shared by the widgets. See `transform_widget`.
+    :return:
+        A list with the result of each widget, in the order of the widgets.
+    """
+
+    def transform(widget):
+        return transform_widget(
+            widget, data_frame, dataset, dimensions, references, pivot_cache=pivot_cache
+        )
+
+    pooled = [
+        i for i, widget in enumerate(widgets) if getattr(widget, "thread_safe", True)
+    ]
+    if max_processes <= 1 or len(widgets) < 2 or not pooled:
+        return [transform(widget) for widget in widgets]
+
+    results = [None] * len(widgets)
+    with ThreadPool(processes=min(max_processes, len(pooled))) as pool:
+        pooled_results = pool.map_async(transform, [widgets[i] for i in pooled])
+
+        for i, widget in enumerate(widgets):
+            if i not in pooled:
+                results[i] = transform(widget)
+
+        for i, result in zip(pooled, pooled_results.get()):
+            results[i] = result
+        pool.close()
+
+    return results
 
 
 def reduce_result_set(
@@ -42,6 +379,8 @@ def reduce_result_set(
     reference_groups,
     dimensions: Iterable[Field],
     share_dimensions: Iterable[Field],
+    categorical_dimensions=False,
+    metric_precisions=None,
 ):
     """
     Reduces the result sets from individual queries into a single data frame. This effectively joins sets of references
@@ -51,6 +390,13 @@ def reduce_result_set(
     :param reference_groups: A list of groups of references (grouped by interval such as WoW, etc)
     :param dimensions: A list of dimensions, used for setting the index on the result data frame.
     :param share_dimensions: A list of dimensions from which the totals are used for calculating share operations.
+    :param categorical_dimensions:
+        When True, text dimensions are replaced with the codes of categoricals while the result sets are reduced. The
+        categories are the sorted values of the dimension in every result set, along with the totals marker if the
+        query has totals.
+    :param metric_precisions:
+        (Optional) A dict with the precision of each metric column. Metrics downcast to float32 are rounded to it when
+        they are upcast to calculate the delta references.
     :return:
     """
 
@@ -62,7 +408,23 @@ def reduce_result_set(
         alias_selector(d.alias)
         for d in find_totals_dimensions(dimensions, share_dimensions)
     ]
-    dimension_dtypes = result_groups[0][0][dimension_keys].dtypes
+    totals_markers = {
+        dimension_key: get_totals_marker_for_dtype(dtype)
+        for dimension_key, dtype in result_groups[0][0][dimension_keys].dtypes.items()
+    }
+
+    dimension_categories = {}
+    if categorical_dimensions:
+        # The text dimensions are replaced with the codes of their categories while the result sets are reduced, so
+        # that the index is built, joined and sorted from integers instead of strings. The categories are sorted, so
+        # the codes sort the same way as the strings. Nulls have the code -1, so that they are joined the same way.
+        dimension_categories = _make_dimension_categories(
+            results, dimensions, has_totals=bool(totals_dimension_keys)
+        )
+        results = [
+            _encode_dimensions(result, dimension_categories) for result in results
+        ]
+        result_groups = chunks(results, 1 + len(reference_groups))
 
     # Reduce each group to one data frame per rolled up dimension
     group_data_frames = []
@@ -72,7 +434,9 @@ def reduce_result_set(
 
         base_df = result_group[0]
         reference_dfs = [
-            _make_reference_data_frame(base_df, result, reference)
+            _make_reference_data_frame(
+                base_df, result, reference, metric_precisions or {}
+            )
             for result, reference_group in zip(result_group[1:], reference_groups)
             for reference in reference_group
         ]
@@ -89,28 +453,110 @@ def reduce_result_set(
         # The data frames will be ordered so that the first group will contain the data without any rolled up
         # dimensions, then followed by the groups with them, ordered by the last rollup dimension first.
         if totals_dimension_keys[:i]:
-            reduced = _replace_nans_for_totals_values(reduced, dimension_dtypes)
+            reduced = _replace_nans_for_totals_values(
+                reduced, totals_markers, dimension_categories
+            )
 
         group_data_frames.append(reduced)
 
-    return pd.concat(group_data_frames, sort=False).sort_index(na_position="first")
+    data_frame = pd.concat(group_data_frames, sort=False).sort_index(
+        na_position="first"
+    )
+    return _decode_dimensions(data_frame, dimension_categories)
 
 
-def _replace_nans_for_totals_values(data_frame, dtypes):
-    # some things are just easier to do without an index. Reset it temporarily to replace NaN values with the rollup
-    # marker values
-    index_names = data_frame.index.names
-    data_frame.reset_index(inplace=True)
+def _make_dimension_categories(results, dimensions, has_totals):
+    """
+    Returns the categories of each text dimension, which are the sorted distinct values of the dimension in all of the
+    result sets, so that the code of a value is the same in every result set. When the query has totals, the totals
+    marker is added to the categories.
+    """
+    dimension_categories = {}
+    for dimension in dimensions:
+        dimension_key = alias_selector(dimension.alias)
+        columns = [result[dimension_key] for result in results]
+        if dimension.data_type != DataType.text or any(
+            column.dtype != object and column.notnull().any() for column in columns
+        ):
+            continue
 
-    for dimension_key, dtype in dtypes.items():
-        data_frame[dimension_key] = data_frame[dimension_key].fillna(
-            get_totals_marker_for_dtype(dtype)
+        values = [column.dropna().unique() for column in columns]
+        if has_totals:
+            values.append([TEXT_TOTALS])
+        categories = pd.Index(np.concatenate(values)).unique()
+        if categories.inferred_type not in ("string", "empty"):
+            # Values that are not strings might not be sortable, so they are kept as they are
+            continue
+
+        dimension_categories[dimension_key] = categories.sort_values()
+
+    return dimension_categories
+
+
+def _encode_dimensions(data_frame, dimension_categories):
+    data_frame = data_frame.copy(deep=False)
+    for dimension_key, categories in dimension_categories.items():
+        data_frame[dimension_key] = pd.Categorical(
+            data_frame[dimension_key], categories=categories
+        ).codes.astype("int64")
+    return data_frame
+
+
+def _decode_dimensions(data_frame, dimension_categories):
+    """
+    Replaces the codes of the text dimensions in the index of a data frame with their categories. In a multi-index,
+    only the unique values of each level are replaced and the codes of the rows are kept.
+    """
+    if not dimension_categories:
+        return data_frame
+
+    result_set = ResultSet.from_data_frame(data_frame)
+    for i, dimension_key in enumerate(result_set.dimension_keys):
+        if dimension_key not in dimension_categories:
+            continue
+
+        codes, values = result_set.codes[i], result_set.values[i]
+        null_code = values.get_indexer([-1])[0]
+        if null_code != -1:
+            codes = np.where(codes == null_code, -1, codes - (codes > null_code))
+            values = values.delete(null_code)
+
+        result_set.codes[i] = codes
+        result_set.values[i] = dimension_categories[dimension_key][values]
+
+    if len(result_set.dimension_keys) == 1:
+        # Nulls in an index of strings are None, as they are when the index is set from the result set
+        codes, values = result_set.codes[0], result_set.values[0]
+        data_frame.index = pd.Index(
+            np.where(codes == -1, None, values.values[codes]),
+            dtype=object,
+            name=result_set.dimension_keys[0],
         )
+    else:
+        data_frame.index = result_set.make_index()
+
+    return data_frame
+
+
+def _replace_nans_for_totals_values(data_frame, markers, dimension_categories):
+    # The nulls are replaced in the codes of the dimensions, so that the index does not need to be reset and hashed
+    # again and the metric columns are not copied.
+    result_set = ResultSet.from_data_frame(data_frame)
+
+    for dimension_key, marker in markers.items():
+        if dimension_key in dimension_categories:
+            # The text dimensions are encoded with the codes of their categories, where nulls have the code -1
+            result_set = result_set.replace_dimension_value(
+                dimension_key, -1, dimension_categories[dimension_key].get_loc(marker)
+            )
+        else:
+            result_set = result_set.fill_null_dimension(dimension_key, marker)
 
-    return data_frame.set_index(index_names)
+    data_frame.index = result_set.make_index()
+    return data_frame
 
 
-def _make_reference_data_frame(base_df, ref_df, reference):
+def _make_reference_data_frame(base_df, ref_df, reference, metric_precisions):
     """
     This applies the reference metrics to the data frame given the base data frame and the reference data frame.
 
@@ -120,6 +566,8 @@ def _make_reference_data_frame(base_df, ref_df, reference):
     :param base_df:
     :param ref_df:
     :param reference:
+    :param metric_precisions:
+        A dict with the precision of each metric column, which downcast metrics are rounded to when they are upcast.
     :return:
     """
     mertric_column_indices = [
@@ -132,8 +580,11 @@ def _make_reference_data_frame(base_df, ref_df, reference):
 
     base_columns = [base_df.columns[i] for i in mertric_column_indices]
 
-    # Select just the metric columns from the DF and rename them with the reference key as a suffix
+    # Select just the metric columns from the DF and rename them with the reference key as a suffix. Downcast metrics
+    # are upcast, so that the delta of integers does not overflow.
     base_df, ref_df = base_df[base_columns].copy(), ref_df[ref_columns].copy()
+    _upcast_columns(base_df, metric_precisions)
+    _upcast_columns(ref_df, metric_precisions)
     # Both data frame columns are renamed in order to perform the calculation below.
     base_df.columns = ref_df.columns = [
         column.replace(reference.reference_type.alias, reference.alias)
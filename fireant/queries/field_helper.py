@@ -1,5 +1,24 @@
+import copy
+
 from fireant.dataset.intervals import DatetimeInterval
+from fireant.dataset.operations import (
+    CumMean,
+    CumSum,
+    RollingMean,
+    Share,
+)
 from fireant.utils import alias_selector
+from pypika import (
+    Case,
+    NullValue,
+    analytics as an,
+    functions as fn,
+)
+from pypika.terms import (
+    AggregateFunction,
+    Star,
+    ValueWrapper,
+)
 
 
 def make_term_for_field(field, window=None):
@@ -21,3 +40,115 @@ def make_term_for_field(field, window=None):
         return window(field.definition, field.interval_key).as_(f_alias)
 
     return field.definition.as_(f_alias)
+
+
+def make_terms_for_pivoted_metric(metric, dimension_term, values):
+    """
+    Makes a pypika term for each value of a pivoted dimension, which selects the metric for the rows with that value.
+    The arguments of the aggregate functions in the metric definition are wrapped in a CASE, for example
+    `SUM(CASE WHEN "political_party"='d' THEN "votes" END)`, so that only the rows with the value are aggregated.
+    Metrics containing a COUNT are NULL for the values without any rows, the same as when pivoting in pandas.
+
+    :param metric:
+        A metric with a definition containing at least one aggregate function.
+    :param dimension_term:
+        The term selected for the pivoted dimension.
+    :param values:
+        The values of the pivoted dimension.
+    :return:
+        A list of terms, one for each value, aliased with the alias of the metric and the position of the value.
+    """
+    terms = []
+    for i, value in enumerate(values):
+        definition = copy.deepcopy(metric.definition)
+        criterion = dimension_term == value
+
+        for node in list(definition.nodes_()):
+            if isinstance(node, AggregateFunction):
+                node.args = [
+                    arg
+                    if isinstance(arg, ValueWrapper)
+                    else Case().when(criterion, 1 if isinstance(arg, Star) else arg)
+                    for arg in node.args
+                ]
+
+        if metric.definition.find_(fn.Count):
+            # COUNT gives 0 instead of NULL for a value without any rows, which is missing when pivoting in pandas
+            definition = Case().when(fn.Count(Case().when(criterion, 1)) > 0, definition)
+
+        terms.append(definition.as_(alias_selector("{}_{}".format(metric.alias, i))))
+
+    return terms
+
+
+def _make_window(analytic_function, metric_term, dimension_terms, preceding):
+    order_term, *partition_terms = dimension_terms
+
+    # Rolled up dimensions are selected as NULL, so there is nothing to partition or order by for them.
+    partition_terms = [term for term in partition_terms if not isinstance(term, NullValue)]
+    window = analytic_function(metric_term).over(*partition_terms)
+
+    if isinstance(order_term, NullValue):
+        return window
+
+    return window.orderby(order_term).rows(preceding, an.CURRENT_ROW)
+
+
+def _make_share(metric_term, over, dimension_terms):
+    if over is None:
+        total = metric_term
+
+    else:
+        # The total is the sum across the over-dimension and all dimensions after it, which is the same value as in the
+        # totals row for the over-dimension.
+        f_over_alias = alias_selector(over.alias)
+        over_index = [term.alias for term in dimension_terms].index(f_over_alias)
+        partition_terms = [
+            term
+            for term in dimension_terms[:over_index]
+            if not isinstance(term, NullValue)
+        ]
+        total = an.Sum(metric_term).over(*partition_terms)
+
+    return metric_term * 100.0 / fn.NullIf(total, 0)
+
+
+def make_term_for_operation(operation, dimension_terms):
+    """
+    Makes a pypika window function term for an operation. Cumulative and rolling operations are applied across the
+    first dimension and partitioned by the remaining dimensions, which mirrors how the operation is applied to the
+    result data frame in pandas. Share operations divide by the total partitioned by the dimensions before the
+    over-dimension.
+
+    :param operation:
+        An operation that can be computed with a window function. See `find_window_function_operations`.
+    :param dimension_terms:
+        The terms selected for the dimensions in the query. There must be at least one.
+    :return:
+        A pypika term selecting the operation values aliased with the operation's alias.
+    """
+    f_alias = alias_selector(operation.alias)
+    metric_term = operation.args[0].definition
+
+    if isinstance(operation, Share):
+        return _make_share(metric_term, operation.over, dimension_terms).as_(f_alias)
+
+    if isinstance(operation, CumSum):
+        return _make_window(an.Sum, metric_term, dimension_terms, an.Preceding()).as_(f_alias)
+
+    if isinstance(operation, CumMean):
+        return _make_window(an.Avg, metric_term, dimension_terms, an.Preceding()).as_(f_alias)
+
+    if isinstance(operation, RollingMean):
+        preceding = an.Preceding(operation.window - 1) if 1 < operation.window else an.CURRENT_ROW
+        rolling_mean = _make_window(an.Avg, metric_term, dimension_terms, preceding)
+
+        # Like pandas, there is no value until there are at least min_periods values in the window
+        min_periods = operation.window if operation.min_periods is None else operation.min_periods
+        if min_periods <= 1:
+            return rolling_mean.as_(f_alias)
+
+        count = _make_window(an.Count, metric_term, dimension_terms, preceding)
+        return Case().when(count >= min_periods, rolling_mean).as_(f_alias)
+
+    raise TypeError("Operation {} can not be computed with a window function.".format(operation))
@@ -16,7 +16,13 @@ from fireant.dataset.modifiers import (
     OmitFromRollup,
     Rollup,
 )
-from fireant.dataset.operations import Share
+from fireant.dataset.fields import Field
+from fireant.dataset.operations import (
+    CumMean,
+    CumSum,
+    RollingMean,
+    Share,
+)
 from fireant.exceptions import DataSetException
 from fireant.utils import (
     groupby,
@@ -115,10 +121,20 @@ def find_metrics_for_widgets(widgets):
 def find_operations_for_widgets(widgets):
     """
     :return:
-        an ordered, distinct list of metrics used in all widgets as part of this query.
+        an ordered, distinct list of operations used in all widgets as part of this query, including the operations
+        nested in them. The list is ordered for evaluation, so each operation comes after the operations it is
+        computed from. Operations with the same alias are only included once, so that identical sub-expressions used
+        in several operations or widgets are evaluated a single time.
     """
     return ordered_distinct_list_by_attr(
-        [operation for widget in widgets for operation in widget.operations]
+        [
+            dependency
+            for widget in widgets
+            for operation in widget.operations
+            # `operation.operations` lists the nested operations before the operations nested in them, so reversing
+            # it puts each nested operation after its own dependencies.
+            for dependency in reversed([operation] + operation.operations)
+        ]
     )
 
 
@@ -141,6 +157,49 @@ def find_share_operations(operations):
     return [operation for operation in operations if isinstance(operation, Share)]
 
 
+def find_window_function_operations(database, dimensions, operations, references=(), filters=()):
+    """
+    Returns a subset list of operations from the list of operations that can be computed with window functions in the
+    dataset query instead of in pandas. This only applies if the database has operation pushdown enabled and supports
+    window functions.
+
+    Cumulative and rolling operations are applied across the first dimension, so at least one dimension is required.
+    Share operations are computed by dividing by the windowed total over the dimensions before the over-dimension.
+    None of them are pushed down along with delta references, since the operations would then be calculated on the
+    delta values. Share operations are not pushed down along with aggregate filters either, since the windowed total
+    would then only include the rows kept by the HAVING clause. Nested operations are not pushed down.
+
+    :param database:
+    :param dimensions:
+    :param operations:
+    :param references:
+    :param filters:
+    :return:
+    """
+    if not (database.pushdown_operations and database.supports_window_functions):
+        return []
+
+    dimension_aliases = {dimension.alias for dimension in dimensions}
+    has_delta_references = any(reference.delta for reference in references)
+    has_aggregate_filters = any(fltr.is_aggregate for fltr in filters)
+
+    def is_pushed_down(operation):
+        if not isinstance(operation.args[0], Field):
+            return False
+
+        if isinstance(operation, (CumSum, CumMean, RollingMean)):
+            return not has_delta_references and bool(dimensions)
+
+        if isinstance(operation, Share):
+            return not (has_delta_references or has_aggregate_filters) and (
+                operation.over is None or operation.over.alias in dimension_aliases
+            )
+
+        return False
+
+    return [operation for operation in operations if is_pushed_down(operation)]
+
+
 def find_share_dimensions(dimensions, operations):
     """
     Returns a subset list of dimensions from the list of dimensions that are used as the over-dimension in share
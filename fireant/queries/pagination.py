@@ -1,3 +1,8 @@
+import base64
+import datetime
+import json
+
+import numpy as np
 import pandas as pd
 from fireant.utils import alias_selector
 
@@ -53,6 +58,10 @@ def _simple_paginate(data_frame, start=None, end=None, orders=()):
     """
     Applies pagination which limits the number of rows in the data frame.
 
+    When only the first rows of a large data frame are needed, the rows that can not be in the page are dropped before
+    sorting by selecting the smallest values of the first order with a partial sort. The sort is stable, so rows with
+    equal values keep their original order.
+
     :param data_frame:
         A data frame to paginate
     :param start:
@@ -65,18 +74,71 @@ def _simple_paginate(data_frame, start=None, end=None, orders=()):
     """
     if orders:
         sort, ascending = _apply_sorting(orders)
-        data_frame = data_frame.sort_values(by=sort, ascending=ascending)
+        if end is not None and 0 < end and 2 * end < len(data_frame):
+            data_frame = _select_top_rows(data_frame, sort[0], ascending[0], end)
+        data_frame = data_frame.sort_values(
+            by=sort, ascending=ascending, kind="mergesort"
+        )
 
     return data_frame[start:end]
 
 
+def _sort_keys(values, ascending):
+    """
+    Returns an array of floats that sort in the same order as the values in the given direction, with nulls last, or
+    None if the values are not numeric or dates.
+    """
+    if values.dtype.kind in "biuf":
+        keys = values.astype(float)
+    elif values.dtype.kind == "M":
+        keys = values.view("i8").astype(float)
+        keys[pd.isnull(values)] = np.nan
+    else:
+        return None
+
+    if not ascending:
+        keys = -keys
+    keys[np.isnan(keys)] = np.inf
+    return keys
+
+
+def _select_top_rows(data_frame, key, ascending, n):
+    """
+    Selects the rows of a data frame that can be within the first n rows when it is sorted with the given key first.
+    These are the rows with a value of the key up to and including the n-th value, which is found with a partial sort.
+    The rows keep their original order.
+
+    :param data_frame:
+        A data frame to select the rows from.
+    :param key:
+        The name of a column or index level.
+    :param ascending:
+        Whether the data frame is sorted by the key in ascending order.
+    :param n:
+        The number of rows to select. Rows tied with the n-th row are also selected.
+    """
+    values = (
+        data_frame[key].values
+        if key in data_frame.columns
+        else data_frame.index.get_level_values(key).values
+    )
+    keys = _sort_keys(values, ascending)
+    if keys is None:
+        return data_frame
+
+    threshold = np.partition(keys, n - 1)[n - 1]
+    return data_frame[keys <= threshold]
+
+
 def _index_isnull(data_frame):
-    if isinstance(data_frame.index, pd.MultiIndex):
-        return [
-            any(pd.isnull(value) for value in level) for level in list(data_frame.index)
-        ]
+    index = data_frame.index
+    if isinstance(index, pd.MultiIndex):
+        return np.any(
+            [pd.isnull(index.get_level_values(i)) for i in range(index.nlevels)],
+            axis=0,
+        )
 
-    return pd.isnull(data_frame.index)
+    return pd.isnull(index)
 
 
 def _group_paginate(data_frame, start=None, end=None, orders=()):
@@ -84,6 +146,10 @@ def _group_paginate(data_frame, start=None, end=None, orders=()):
     Applies pagination which limits the number of rows in the data frame grouped by the zeroth index level. This will
     in turn paginate the number of series in the data frame.
 
+    Each series is identified by an integer group code. The series are ranked once, using the aggregated values when
+    there are orders, and the rows of the series within the page are selected with a single mask. Series with a null
+    value in one of their dimensions are not paginated and are kept after the paginated series in each group.
+
     :param data_frame:
         A data frame to paginate
     :param start:
@@ -105,6 +171,10 @@ def _group_paginate(data_frame, start=None, end=None, orders=()):
         if alias_selector(field.alias) != data_frame.index.names[0]
     ]
 
+    # The series codes are numbered in the sorted order of the dimension values. Series with nulls get the code -1.
+    series_codes = dimension_groups.ngroup().values
+    n_series = dimension_groups.ngroups
+
     if orders:
         # FIXME this should aggregate according to field definition, instead of sum
         # Need a way to interpret definitions in python code in order to do that
@@ -112,41 +182,88 @@ def _group_paginate(data_frame, start=None, end=None, orders=()):
 
         sort, ascending = _apply_sorting(orders)
         sorted_df = aggregated_df.sort_values(by=sort, ascending=ascending)
-        sorted_dimension_values = tuple(sorted_df.index)[start:end]
+        sorted_series_codes = aggregated_df.index.get_indexer(sorted_df.index)
 
     else:
-        sorted_dimension_values = tuple(dimension_groups.apply(lambda g: g.name))[
-            start:end
-        ]
+        sorted_series_codes = np.arange(n_series)
 
-    sorted_dimension_values = (
-        pd.Index(sorted_dimension_values, name=dimension_levels[0])
-        if len(dimension_levels) == 1
-        else pd.MultiIndex.from_tuples(sorted_dimension_values, names=dimension_levels)
-    )
+    series_rank = np.empty(n_series, dtype=int)
+    series_rank[sorted_series_codes] = np.arange(n_series)
 
-    def _apply_pagination(df):
-        # This function applies sorting by using the sorted dimension values as an index to select values in the right
-        # order out of the data frame. The index must be filtered to only values that are in this data frame, since
-        # there might be missing combinations of index values.
-        dfx = df.reset_index(level=0, drop=True)
-        value_in_index = sorted_dimension_values.isin(dfx.index)
-        index_slice = sorted_dimension_values[value_in_index].values
-
-        """
-        In the case of bool dimensions, convert index_slice to an array of literal `True`, because pandas `.loc` handles
-        lists of bool as a mask.
-        """
-        if bool in {type(x) for x in sorted_dimension_values}:
-            index_slice |= True
-
-        # Need to include nulls so append them to the end of the sorted data frame
-        isnull = _index_isnull(dfx)
-
-        return dfx.loc[index_slice, :].append(dfx[isnull])
-
-    return (
-        data_frame.sort_values(data_frame.index.names[0], ascending=True)
-        .groupby(level=0)
-        .apply(_apply_pagination)
-    )
+    # Appending the rank `n_series` lets the code -1 of the null series select it, ranking them after all others
+    is_null_series = series_codes < 0
+    row_rank = np.append(series_rank, n_series)[series_codes]
+
+    in_page = (start or 0) <= row_rank
+    if end is not None:
+        in_page &= row_rank < end
+
+    x_codes, _ = pd.factorize(data_frame.index.get_level_values(0), sort=True)
+    mask = (in_page | is_null_series) & (0 <= x_codes)
+
+    # Order the rows by the zeroth index level, then by the rank of the series with the null series last. The sort is
+    # stable so rows sharing a rank keep their original order.
+    row_order = np.lexsort((row_rank[mask], x_codes[mask]))
+    return data_frame[mask].iloc[row_order]
+
+
+def _encode_page_value(value):
+    if pd.isnull(value):
+        return None
+    if isinstance(value, (datetime.date, np.datetime64)):
+        return {"datetime": pd.Timestamp(value).isoformat()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    return value
+
+
+def _decode_page_value(value):
+    if isinstance(value, dict):
+        return pd.Timestamp(value["datetime"]).to_pydatetime()
+    return value
+
+
+def make_page_token(data_frame, orders):
+    """
+    Creates a token for the page of rows following the last row of a data frame. The token encodes the values of the
+    orders for the last row, so that the next page can be selected with a predicate instead of an offset.
+
+    :param data_frame:
+        A data frame with a page of rows, sorted by the orders.
+    :param orders:
+        A list of tuples that contain a slicer field definition (with an alias matching the columns or index levels of
+        the data frame) and a pypika.Order.
+    :return:
+        A URL-safe string.
+    """
+    last_row = []
+    for field, _ in orders:
+        key = alias_selector(field.alias)
+        values = (
+            data_frame[key].values
+            if key in data_frame.columns
+            else data_frame.index.get_level_values(key)
+        )
+        last_row.append([key, _encode_page_value(values[-1])])
+
+    payload = json.dumps(last_row, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def read_page_token(page_token):
+    """
+    Reads the values of the orders from a page token created with `make_page_token`.
+
+    :param page_token:
+        A page token.
+    :return:
+        A list of tuples that contain the alias selector of an order field and its value in the last row of the
+        previous page.
+    :raises ValueError:
+        If the page token is malformed.
+    """
+    try:
+        last_row = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+        return [(key, _decode_page_value(value)) for key, value in last_row]
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        raise ValueError("Malformed page token: {}".format(page_token)) from e
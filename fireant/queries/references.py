@@ -7,10 +7,10 @@ from .finders import find_field_in_modified_field
 
 
 def adapt_for_reference_query(
-    reference_parts, database, dimensions, metrics, filters, references
+    reference_parts, database, dimensions, metrics, filters, references, operations=()
 ):
     if reference_parts is None:
-        return dimensions, metrics, filters
+        return dimensions, metrics, filters, operations
 
     ref_dim, unit, interval = reference_parts
 
@@ -21,8 +21,9 @@ def adapt_for_reference_query(
     ref_dimensions = _make_reference_dimensions(dimensions, ref_dim, offset_func, trunc)
     ref_metrics = _make_reference_metrics(metrics, references[0].reference_type.alias)
     ref_filters = _make_reference_filters(filters, ref_dim, offset_func_inv)
+    ref_operations = _make_reference_operations(operations, references[0].reference_type.alias)
 
-    return ref_dimensions, ref_metrics, ref_filters
+    return ref_dimensions, ref_metrics, ref_filters, ref_operations
 
 
 def _replace_reference_dimension(dimension, offset_func, trunc_date=None):
@@ -64,6 +65,20 @@ def _make_reference_metrics(metrics, ref_key):
     ]
 
 
+def _make_reference_operations(operations, ref_key):
+    """
+    Copies the operations computed in a dataset query and suffixes their aliases with the reference key, the same way
+    as the metrics are renamed for a reference query.
+    """
+    reference_operations = []
+    for operation in operations:
+        ref_operation = copy.copy(operation)
+        ref_operation.alias = "{}_{}".format(operation.alias, ref_key)
+        reference_operations.append(ref_operation)
+
+    return reference_operations
+
+
 def _make_reference_filters(filters, ref_dimension, offset_func):
     """
     Copies and replaces the reference dimension's definition in all of the filters applied to a dataset query.
@@ -0,0 +1,192 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from fireant.dataset.totals import get_totals_marker_for_dtype
+
+
+class ResultSet:
+    """
+    A columnar container for the result set of a dataset query.
+
+    The dimensions are stored dictionary encoded, as an array of integer codes for each row and the unique values that
+    the codes refer to, with the code -1 for null values. These are the same codes and values as the levels of the
+    index of a data frame, so a result set can be created from a data frame and converted back without hashing the
+    dimension values again. The metrics are stored as one numpy array for each column.
+
+    Selecting a slice of rows returns a result set with views of the arrays, so it does not copy the data.
+    """
+
+    def __init__(self, dimension_keys, codes, values, columns, metrics):
+        """
+        :param dimension_keys:
+            The keys of the dimensions, the names of the index levels of a data frame.
+        :param codes:
+            A list with an array of integer codes for each dimension.
+        :param values:
+            A list with an index of the unique values for each dimension.
+        :param columns:
+            The keys of the metric columns, the columns of a data frame.
+        :param metrics:
+            A list with an array of values for each metric column.
+        """
+        self.dimension_keys = list(dimension_keys)
+        self.codes = list(codes)
+        self.values = list(values)
+        self.columns = columns
+        self.metrics = list(metrics)
+
+    @classmethod
+    def from_data_frame(cls, data_frame):
+        """
+        Creates a result set from a data frame indexed by the dimensions. The codes and values of the levels of a
+        multi-index and the metric columns are used without copying them.
+        """
+        index = data_frame.index
+
+        if isinstance(index, pd.MultiIndex):
+            codes = [np.asarray(level_codes) for level_codes in index.labels]
+            values = list(index.levels)
+        elif index.name is None:
+            # The data frame is not indexed by a dimension
+            codes, values = [], []
+        else:
+            level_codes, level_values = index.factorize()
+            codes, values = [level_codes], [level_values]
+
+        metrics = [
+            data_frame.iloc[:, i].values for i in range(len(data_frame.columns))
+        ]
+        return cls(
+            [name for name in index.names if name is not None],
+            codes,
+            values,
+            data_frame.columns,
+            metrics,
+        )
+
+    def __len__(self):
+        if self.codes:
+            return len(self.codes[0])
+        if self.metrics:
+            return len(self.metrics[0])
+        return 0
+
+    def __getitem__(self, rows):
+        """
+        Selects rows with a slice, a boolean mask or an array of positions. Selecting a slice returns views of the
+        arrays.
+        """
+        return ResultSet(
+            self.dimension_keys,
+            [codes[rows] for codes in self.codes],
+            self.values,
+            self.columns,
+            [metric[rows] for metric in self.metrics],
+        )
+
+    def dimension(self, key):
+        """
+        Returns the values of a dimension as a categorical, which refers to the codes and values of the dimension
+        without copying them.
+        """
+        i = self.dimension_keys.index(key)
+        return pd.Categorical.from_codes(self.codes[i], self.values[i])
+
+    def metric(self, key):
+        """
+        Returns the array of values of a metric column.
+        """
+        return self.metrics[self.columns.get_loc(key)]
+
+    def dimension_mask(self, key, value):
+        """
+        Returns a boolean mask of the rows where a dimension has a value. This compares the codes of the rows with the
+        code of the value, instead of comparing the values.
+        """
+        i = self.dimension_keys.index(key)
+        code = self.values[i].get_indexer([value])[0]
+        if code == -1:
+            return np.zeros(len(self), dtype=bool)
+        return self.codes[i] == code
+
+    def totals_mask(self, key):
+        """
+        Returns a boolean mask of the rows with totals for a dimension, where the dimension has the totals marker.
+        """
+        values = self.values[self.dimension_keys.index(key)]
+        return self.dimension_mask(key, get_totals_marker_for_dtype(values.dtype))
+
+    def fill_null_dimension(self, key, value):
+        """
+        Returns a result set where the null values of a dimension are replaced with a value. The value is added to the
+        unique values of the dimension if needed, so the other dimensions and the metrics are not copied.
+        """
+        i = self.dimension_keys.index(key)
+        return self._replace_dimension_codes(i, self.codes[i] == -1, value)
+
+    def replace_dimension_value(self, key, value, replacement):
+        """
+        Returns a result set where a value of a dimension is replaced with another value, like `fill_null_dimension`.
+        """
+        i = self.dimension_keys.index(key)
+        code = self.values[i].get_indexer([value])[0]
+        if code == -1:
+            return self
+        return self._replace_dimension_codes(i, self.codes[i] == code, replacement)
+
+    def _replace_dimension_codes(self, i, is_replaced, value):
+        if not is_replaced.any():
+            return self
+
+        values = self.values[i]
+        code = values.get_indexer([value])[0]
+        if code == -1:
+            code = len(values)
+            values = values.append(pd.Index([value]))
+
+        return ResultSet(
+            self.dimension_keys,
+            self.codes[:i]
+            + [np.where(is_replaced, code, self.codes[i])]
+            + self.codes[i + 1 :],
+            self.values[:i] + [values] + self.values[i + 1 :],
+            self.columns,
+            self.metrics,
+        )
+
+    def make_index(self):
+        """
+        Returns the index of the result set as a data frame. A multi-index is created from the codes and values of the
+        dimensions without hashing the values again.
+        """
+        if len(self.dimension_keys) > 1:
+            return pd.MultiIndex(
+                levels=self.values,
+                labels=self.codes,
+                names=self.dimension_keys,
+                verify_integrity=False,
+            )
+
+        if not self.dimension_keys:
+            return pd.RangeIndex(len(self))
+
+        codes, values = self.codes[0], self.values[0]
+        if (codes == -1).any():
+            index = values.take(codes, allow_fill=True, fill_value=np.nan)
+        else:
+            index = values.take(codes)
+        return index.rename(self.dimension_keys[0])
+
+    def to_data_frame(self):
+        """
+        Converts the result set to a data frame indexed by the dimensions.
+        """
+        data_frame = pd.DataFrame(
+            OrderedDict(enumerate(self.metrics)),
+            index=self.make_index(),
+            columns=range(len(self.metrics)),
+        )
+        data_frame.columns = self.columns
+        return data_frame
@@ -0,0 +1,81 @@
+import threading
+from collections.abc import Sequence
+
+
+class QueryResults(list):
+    """
+    The list of transformed widgets returned when fetching a dataset query.
+
+    In addition to the widgets, it holds the total number of rows in the result set before pagination was applied, so
+    that the number of pages can be displayed. The total is `None` when it is not known, which is the case when the
+    series of a chart were paginated in the database query.
+
+    When the rows were paginated in the database query, it also holds a token for the next page, which can be passed to
+    `DataSetQueryBuilder.page_after` to fetch the following rows. The token is `None` on the last page.
+    """
+
+    def __init__(self, widgets, total_rows=None, next_page_token=None):
+        super(QueryResults, self).__init__(widgets)
+        self.total_rows = total_rows
+        self.next_page_token = next_page_token
+
+
+class LazyQueryResults(Sequence):
+    """
+    The widgets returned when fetching a dataset query with `lazy=True`. It holds the result data frame and transforms
+    each widget the first time it is accessed by its index, so that only the widgets that are used are transformed.
+    The transformed widget is kept and returned when it is accessed again.
+
+    Like `QueryResults`, it holds the total number of rows before pagination and the token for the next page. The
+    result data frame is available as `data_frame`, which is not copied. It is shared with the widgets and must not be
+    modified.
+    """
+
+    def __init__(self, data_frame, widgets, transform, total_rows=None, next_page_token=None):
+        """
+        :param data_frame:
+            The result set data frame.
+        :param widgets:
+            The widgets of the query.
+        :param transform:
+            A function that transforms the result set into a widget, called with the widget.
+        """
+        self.data_frame = data_frame
+        self.widgets = list(widgets)
+        self.total_rows = total_rows
+        self.next_page_token = next_page_token
+        self._transform = transform
+        self._results = [None] * len(self.widgets)
+        self._is_transformed = [False] * len(self.widgets)
+        self._locks = [threading.Lock() for _ in self.widgets]
+
+    def __len__(self):
+        return len(self.widgets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        index = range(len(self))[index]
+        # Each widget is only transformed once, even when it is accessed from several threads at the same time
+        with self._locks[index]:
+            if not self._is_transformed[index]:
+                self._results[index] = self._transform(self.widgets[index])
+                self._is_transformed[index] = True
+
+        return self._results[index]
+
+    def is_transformed(self, index):
+        """
+        Returns whether the widget at the index has been transformed, without transforming it.
+        """
+        return self._is_transformed[index]
+
+    def __repr__(self):
+        return "{}({})".format(
+            self.__class__.__name__,
+            ", ".join(
+                repr(result) if is_transformed else "<{}>".format(repr(widget))
+                for widget, result, is_transformed in zip(self.widgets, self._results, self._is_transformed)
+            ),
+        )
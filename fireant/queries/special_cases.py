@@ -97,11 +97,13 @@ def adjust_dataframe_for_rolling_window(operations, data_frame):
     ):
         num_levels = len(data_frame.index.levels)
 
-        return (
-            data_frame.groupby(level=list(range(1, num_levels)))
-            .apply(lambda df: df.iloc[max_rolling_period - 1 :])
-            .reset_index(level=list(range(num_levels - 1)), drop=True)
-        )
+        # Number each row within its group of the remaining index levels and drop the first rows of each group that
+        # fall inside the rolling window. Rows with a null value in one of the levels have no group and are dropped,
+        # the same as when slicing each group.
+        groups = data_frame.groupby(level=list(range(1, num_levels)))
+        in_group = 0 <= groups.ngroup().values
+        position_in_group = groups.cumcount().values
+        return data_frame[in_group & (position_in_group >= max_rolling_period - 1)]
 
     return data_frame
 
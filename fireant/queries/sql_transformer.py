@@ -1,3 +1,5 @@
+import copy
+import operator
 from typing import Iterable
 
 from fireant.database import Database
@@ -10,10 +12,19 @@ from fireant.utils import (
     flatten,
 )
 from pypika import (
+    Case,
+    Criterion,
+    Order,
     Table,
+    Tuple,
     functions as fn,
 )
-from .field_helper import make_term_for_field
+from pypika.terms import ValueWrapper
+from .field_helper import (
+    make_term_for_field,
+    make_term_for_operation,
+    make_terms_for_pivoted_metric,
+)
 from .finders import (
     find_and_group_references_for_dimensions,
     find_joins_for_tables,
@@ -37,6 +48,12 @@ def make_slicer_query_with_totals_and_references(
     references,
     orders,
     share_dimensions=(),
+    window_operations=(),
+    series_limit=None,
+    series_offset=None,
+    page_after=None,
+    pivot=None,
+    nulls_last=False,
 ):
     """
     :param dataset:
@@ -50,6 +67,20 @@ def make_slicer_query_with_totals_and_references(
     :param references:
     :param orders:
     :param share_dimensions:
+    :param window_operations:
+        A subset of the operations that are computed with window functions in each query instead of being applied to
+        the result data frame.
+    :param series_limit:
+        The number of series to limit each query to, where a series is a combination of the dimension values after the
+        first dimension. See `make_series_pagination_criterion`.
+    :param series_offset:
+        The number of series to skip in each query.
+    :param page_after:
+        The values of the orders for the last row of the previous page. See `make_slicer_query`.
+    :param pivot:
+        A tuple of a dimension and a list of its values to pivot in the query. See `make_slicer_query`.
+    :param nulls_last:
+        Whether rows with null values are ordered last. See `make_slicer_query`.
     :return:
     """
 
@@ -74,6 +105,21 @@ def make_slicer_query_with_totals_and_references(
     reference_groups = find_and_group_references_for_dimensions(dimensions, references)
     reference_groups_and_none = [(None, None)] + list(reference_groups.items())
 
+    series_criterion = (
+        make_series_pagination_criterion(
+            database,
+            table,
+            joins,
+            dimensions,
+            filters,
+            orders,
+            limit=series_limit,
+            offset=series_offset,
+        )
+        if series_limit is not None or series_offset
+        else None
+    )
+
     queries = []
     for totals_dimension in totals_dimensions_and_none:
         (dimensions_with_totals, filters_with_totals) = adapt_for_totals_query(
@@ -81,13 +127,19 @@ def make_slicer_query_with_totals_and_references(
         )
 
         for reference_parts, references in reference_groups_and_none:
-            dimensions_with_ref, metrics_with_ref, filters_with_ref = adapt_for_reference_query(
+            (
+                dimensions_with_ref,
+                metrics_with_ref,
+                filters_with_ref,
+                operations_with_ref,
+            ) = adapt_for_reference_query(
                 reference_parts,
                 database,
                 dimensions_with_totals,
                 metrics,
                 filters_with_totals,
                 references,
+                window_operations,
             )
             query = make_slicer_query(
                 database,
@@ -97,8 +149,15 @@ def make_slicer_query_with_totals_and_references(
                 metrics_with_ref,
                 filters_with_ref,
                 orders,
+                operations_with_ref,
+                page_after=page_after,
+                pivot=pivot,
+                nulls_last=nulls_last,
             )
 
+            if series_criterion is not None:
+                query = query.where(series_criterion)
+
             # Add these to the query instance so when the data frames are joined together, the correct references and
             # totals can be applied when combining the separate result set from each query.
             query._totals = totals_dimension
@@ -117,6 +176,10 @@ def make_slicer_query(
     metrics: Iterable[Field] = (),
     filters: Iterable[Filter] = (),
     orders: Iterable = (),
+    operations: Iterable = (),
+    page_after: Iterable = None,
+    pivot=None,
+    nulls_last=False,
 ):
     """
     Creates a pypika/SQL query from a list of slicer elements.
@@ -144,11 +207,27 @@ def make_slicer_query(
         A collection of filters to apply to the query.
     :param orders:
         A collection of orders as tuples of the metric/dimension to order by and the direction to order in.
+    :param operations:
+        A collection of operations to compute with window functions. The operations are applied across the first
+        dimension and partitioned by the remaining dimensions.
+    :param page_after:
+        A collection of values, one for each order, of the last row of the previous page. When given, the query is
+        filtered to the rows that come after that row in the order of the query, which is how keyset pagination selects
+        a page without an offset. The orders must identify each row uniquely and have an explicit direction.
+    :param pivot:
+        A tuple of one of the dimensions and a list of its values. When given, the dimension is pivoted in the query
+        instead of being selected and grouped by, and each metric is selected once for each of the values with a
+        conditional aggregate. See `make_terms_for_pivoted_metric`.
+    :param nulls_last:
+        Whether the rows with a null value of an order are ordered after the other rows, in both directions, the same
+        as when the result data frame is paginated. Databases differ in where they order nulls, so this is needed when
+        the rows are paginated in the query.
 
     :return:
     """
     query = database.query_cls.from_(base_table, immutable=False)
-    elements = flatten([metrics, dimensions, filters])
+    elements = flatten([metrics, dimensions, filters, [field for field, _ in orders]])
+    pivot_alias = pivot[0].alias if pivot is not None else None
 
     # Add joins
     join_tables_needed_for_query = find_required_tables_to_join(elements, base_table)
@@ -157,12 +236,19 @@ def make_slicer_query(
         query = query.join(join.table, how=join.join_type).on(join.criterion)
 
     # Add dimensions
+    dimension_terms = []
     for dimension in dimensions:
         dimension_term = make_term_for_field(dimension, database.trunc_date)
+        if dimension.alias == pivot_alias:
+            pivot_term = dimension_term
+            continue
+
         query = query.select(dimension_term)
         if not isinstance(dimension, Rollup):
             query = query.groupby(dimension_term)
 
+        dimension_terms.append(dimension_term)
+
     # Add filters
     for fltr in filters:
         query = (
@@ -172,23 +258,239 @@ def make_slicer_query(
         )
 
     # Add metrics
-    metric_terms = [make_term_for_field(metric) for metric in metrics]
+    if pivot is None:
+        metric_terms = [make_term_for_field(metric) for metric in metrics]
+    else:
+        _, pivot_values = pivot
+        metric_terms = [
+            term
+            for metric in metrics
+            for term in make_terms_for_pivoted_metric(metric, pivot_term, pivot_values)
+        ]
     if metric_terms:
         query = query.select(*metric_terms)
 
+    # Add operations
+    operation_terms = [
+        make_term_for_operation(operation, dimension_terms) for operation in operations
+    ]
+    if operation_terms:
+        query = query.select(*operation_terms)
+
     # In the case that the orders are determined by a field that is not selected as a metric or dimension, then it needs
     # to be added to the query.
     select_aliases = {el.alias for el in query._selects}
     for (orderby_field, orientation) in orders:
         orderby_term = make_term_for_field(orderby_field)
+        if nulls_last:
+            query = query.orderby(
+                make_nulls_last_term(make_term_for_field(orderby_field, database.trunc_date))
+            )
         query = query.orderby(orderby_term, order=orientation)
 
         if orderby_term.alias not in select_aliases:
             query = query.select(orderby_term)
 
+    if page_after is not None:
+        order_terms = [
+            make_term_for_field(orderby_field, database.trunc_date)
+            for orderby_field, _ in orders
+        ]
+        orientations = [orientation for _, orientation in orders]
+        criterion = make_page_after_criterion(
+            order_terms,
+            orientations,
+            page_after,
+            row_values=database.supports_row_value_comparisons,
+        )
+
+        # Orders on metrics compare aggregates, which must be filtered after grouping
+        query = (
+            query.having(criterion)
+            if any(term.is_aggregate for term in order_terms)
+            else query.where(criterion)
+        )
+
     return query
 
 
+def make_nulls_last_term(term):
+    """
+    Creates a term to order by before the given term, so that the rows where it is null are ordered after the other
+    rows in either direction.
+    """
+    return Case().when(term.isnull(), 1).else_(0)
+
+
+def make_page_after_criterion(terms, orientations, values, row_values=True):
+    """
+    Creates a criterion that selects the rows coming after a row with the given values when ordered by the terms, with
+    the rows where a term is null ordered after the other rows. See `make_nulls_last_term`.
+
+    When all of the terms are ordered in the same direction and none of the values are null, the criterion is a single
+    row value comparison such as `("a","b")>(1,2)`, which databases can answer with an index seek, combined with the
+    rows where a term is null, `... OR "a" IS NULL OR ("a"=1 AND "b" IS NULL)`. Otherwise, or when the database
+    platform does not support row value comparisons, the comparison is expanded into one condition for each term,
+    `"a">1 OR "a" IS NULL OR ("a"=1 AND ("b"<2 OR "b" IS NULL))`. A null value only matches null values, and no rows
+    come after it within its term.
+
+    :param terms:
+        A list of pypika terms that the rows are ordered by.
+    :param orientations:
+        A list of the pypika.Order of each term.
+    :param values:
+        A list of the values of each term in the last row of the previous page.
+    :param row_values:
+        Whether row value comparisons can be used.
+    :return:
+        A pypika criterion.
+    """
+    comparators = [
+        operator.gt if orientation is Order.asc else operator.lt
+        for orientation in orientations
+    ]
+    equal_terms = [
+        term.isnull() if value is None else term == value
+        for term, value in zip(terms, values)
+    ]
+
+    has_null_values = any(value is None for value in values)
+    if 1 == len(set(comparators)) and 1 < len(terms) and row_values and not has_null_values:
+        compare = comparators[0]
+        conditions = [compare(Tuple(*terms), Tuple(*values))] + [
+            Criterion.all(equal_terms[:i] + [term.isnull()])
+            for i, term in enumerate(terms)
+        ]
+        return Criterion.any(conditions)
+
+    conditions = [
+        Criterion.all(equal_terms[:i] + [compare(term, value) | term.isnull()])
+        for i, (term, compare, value) in enumerate(zip(terms, comparators, values))
+        if value is not None
+    ]
+    if not conditions:
+        # The row with nulls for all of the terms is the last one
+        return ValueWrapper(1) == ValueWrapper(0)
+
+    return Criterion.any(conditions)
+
+
+def make_series_pagination_criterion(
+    database: Database,
+    base_table: Table,
+    joins: Iterable[Join] = (),
+    dimensions: Iterable[Field] = (),
+    filters: Iterable[Filter] = (),
+    orders: Iterable = (),
+    limit: int = None,
+    offset: int = None,
+):
+    """
+    Creates a criterion that filters a slicer query to a page of series. A series is a combination of values of the
+    dimensions after the first dimension, which is plotted along the x-axis of a chart.
+
+    The page of series is selected in a subquery grouped by the series dimensions and ordered the same way as series
+    are ordered when paginating the result data frame, with nulls last and ties broken by the series dimensions. Orders
+    on metrics use the metric definitions, so the series are ranked by the same aggregation as the metric values.
+    Series with a null dimension value are never paginated, so they are excluded from the subquery and kept by the
+    criterion.
+
+    :param database:
+    :param base_table:
+        pypika.Table - The base table of the query, the one in the FROM clause
+    :param joins:
+        A collection of joins available in the slicer.
+    :param dimensions:
+        A collection of dimensions used in the query. There must be at least two.
+    :param filters:
+        A collection of filters applied to the query.
+    :param orders:
+        A collection of orders as tuples of the metric/dimension to order by and the direction to order in. Orders on
+        the first dimension are ignored.
+    :param limit:
+        The number of series in the page.
+    :param offset:
+        The number of series to skip.
+    :return:
+        A pypika criterion.
+    """
+    x_axis_dimension, *series_dimensions = dimensions
+    series_orders = [
+        (field, orientation)
+        for field, orientation in orders
+        if field.alias != x_axis_dimension.alias
+    ]
+
+    # The joins for the fields that are ordered by are needed too, since they are not selected in the subquery
+    series_query = database.query_cls.from_(base_table, immutable=False)
+    elements = flatten([series_dimensions, filters, [field for field, _ in series_orders]])
+    join_tables_needed_for_query = find_required_tables_to_join(elements, base_table)
+
+    for join in find_joins_for_tables(joins, base_table, join_tables_needed_for_query):
+        series_query = series_query.join(join.table, how=join.join_type).on(join.criterion)
+
+    series_terms = [
+        make_term_for_field(dimension, database.trunc_date)
+        for dimension in series_dimensions
+    ]
+    series_query = series_query.select(*series_terms).groupby(*series_terms)
+
+    for fltr in filters:
+        series_query = (
+            series_query.having(fltr.definition)
+            if fltr.is_aggregate
+            else series_query.where(fltr.definition)
+        )
+
+    for series_term in series_terms:
+        series_query = series_query.where(series_term.notnull())
+
+    series_aliases = [dimension.alias for dimension in series_dimensions]
+    for field, orientation in series_orders:
+        # Series are sorted in descending order unless ascending is specified, with nulls last, the same as in
+        # `_group_paginate`. The series dimensions are never null in the subquery.
+        order_term = make_term_for_field(field, database.trunc_date)
+        if field.alias not in series_aliases:
+            series_query = series_query.orderby(make_nulls_last_term(order_term))
+        series_query = series_query.orderby(
+            order_term, order=Order.asc if orientation is Order.asc else Order.desc
+        )
+
+    # Ties are broken by the series dimensions, which the series are numbered by in `_group_paginate`
+    ordered_aliases = {field.alias for field, _ in series_orders}
+    for series_alias, series_term in zip(series_aliases, series_terms):
+        if series_alias not in ordered_aliases:
+            series_query = series_query.orderby(series_term, order=Order.asc)
+
+    if limit is not None:
+        series_query = series_query.limit(limit)
+    if offset:
+        series_query = series_query.offset(offset)
+
+    series_key = series_terms[0] if 1 == len(series_terms) else Tuple(*series_terms)
+    criterion = series_key.isin(series_query)
+    for series_term in series_terms:
+        criterion |= series_term.isnull()
+
+    return criterion
+
+
+def make_count_query(database: Database, query):
+    """
+    Creates a query that counts the rows in the result set of a slicer query, ignoring its orders, limit and offset.
+
+    :param database:
+    :param query:
+        A slicer query.
+    :return:
+        A pypika query selecting the number of rows.
+    """
+    query = copy.copy(query)
+    query._orderbys, query._limit, query._offset = [], None, None
+
+    return database.query_cls.from_(query).select(fn.Count("*"))
+
+
 def make_latest_query(
     database: Database,
     base_table: Table,
@@ -1,6 +1,8 @@
 from unittest import TestCase
 from unittest.mock import (
+    MagicMock,
     Mock,
+    call,
     patch,
 )
 
@@ -74,3 +76,47 @@ class TestBaseDatabase(TestCase):
 
         self.assertEqual(2, mock_connect.call_count)
         self.assertNotEqual(connection_1, connection_2)
+
+
+class FetchDataFrameBatchesTests(TestCase):
+    def setUp(self):
+        self.database = Database()
+
+        mock_connect = self.database.connect = MagicMock()
+        self.mock_connection = mock_connect.return_value.__enter__.return_value
+        self.mock_cursor = self.mock_connection.cursor.return_value
+        self.mock_cursor.description = [('a',), ('b',)]
+
+    def test_result_set_fetched_in_batches(self):
+        self.mock_cursor.fetchmany.side_effect = [[(1, 'x'), (2, 'y')], [(3, 'z')]]
+
+        batches = list(self.database.fetch_dataframe_batches('SELECT a,b FROM abc', 2))
+
+        self.mock_cursor.execute.assert_called_once_with('SELECT a,b FROM abc')
+        self.mock_cursor.fetchmany.assert_has_calls([call(2), call(2)])
+        self.assertEqual([[1, 2], [3]], [list(batch['a']) for batch in batches])
+        self.assertEqual(['a', 'b'], list(batches[0].columns))
+
+    def test_no_more_rows_fetched_after_a_batch_that_is_not_full(self):
+        self.mock_cursor.fetchmany.side_effect = [[(1, 'x')]]
+
+        batches = list(self.database.fetch_dataframe_batches('SELECT a,b FROM abc', 2))
+
+        self.assertEqual(1, len(batches))
+        self.assertEqual(1, self.mock_cursor.fetchmany.call_count)
+
+    def test_empty_result_set_fetched_as_a_single_empty_batch(self):
+        self.mock_cursor.fetchmany.side_effect = [[]]
+
+        batches = list(self.database.fetch_dataframe_batches('SELECT a,b FROM abc', 2))
+
+        self.assertEqual(1, len(batches))
+        self.assertTrue(batches[0].empty)
+        self.assertEqual(['a', 'b'], list(batches[0].columns))
+
+    def test_cursor_closed_when_all_batches_fetched(self):
+        self.mock_cursor.fetchmany.side_effect = [[(1, 'x'), (2, 'y')], []]
+
+        list(self.database.fetch_dataframe_batches('SELECT a,b FROM abc', 2))
+
+        self.mock_cursor.close.assert_called_once_with()
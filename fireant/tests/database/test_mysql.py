@@ -43,6 +43,15 @@ class TestMySQLDatabase(TestCase):
               user='test_user', password='password', cursorclass=ANY
         )
 
+    def test_server_side_cursor_is_unbuffered(self):
+        mock_pymysql = Mock()
+        mock_connection = Mock()
+        with patch.dict('sys.modules', pymysql=mock_pymysql):
+            cursor = self.mysql.server_side_cursor(mock_connection)
+
+        self.assertEqual(mock_connection.cursor.return_value, cursor)
+        mock_connection.cursor.assert_called_once_with(mock_pymysql.cursors.SSCursor)
+
     def test_trunc_hour(self):
         result = self.mysql.trunc_date(Field('date'), 'hour')
 
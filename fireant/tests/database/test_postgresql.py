@@ -34,6 +34,15 @@ class TestPostgreSQL(TestCase):
               user='test_user', password='password',
         )
 
+    def test_server_side_cursor_is_named(self):
+        mock_connection = Mock()
+
+        cursor = self.database.server_side_cursor(mock_connection)
+
+        self.assertEqual(mock_connection.cursor.return_value, cursor)
+        name = mock_connection.cursor.call_args[1]['name']
+        self.assertTrue(name.startswith('fireant_'))
+
     def test_trunc_hour(self):
         result = self.database.trunc_date(Field('date'), 'hour')
 
@@ -0,0 +1,78 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas.testing
+
+from fireant import (
+    CumMean,
+    CumSum,
+    RollingMean,
+)
+from fireant.dataset.operations import apply_operations
+from fireant.tests.dataset.mocks import (
+    ElectionOverElection,
+    dimx2_date_str_df,
+    dimx2_date_str_ref_df,
+    mock_dataset,
+)
+
+
+class ApplyOperationsTests(TestCase):
+    def test_nested_operation_evaluated_on_results_of_inner_operation(self):
+        cummean = CumMean(mock_dataset.fields.wins)
+        cumsum = CumSum(cummean)
+
+        result = apply_operations(dimx2_date_str_df.copy(), [cummean, cumsum], [])
+
+        expected = cumsum.apply(
+            cummean.apply(dimx2_date_str_df, None).to_frame("$cummean(wins)"), None
+        )
+        pandas.testing.assert_series_equal(
+            expected, result["$cumsum(cummean(wins))"], check_names=False
+        )
+
+    def test_operations_evaluated_for_base_and_reference_values_together(self):
+        eoe = ElectionOverElection(mock_dataset.fields.timestamp)
+        rolling_mean = RollingMean(mock_dataset.fields.wins, 2, 1)
+
+        with patch.object(
+            rolling_mean, "apply_references", wraps=rolling_mean.apply_references
+        ) as mock_apply_references:
+            result = apply_operations(
+                dimx2_date_str_ref_df.copy(), [rolling_mean], [eoe]
+            )
+
+        mock_apply_references.assert_called_once()
+        pandas.testing.assert_series_equal(
+            rolling_mean.apply(dimx2_date_str_ref_df, None),
+            result["$rollingmean(wins,2)"],
+            check_names=False,
+        )
+        pandas.testing.assert_series_equal(
+            rolling_mean.apply(dimx2_date_str_ref_df, eoe),
+            result["$rollingmean(wins,2)_eoe"],
+            check_names=False,
+        )
+
+    def test_operation_evaluated_on_delta_values_for_delta_reference(self):
+        eoe_delta = ElectionOverElection(mock_dataset.fields.timestamp, delta=True)
+        rolling_mean = RollingMean(mock_dataset.fields.votes, 2, 1)
+        data_frame = dimx2_date_str_ref_df.copy()
+        data_frame["$votes_eoe_delta"] = data_frame["$votes"] - data_frame["$votes_eoe"]
+
+        result = apply_operations(data_frame.copy(), [rolling_mean], [eoe_delta])
+
+        pandas.testing.assert_series_equal(
+            rolling_mean.apply(data_frame, eoe_delta),
+            result["$rollingmean(votes,2)_eoe_delta"],
+            check_names=False,
+        )
+
+    def test_operation_not_evaluated_when_already_in_data_frame(self):
+        cumsum = CumSum(mock_dataset.fields.votes)
+        data_frame = dimx2_date_str_df.copy()
+        data_frame["$cumsum(votes)"] = 0
+
+        result = apply_operations(data_frame, [cumsum], [])
+
+        self.assertTrue((result["$cumsum(votes)"] == 0).all())
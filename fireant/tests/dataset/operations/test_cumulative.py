@@ -93,6 +93,14 @@ class CumProdTests(TestCase):
                              index=dimx2_date_str_ref_df.index)
         pandas.testing.assert_series_equal(expected, result)
 
+    def test_apply_to_downcast_values(self):
+        cumprod = CumProd(mock_dataset.fields.wins)
+        df = pd.DataFrame({"$wins": pd.Series([100, 100, 100], dtype="int8")})
+        result = cumprod.apply(df, None)
+
+        expected = pd.Series([100, 10000, 1000000], name="$wins")
+        pandas.testing.assert_series_equal(expected, result)
+
     def test_apply_cummulative_for_delta_percent(self):
         dataset = MagicMock()
         dataset.table._table_name = "table"
@@ -2,7 +2,10 @@ from unittest import TestCase
 
 import pandas as pd
 import pandas.testing
-from numpy import nan
+from numpy import (
+    inf,
+    nan,
+)
 
 from fireant import RollingMean
 from fireant.tests.dataset.mocks import (
@@ -41,3 +44,37 @@ class RollingMeanTests(TestCase):
                              name='$wins_eoe',
                              index=dimx2_date_str_ref_df.index)
         pandas.testing.assert_series_equal(expected, result)
+
+    def test_apply_to_timeseries_with_uni_dim_and_min_periods(self):
+        rolling_mean = RollingMean(mock_dataset.fields.wins, 3, 1)
+        result = rolling_mean.apply(dimx2_date_str_df, None)
+
+        expected = pd.Series([2.0, 0.0, 0.0, 1.0, 1.0, 2 / 3, 4 / 3, 2 / 3, 4 / 3, 4 / 3, 2 / 3, 4 / 3, 2 / 3],
+                             name='$wins',
+                             index=dimx2_date_str_df.index)
+        pandas.testing.assert_series_equal(expected, result)
+
+    def test_apply_to_timeseries_with_uni_dim_ignores_nans_in_window(self):
+        data_frame = dimx2_date_str_df.copy()
+        data_frame.loc[(slice(None), 'Republican'), '$wins'] = [2, nan, 0, 2, 0, 2]
+
+        rolling_mean = RollingMean(mock_dataset.fields.wins, 2, 1)
+        result = rolling_mean.apply(data_frame, None)
+
+        expected = data_frame['$wins'] \
+            .groupby(level='$political_party') \
+            .apply(lambda x: x.rolling(2, 1).mean())
+        pandas.testing.assert_series_equal(expected, result)
+
+    def test_apply_to_timeseries_with_uni_dim_after_infinite_value(self):
+        data_frame = dimx2_date_str_df.copy()
+        data_frame.loc[(slice(None), 'Republican'), '$wins'] = [1, inf, 2, 3, 4, 5]
+
+        rolling_mean = RollingMean(mock_dataset.fields.wins, 2)
+        result = rolling_mean.apply(data_frame, None)
+
+        expected = data_frame['$wins'] \
+            .groupby(level='$political_party') \
+            .apply(lambda x: x.rolling(2).mean())
+        pandas.testing.assert_series_equal(expected, result)
+        self.assertEqual([2.5, 3.5, 4.5], list(result.loc[(slice('2008-01-01', None), 'Republican')]))
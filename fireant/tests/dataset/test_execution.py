@@ -1,3 +1,4 @@
+import threading
 from datetime import date
 from unittest import (
     TestCase,
@@ -12,14 +13,27 @@ import numpy as np
 import pandas as pd
 import pandas.testing
 
-from fireant import DayOverDay
+from fireant import (
+    DayOverDay,
+    day,
+)
 from fireant.dataset.modifiers import Rollup
 from fireant.dataset.totals import get_totals_marker_for_dtype
 from fireant.queries.execution import (
     fetch_data,
+    fetch_paginated_data,
+    fetch_pivot_values,
+    fetch_pivoted_data,
     reduce_result_set,
+    transform_widgets,
+    upcast_metrics,
+)
+from fireant.utils import alias_selector
+from fireant.widgets.reacttable import ReactTable
+from pypika import (
+    Query,
+    functions as fn,
 )
-from pypika import Query
 from .mocks import (
     dimx0_metricx1_df,
     dimx1_date_df,
@@ -83,9 +97,140 @@ class TestFetchData(TestCase):
             'SELECT * FROM "politics"."hints" LIMIT 5',
         )
         reduce_mock.assert_called_once_with(
-            [self.test_result_a, self.test_result_b], (), self.test_dimensions, ()
+            [self.test_result_a, self.test_result_b],
+            (),
+            self.test_dimensions,
+            (),
+            categorical_dimensions=database.categorical_dimensions,
+            metric_precisions={},
+        )
+
+
+class TestFetchPaginatedData(TestCase):
+    @patch("fireant.queries.execution.reduce_result_set")
+    def test_fetch_paginated_data_with_count_query(self, reduce_mock):
+        database = MagicMock()
+        database.max_result_set_size = 5
+        data_query = Query.from_(politicians_table).select("*").limit(2)
+        count_query = Query.from_(politicians_table).select(fn.Count("*"))
+
+        result_df = pd.DataFrame([{"a": 1.0}])
+        count_df = pd.DataFrame([{"count": 42}])
+        database.fetch_dataframes.return_value = [result_df, count_df]
+
+        data_frame, total_rows = fetch_paginated_data(
+            database, [data_query], count_query, ()
+        )
+
+        self.assertIs(reduce_mock.return_value, data_frame)
+        self.assertEqual(42, total_rows)
+        database.fetch_dataframes.assert_called_once_with(
+            'SELECT * FROM "politics"."politician" LIMIT 2',
+            'SELECT COUNT(*) FROM "politics"."politician"',
+        )
+        reduce_mock.assert_called_once_with(
+            [result_df],
+            (),
+            (),
+            (),
+            categorical_dimensions=database.categorical_dimensions,
+            metric_precisions={},
+        )
+
+
+class FetchPivotValuesTests(TestCase):
+    def make_database(self, host):
+        database = MagicMock(host=host, port=5432, database="test", pivot_values_cache_seconds=300)
+        database.fetch_dataframe.return_value = pd.DataFrame(
+            {"$political_party": ["r", "d", "i"], "$political_party_display": ["Republican", "Democrat", "Independent"]}
+        )
+        return database
+
+    def test_values_sorted(self):
+        database = self.make_database("pivot-values-sorted")
+        query = Query.from_(politicians_table).select("*")
+
+        values = fetch_pivot_values(database, query, mock_dataset.fields.political_party)
+
+        self.assertEqual(["d", "i", "r"], list(values))
+        database.fetch_dataframe.assert_called_once_with('SELECT * FROM "politics"."politician"')
+
+    def test_values_cached_for_same_query_and_database(self):
+        database = self.make_database("pivot-values-cached")
+        query = Query.from_(politicians_table).select("*")
+
+        fetch_pivot_values(database, query, mock_dataset.fields.political_party)
+        fetch_pivot_values(self.make_database("pivot-values-cached"), query, mock_dataset.fields.political_party)
+        fetch_pivot_values(database, query.limit(10), mock_dataset.fields.political_party)
+
+        self.assertEqual(2, database.fetch_dataframe.call_count)
+
+    def test_values_fetched_again_after_they_expire(self):
+        database = self.make_database("pivot-values-expire")
+        database.pivot_values_cache_seconds = 0
+        query = Query.from_(politicians_table).select("*")
+
+        fetch_pivot_values(database, query, mock_dataset.fields.political_party)
+        fetch_pivot_values(database, query, mock_dataset.fields.political_party)
+
+        self.assertEqual(2, database.fetch_dataframe.call_count)
+
+
+class FetchPivotedDataTests(TestCase):
+    def test_columns_indexed_by_metrics_and_pivoted_values(self):
+        database = MagicMock()
+        database.max_result_set_size = 5
+        pivoted_df = dimx2_date_str_df[["$votes", "$wins"]].unstack("$political_party")
+        database.fetch_dataframe.return_value = pd.DataFrame(
+            pivoted_df.reset_index().values, columns=["$timestamp"] + ["column{}".format(i) for i in range(6)]
+        ).infer_objects()
+
+        data_frame = fetch_pivoted_data(
+            database,
+            Query.from_(politicians_table).select("*"),
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            [mock_dataset.fields.votes, mock_dataset.fields.wins],
+            mock_dataset.fields.political_party,
+            pd.Index(["Democrat", "Independent", "Republican"]),
         )
 
+        pandas.testing.assert_frame_equal(pivoted_df, data_frame, check_dtype=False)
+        database.fetch_dataframe.assert_called_once_with('SELECT * FROM "politics"."politician" LIMIT 5')
+
+
+class TransformWidgetsTests(TestCase):
+    def make_widget(self, thread_safe=True):
+        widget = MagicMock()
+        widget.thread_safe = thread_safe
+        widget.transform.side_effect = lambda *args: (widget, threading.get_ident())
+        return widget
+
+    def test_widgets_transformed_in_calling_thread_by_default(self):
+        widgets = [self.make_widget(), self.make_widget()]
+
+        results = transform_widgets(widgets, dimx1_date_df, mock_dataset, [], [])
+
+        self.assertEqual([(widget, threading.get_ident()) for widget in widgets], results)
+
+    def test_widgets_transformed_in_thread_pool_with_max_processes(self):
+        widgets = [self.make_widget(), self.make_widget(), self.make_widget()]
+
+        results = transform_widgets(widgets, dimx1_date_df, mock_dataset, [], [], max_processes=2)
+
+        self.assertEqual(widgets, [widget for widget, _ in results])
+        self.assertNotIn(threading.get_ident(), [thread for _, thread in results])
+        for widget in widgets:
+            widget.transform.assert_called_once_with(dimx1_date_df, mock_dataset, [], [])
+
+    def test_widgets_that_are_not_thread_safe_transformed_in_calling_thread(self):
+        widgets = [self.make_widget(), self.make_widget(thread_safe=False), self.make_widget()]
+
+        results = transform_widgets(widgets, dimx1_date_df, mock_dataset, [], [], max_processes=2)
+
+        self.assertEqual(widgets, [widget for widget, _ in results])
+        self.assertEqual(threading.get_ident(), results[1][1])
+        self.assertNotEqual(threading.get_ident(), results[0][1])
+
 
 class ReduceResultSetsTests(TestCase):
     def test_reduce_single_result_set_no_dimensions(self):
@@ -189,6 +334,28 @@ class ReduceResultSetsWithReferencesTests(TestCase):
 
         pandas.testing.assert_frame_equal(expected, result)
 
+    def test_reduce_delta_result_set_keeps_reference_values_once(self):
+        raw_df = pd.DataFrame(
+            [[date(2019, 1, 2), 1], [date(2019, 1, 3), 2]],
+            columns=["$timestamp", "$metric"],
+        )
+        ref_df = pd.DataFrame(
+            [[date(2019, 1, 2), 2], [date(2019, 1, 3), 3]],
+            columns=["$timestamp", "$metric_dod"],
+        )
+
+        timestamp = mock_dataset.fields.timestamp
+        reference_groups = (
+            [DayOverDay(timestamp), DayOverDay(timestamp, delta=True)],
+        )
+        dimensions = (timestamp,)
+        result = reduce_result_set([raw_df, ref_df], reference_groups, dimensions, ())
+
+        self.assertListEqual(
+            ["$metric", "$metric_dod", "$metric_dod_delta"], list(result.columns)
+        )
+        self.assertListEqual([2, 3], list(result["$metric_dod"]))
+
 
 class ReduceResultSetsWithTotalsTests(TestCase):
     def test_reduce_single_result_set_with_str_dimension(self):
@@ -380,3 +547,243 @@ class ReduceResultSetsWithTotalsTests(TestCase):
         result = reduce_result_set([raw_df, totals_df], (), dimensions, ())
 
         pandas.testing.assert_frame_equal(expected, result)
+
+
+class ReduceResultSetsWithCategoricalDimensionsTests(TestCase):
+    def test_reduce_single_result_set_with_str_dimension(self):
+        raw_df = replace_totals(dimx1_str_df)
+        totals_df = pd.merge(
+            pd.DataFrame([None], columns=["$political_party"]),
+            pd.DataFrame([raw_df[metrics].sum(axis=0)]),
+            how="outer",
+            left_index=True,
+            right_index=True,
+        )
+
+        dimensions = (Rollup(mock_dataset.fields.political_party),)
+        result = reduce_result_set(
+            [raw_df, totals_df], (), dimensions, (), categorical_dimensions=True
+        )
+
+        pandas.testing.assert_frame_equal(dimx1_str_totals_df, result)
+
+    def test_reduce_single_result_set_with_date_str_str_dimensions_str1_totals(self):
+        expected = (
+            dimx3_date_str_str_totalsx3_df.loc[
+                (slice(None), slice(None), slice("California", "Texas")), :
+            ]
+            .append(
+                dimx3_date_str_str_totalsx3_df.loc[(slice(None), "~~totals"), :].iloc[
+                    :-1
+                ]
+            )
+            .sort_index()
+        )
+
+        raw_df = replace_totals(dimx3_date_str_str_df)
+        totals_df = raw_df.groupby("$timestamp").sum().reset_index()
+        totals_df["$political_party"] = None
+        totals_df["$state"] = None
+        totals_df = totals_df[["$timestamp", "$political_party", "$state"] + metrics]
+
+        dimensions = (
+            mock_dataset.fields.timestamp,
+            Rollup(mock_dataset.fields.political_party),
+            mock_dataset.fields.state,
+        )
+        result = reduce_result_set(
+            [raw_df, totals_df], (), dimensions, (), categorical_dimensions=True
+        )
+
+        pandas.testing.assert_frame_equal(expected, result)
+
+    def test_reduce_delta_result_set_with_str_dimension(self):
+        raw_df = dimx2_date_str_df.reset_index()
+        ref_df = raw_df.rename(columns={metric: metric + "_dod" for metric in metrics})
+        ref_df = ref_df[ref_df["$political_party"] != "Independent"]
+
+        timestamp = mock_dataset.fields.timestamp
+        reference_groups = ([DayOverDay(timestamp, delta=True)],)
+        dimensions = (timestamp, mock_dataset.fields.political_party)
+        expected = reduce_result_set([raw_df, ref_df], reference_groups, dimensions, ())
+        result = reduce_result_set(
+            [raw_df, ref_df],
+            reference_groups,
+            dimensions,
+            (),
+            categorical_dimensions=True,
+        )
+
+        pandas.testing.assert_frame_equal(expected, result)
+
+    def test_null_text_values_are_kept(self):
+        raw_df = pd.DataFrame(
+            [[date(2019, 1, 2), "a", 1], [date(2019, 1, 2), None, 2]],
+            columns=["$timestamp", "$political_party", "$votes"],
+        )
+
+        for dimensions in [
+            (mock_dataset.fields.political_party,),
+            (mock_dataset.fields.timestamp, mock_dataset.fields.political_party),
+        ]:
+            with self.subTest(dimensions=dimensions):
+                raw = raw_df[[alias_selector(d.alias) for d in dimensions] + ["$votes"]]
+                expected = reduce_result_set([raw], (), dimensions, ())
+                result = reduce_result_set(
+                    [raw], (), dimensions, (), categorical_dimensions=True
+                )
+
+                pandas.testing.assert_frame_equal(expected, result)
+
+    def test_number_dimensions_are_not_converted(self):
+        raw_df = dimx2_str_num_df.reset_index()
+
+        dimensions = (
+            mock_dataset.fields.political_party,
+            mock_dataset.fields["candidate-id"],
+        )
+        result = reduce_result_set(
+            [raw_df], (), dimensions, (), categorical_dimensions=True
+        )
+
+        pandas.testing.assert_frame_equal(dimx2_str_num_df, result)
+
+
+class FetchDataWithDowncastMetricsTests(TestCase):
+    def setUp(self):
+        self.database = MagicMock()
+        self.database.max_result_set_size = 5
+        self.database.categorical_dimensions = False
+        self.database.downcast_metrics = True
+        self.query = Query.from_(politicians_table).select("*")
+        self.dimensions = (mock_dataset.fields.political_party,)
+        self.metrics = (
+            mock_dataset.fields.votes,
+            mock_dataset.fields.wins,
+            mock_dataset.fields.turnout,
+        )
+
+    def fetch(self, result_df, **kwargs):
+        self.database.fetch_dataframes.return_value = [result_df]
+        return fetch_data(
+            self.database, [self.query], self.dimensions, metrics=self.metrics, **kwargs
+        )
+
+    def test_metrics_are_downcast(self):
+        result_df = pd.DataFrame(
+            {
+                "$political_party": ["d", "r"],
+                "$votes": [1, 200000],
+                "$wins": [1.0, 2.0],
+                "$turnout": [12.34, 56.78],
+            }
+        )
+
+        result = self.fetch(result_df)
+
+        self.assertEqual(np.int32, result["$votes"].dtype)
+        # Floats of metrics without a precision are kept
+        self.assertEqual(np.float64, result["$wins"].dtype)
+        self.assertEqual(np.float32, result["$turnout"].dtype)
+
+    def test_floats_that_are_not_exact_to_their_precision_as_float32_are_kept(self):
+        result_df = pd.DataFrame(
+            {"$political_party": ["d", "r"], "$turnout": [12.34, 123456.78]}
+        )
+
+        result = self.fetch(result_df)
+
+        self.assertEqual(np.float64, result["$turnout"].dtype)
+
+    def test_floats_with_more_decimals_than_their_precision_are_kept(self):
+        result_df = pd.DataFrame(
+            {"$political_party": ["d", "r"], "$turnout": [12.34, 1000.987654]}
+        )
+
+        result = self.fetch(result_df)
+
+        self.assertEqual(np.float64, result["$turnout"].dtype)
+        self.assertListEqual([12.34, 1000.987654], list(result["$turnout"]))
+
+    def test_raw_widget_values_are_the_same_as_without_downcasting(self):
+        widget = ReactTable(*self.metrics)
+
+        for turnout in ([12.34, 0.1, 99.99], [12.34, 0.1, 1000.987654]):
+            result_df = pd.DataFrame(
+                {
+                    "$political_party": ["d", "i", "r"],
+                    "$votes": [1, 200000, 3],
+                    "$wins": [1.0, 0.5, 2.0],
+                    "$turnout": turnout,
+                }
+            )
+
+            results = []
+            for downcast_metrics in (False, True):
+                self.database.downcast_metrics = downcast_metrics
+                data_frame = upcast_metrics(self.fetch(result_df.copy()), self.metrics)
+                results.append(
+                    widget.transform(data_frame, mock_dataset, self.dimensions, [])
+                )
+
+            with self.subTest(turnout=turnout):
+                self.assertEqual(results[0], results[1])
+
+    def test_metrics_are_not_downcast_when_disabled(self):
+        self.database.downcast_metrics = False
+        result_df = pd.DataFrame(
+            {"$political_party": ["d", "r"], "$votes": [1, 2], "$turnout": [1.5, 2.5]}
+        )
+
+        result = self.fetch(result_df)
+
+        self.assertEqual(np.int64, result["$votes"].dtype)
+        self.assertEqual(np.float64, result["$turnout"].dtype)
+
+    def test_saved_bytes_are_logged_for_each_query(self):
+        result_df = pd.DataFrame(
+            {"$political_party": ["d", "r"], "$votes": [1, 2], "$turnout": [1.5, 2.5]}
+        )
+
+        with self.assertLogs("fireant.query_log", level="INFO") as logs:
+            self.fetch(result_df)
+
+        self.assertEqual(
+            [
+                "INFO:fireant.query_log:[22 bytes saved by downcasting metrics]: "
+                'SELECT * FROM "politics"."politician" LIMIT 5'
+            ],
+            logs.output,
+        )
+
+    def test_delta_reference_of_downcast_integers_does_not_overflow(self):
+        timestamp = mock_dataset.fields.timestamp
+        self.dimensions = (timestamp,)
+        self.metrics = (mock_dataset.fields.votes,)
+        base_df = pd.DataFrame({"$timestamp": [date(2019, 1, 2)], "$votes": [100]})
+        ref_df = pd.DataFrame({"$timestamp": [date(2019, 1, 2)], "$votes_dod": [-100]})
+        self.database.fetch_dataframes.return_value = [base_df, ref_df]
+
+        result = fetch_data(
+            self.database,
+            [self.query, self.query],
+            self.dimensions,
+            reference_groups=[[DayOverDay(timestamp, delta=True)]],
+            metrics=self.metrics,
+        )
+
+        self.assertEqual([200], list(result["$votes_dod_delta"]))
+
+    def test_upcast_metrics_restores_floats_downcast_at_their_precision(self):
+        data_frame = pd.DataFrame(
+            {
+                "$votes": np.array([1, 2], dtype=np.int8),
+                "$turnout": np.array([12.34, 56.78], dtype=np.float32),
+            }
+        )
+
+        result = upcast_metrics(data_frame, self.metrics)
+
+        # Integers are serialized the same way and are kept downcast
+        self.assertEqual(np.int8, result["$votes"].dtype)
+        self.assertListEqual([12.34, 56.78], list(result["$turnout"]))
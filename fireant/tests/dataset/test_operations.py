@@ -7,6 +7,14 @@ from fireant import (
     CumProd,
     CumSum,
     Field,
+    RollingMean,
+    Widget,
+)
+from fireant.queries.finders import find_operations_for_widgets
+from fireant.tests.dataset.mocks import (
+    ElectionOverElection,
+    dimx2_date_str_ref_df,
+    mock_dataset,
 )
 
 
@@ -34,3 +42,35 @@ class CumulativeOperationTests(TestCase):
                 op_cum = op(metric)
                 result = op_cum.apply(frame, None)
                 pd.testing.assert_series_equal(result, expected)
+
+    def test_apply_references_matches_apply_for_each_reference(self):
+        eoe = ElectionOverElection(mock_dataset.fields.timestamp)
+
+        for op in (CumSum, CumMean, CumProd):
+            with self.subTest(op.__name__):
+                op_cum = op(mock_dataset.fields.wins)
+                results = op_cum.apply_references(dimx2_date_str_ref_df, [None, eoe])
+
+                for reference, result in zip([None, eoe], results):
+                    pd.testing.assert_series_equal(
+                        op_cum.apply(dimx2_date_str_ref_df, reference), result
+                    )
+
+
+class NestedOperationTests(TestCase):
+    def test_metrics_include_metrics_of_nested_operations(self):
+        operation = CumSum(RollingMean(mock_dataset.fields.votes, 3))
+
+        self.assertListEqual([mock_dataset.fields.votes], operation.metrics)
+
+    def test_operations_for_widgets_ordered_for_evaluation(self):
+        rolling_mean = RollingMean(mock_dataset.fields.votes, 3)
+        cumsum = CumSum(CumMean(rolling_mean))
+        widgets = [Widget(cumsum), Widget(CumMean(rolling_mean), rolling_mean)]
+
+        operations = find_operations_for_widgets(widgets)
+
+        self.assertListEqual(
+            ["rollingmean(votes,3)", "cummean(rollingmean(votes,3))", cumsum.alias],
+            [operation.alias for operation in operations],
+        )
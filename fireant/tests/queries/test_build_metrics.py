@@ -1,7 +1,18 @@
+import sqlite3
 from unittest import TestCase
 
+import pandas as pd
+import pandas.testing
+
 import fireant as f
+from fireant import Field
+from fireant.queries.field_helper import make_terms_for_pivoted_metric
 from fireant.tests.dataset.mocks import mock_dataset
+from pypika import (
+    Query,
+    Table,
+    functions as fn,
+)
 
 
 # noinspection SqlDialectInspection,SqlNoDataSourceInspection
@@ -69,3 +80,46 @@ class QueryBuilderMetricTests(TestCase):
                          'SUM("votes") "$votes",'
                          'SUM("is_winner") "$wins" '
                          'FROM "politics"."politician"', str(queries[0]))
+
+
+class PivotedMetricTermsTests(TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE politician (year INTEGER, political_party TEXT, votes INTEGER)")
+        # There are no rows for the Independent party in 2000
+        self.connection.executemany(
+            "INSERT INTO politician VALUES (?,?,?)",
+            [(1996, "d", 10), (1996, "i", 2), (1996, "r", 8), (2000, "d", 12), (2000, "r", 11), (2000, "r", 3)],
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def assert_pivoted_in_query_like_in_pandas(self, definition):
+        table = Table("politician")
+        metric = Field("metric", definition=definition)
+        values = ["d", "i", "r"]
+
+        grouped_query = Query.from_(table) \
+            .select(table.year, table.political_party, definition.as_("$metric")) \
+            .groupby(table.year, table.political_party)
+        expected = pd.read_sql(str(grouped_query), self.connection) \
+            .set_index(["year", "political_party"])["$metric"] \
+            .unstack("political_party")
+
+        pivoted_query = Query.from_(table) \
+            .select(table.year, *make_terms_for_pivoted_metric(metric, table.political_party, values)) \
+            .groupby(table.year)
+        result = pd.read_sql(str(pivoted_query), self.connection).set_index("year")
+        result.columns = pd.Index(values, name="political_party")
+
+        pandas.testing.assert_frame_equal(expected, result, check_dtype=False)
+
+    def test_sum_metric_null_for_value_without_rows(self):
+        self.assert_pivoted_in_query_like_in_pandas(fn.Sum(Table("politician").votes))
+
+    def test_count_metric_null_for_value_without_rows(self):
+        self.assert_pivoted_in_query_like_in_pandas(fn.Count(Table("politician").votes))
+
+    def test_count_star_metric_null_for_value_without_rows(self):
+        self.assert_pivoted_in_query_like_in_pandas(fn.Count("*"))
@@ -1,4 +1,5 @@
 from unittest import TestCase
+from unittest.mock import patch
 
 import fireant as f
 from fireant.tests.dataset.mocks import mock_dataset
@@ -69,3 +70,267 @@ class QueryBuilderOperationTests(TestCase):
                          'FROM "politics"."politician" '
                          'GROUP BY "$timestamp" '
                          'ORDER BY "$timestamp"', str(queries[0]))
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+@patch.object(mock_dataset.database, 'pushdown_operations', True)
+class QueryBuilderOperationPushdownTests(TestCase):
+    maxDiff = None
+
+    def test_build_query_with_cumsum_operation(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes",'
+                         'SUM(SUM("votes")) OVER('
+                         'ORDER BY TRUNC("timestamp",\'DD\') '
+                         'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) "$cumsum(votes)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp" '
+                         'ORDER BY "$timestamp"', str(queries[0]))
+
+    def test_build_query_with_cummean_operation_partitioned_by_other_dimensions(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumMean(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes",'
+                         'AVG(SUM("votes")) OVER('
+                         'PARTITION BY "political_party" '
+                         'ORDER BY TRUNC("timestamp",\'DD\') '
+                         'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) "$cummean(votes)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY "$timestamp","$political_party"', str(queries[0]))
+
+    def test_build_query_with_rollingmean_operation(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.RollingMean(mock_dataset.fields.votes, 3, 2))) \
+            .dimension(timestamp_daily) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes",'
+                         'CASE WHEN COUNT(SUM("votes")) OVER('
+                         'ORDER BY TRUNC("timestamp",\'DD\') '
+                         'ROWS BETWEEN 2 PRECEDING AND CURRENT ROW)>=2 '
+                         'THEN AVG(SUM("votes")) OVER('
+                         'ORDER BY TRUNC("timestamp",\'DD\') '
+                         'ROWS BETWEEN 2 PRECEDING AND CURRENT ROW) END "$rollingmean(votes,3)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp" '
+                         'ORDER BY "$timestamp"', str(queries[0]))
+
+    def test_build_query_with_rollingmean_operation_and_single_min_period(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.RollingMean(mock_dataset.fields.votes, 3, 1))) \
+            .dimension(timestamp_daily) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes",'
+                         'AVG(SUM("votes")) OVER('
+                         'ORDER BY TRUNC("timestamp",\'DD\') '
+                         'ROWS BETWEEN 2 PRECEDING AND CURRENT ROW) "$rollingmean(votes,3)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp" '
+                         'ORDER BY "$timestamp"', str(queries[0]))
+
+    def test_cumprod_operation_is_not_pushed_down(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumProd(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp" '
+                         'ORDER BY "$timestamp"', str(queries[0]))
+
+    def test_operations_are_not_pushed_down_without_dimensions(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician"', str(queries[0]))
+
+    def test_build_query_with_cumsum_operation_and_rollup(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily, f.Rollup(mock_dataset.fields.political_party)) \
+            .sql
+
+        self.assertEqual(len(queries), 2)
+
+        with self.subTest('base query is partitioned by the other dimensions'):
+            self.assertEqual('SELECT '
+                             'TRUNC("timestamp",\'DD\') "$timestamp",'
+                             '"political_party" "$political_party",'
+                             'SUM("votes") "$votes",'
+                             'SUM(SUM("votes")) OVER('
+                             'PARTITION BY "political_party" '
+                             'ORDER BY TRUNC("timestamp",\'DD\') '
+                             'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) "$cumsum(votes)" '
+                             'FROM "politics"."politician" '
+                             'GROUP BY "$timestamp","$political_party" '
+                             'ORDER BY "$timestamp","$political_party"', str(queries[0]))
+
+        with self.subTest('totals query is not partitioned by the rolled up dimension'):
+            self.assertEqual('SELECT '
+                             'TRUNC("timestamp",\'DD\') "$timestamp",'
+                             'NULL "$political_party",'
+                             'SUM("votes") "$votes",'
+                             'SUM(SUM("votes")) OVER('
+                             'ORDER BY TRUNC("timestamp",\'DD\') '
+                             'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) "$cumsum(votes)" '
+                             'FROM "politics"."politician" '
+                             'GROUP BY "$timestamp" '
+                             'ORDER BY "$timestamp","$political_party"', str(queries[1]))
+
+    def test_build_query_with_cumsum_operation_and_reference(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily) \
+            .reference(f.WeekOverWeek(timestamp_daily)) \
+            .sql
+
+        self.assertEqual(len(queries), 2)
+
+        with self.subTest('reference query selects the operation with the reference alias'):
+            self.assertEqual('SELECT '
+                             'TRUNC(TIMESTAMPADD(\'week\',1,TRUNC("timestamp",\'DD\')),\'DD\') "$timestamp",'
+                             'SUM("votes") "$votes_wow",'
+                             'SUM(SUM("votes")) OVER('
+                             'ORDER BY TRUNC(TIMESTAMPADD(\'week\',1,TRUNC("timestamp",\'DD\')),\'DD\') '
+                             'ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) "$cumsum(votes)_wow" '
+                             'FROM "politics"."politician" '
+                             'GROUP BY "$timestamp" '
+                             'ORDER BY "$timestamp"', str(queries[1]))
+
+    def test_build_query_with_share_operation_over_dimension_without_totals_query(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.Share(mock_dataset.fields.votes, over=mock_dataset.fields.political_party))) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes",'
+                         'SUM("votes")*100.0/NULLIF(SUM(SUM("votes")) OVER('
+                         'PARTITION BY TRUNC("timestamp",\'DD\')),0) "$share(votes,political_party)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY "$timestamp","$political_party"', str(queries[0]))
+
+    def test_build_query_with_share_operation_over_first_dimension(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.Share(mock_dataset.fields.votes, over=mock_dataset.fields.political_party))) \
+            .dimension(mock_dataset.fields.political_party) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes",'
+                         'SUM("votes")*100.0/NULLIF(SUM(SUM("votes")) OVER(),0) "$share(votes,political_party)" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$political_party" '
+                         'ORDER BY "$political_party"', str(queries[0]))
+
+    def test_build_query_with_share_operation_over_rolled_up_dimension(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.Share(mock_dataset.fields.votes, over=mock_dataset.fields.political_party))) \
+            .dimension(f.Rollup(mock_dataset.fields.political_party)) \
+            .sql
+
+        self.assertEqual(len(queries), 2)
+
+        with self.subTest('totals query selects a share of 100%'):
+            self.assertEqual('SELECT '
+                             'NULL "$political_party",'
+                             'SUM("votes") "$votes",'
+                             'SUM("votes")*100.0/NULLIF(SUM(SUM("votes")) OVER(),0) "$share(votes,political_party)" '
+                             'FROM "politics"."politician" '
+                             'ORDER BY "$political_party"', str(queries[1]))
+
+    def test_share_operation_is_not_pushed_down_with_delta_references(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.Share(mock_dataset.fields.votes, over=mock_dataset.fields.political_party))) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .reference(f.WeekOverWeek(timestamp_daily, delta=True)) \
+            .sql
+
+        self.assertEqual(len(queries), 4)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY "$timestamp","$political_party"', str(queries[0]))
+
+    def test_cumulative_and_rolling_operations_are_not_pushed_down_with_delta_references(self):
+        for operation in (f.CumSum(mock_dataset.fields.votes),
+                          f.CumMean(mock_dataset.fields.votes),
+                          f.RollingMean(mock_dataset.fields.votes, 3)):
+            for reference in (f.WeekOverWeek(timestamp_daily, delta=True),
+                              f.WeekOverWeek(timestamp_daily, delta_percent=True)):
+                with self.subTest(operation=operation.alias, reference=reference.alias):
+                    queries = mock_dataset.query \
+                        .widget(f.ReactTable(operation)) \
+                        .dimension(timestamp_daily) \
+                        .reference(reference) \
+                        .sql
+
+                    self.assertEqual(len(queries), 2)
+                    for query in queries:
+                        self.assertNotIn('OVER(', str(query))
+
+    def test_share_operation_is_not_pushed_down_with_aggregate_filters(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.Share(mock_dataset.fields.votes, over=mock_dataset.fields.political_party))) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .filter(mock_dataset.fields.votes > 10) \
+            .sql
+
+        self.assertEqual(len(queries), 2)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'HAVING SUM("votes")>10 '
+                         'ORDER BY "$timestamp","$political_party"', str(queries[0]))
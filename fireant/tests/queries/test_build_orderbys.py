@@ -192,3 +192,21 @@ class QueryBuilderOrderTests(TestCase):
                          'FROM "politics"."politician" '
                          'GROUP BY "$timestamp" '
                          'ORDER BY "$wins"', str(queries[0]))
+
+    def test_build_query_order_by_field_not_selected_in_query_joins_its_tables(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily) \
+            .orderby(mock_dataset.fields.voters) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual('SELECT '
+                         'TRUNC("politician"."timestamp",\'DD\') "$timestamp",'
+                         'SUM("politician"."votes") "$votes",'
+                         'COUNT("voter"."id") "$voters" '
+                         'FROM "politics"."politician" '
+                         'JOIN "politics"."voter" ON "politician"."id"="voter"."politician_id" '
+                         'GROUP BY "$timestamp" '
+                         'ORDER BY "$voters"', str(queries[0]))
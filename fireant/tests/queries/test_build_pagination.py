@@ -0,0 +1,530 @@
+import itertools
+import sqlite3
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas as pd
+
+import fireant as f
+from fireant.queries.builder.query_builder import QueryException
+from fireant.queries.pagination import make_page_token
+from fireant.queries.sql_transformer import (
+    make_count_query,
+    make_nulls_last_term,
+    make_page_after_criterion,
+)
+from fireant.tests.dataset.mocks import mock_dataset
+from pypika import (
+    Order,
+    Query,
+    Table,
+)
+
+timestamp_daily = f.day(mock_dataset.fields.timestamp)
+
+
+def _line_chart(*metrics):
+    return f.HighCharts().axis(*[f.HighCharts.LineSeries(metric) for metric in metrics])
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+@patch.object(mock_dataset.database, 'pushdown_pagination', True)
+class QueryBuilderSeriesPaginationPushdownTests(TestCase):
+    maxDiff = None
+
+    def test_series_limited_with_subquery_ordered_by_metric_definition(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .orderby(mock_dataset.fields.votes, Order.desc) \
+            .limit(10) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'WHERE "political_party" IN ('
+                         'SELECT "political_party" "$political_party" '
+                         'FROM "politics"."politician" '
+                         'WHERE NOT "political_party" IS NULL '
+                         'GROUP BY "$political_party" '
+                         'ORDER BY CASE WHEN SUM("votes") IS NULL THEN 1 ELSE 0 END,SUM("votes") DESC,'
+                         '"$political_party" ASC '
+                         'LIMIT 10) '
+                         'OR "political_party" IS NULL '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY "$votes" DESC', str(queries[0]))
+
+    def test_series_subquery_joins_tables_of_metric_ordered_by(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .orderby(mock_dataset.fields.voters, Order.desc) \
+            .limit(10) \
+            .sql
+
+        self.assertIn('IN ('
+                      'SELECT "politician"."political_party" "$political_party" '
+                      'FROM "politics"."politician" '
+                      'JOIN "politics"."voter" ON "politician"."id"="voter"."politician_id" '
+                      'WHERE NOT "politician"."political_party" IS NULL '
+                      'GROUP BY "$political_party" '
+                      'ORDER BY CASE WHEN COUNT("voter"."id") IS NULL THEN 1 ELSE 0 END,COUNT("voter"."id") DESC,'
+                      '"$political_party" ASC '
+                      'LIMIT 10)', str(queries[0]))
+
+    def test_series_of_multiple_dimensions_ordered_by_one_dimension_break_ties_with_the_other(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party, mock_dataset.fields['candidate-id']) \
+            .orderby(mock_dataset.fields['candidate-id'], Order.asc) \
+            .limit(10) \
+            .sql
+
+        self.assertIn('ORDER BY "$candidate-id" ASC,"$political_party" ASC '
+                      'LIMIT 10)', str(queries[0]))
+
+    def test_series_of_multiple_dimensions_limited_with_tuple_subquery_and_offset(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party, mock_dataset.fields['candidate-id']) \
+            .orderby(timestamp_daily, Order.asc) \
+            .limit(10) \
+            .offset(20) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         '"candidate_id" "$candidate-id",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'WHERE ("political_party","candidate_id") IN ('
+                         'SELECT "political_party" "$political_party","candidate_id" "$candidate-id" '
+                         'FROM "politics"."politician" '
+                         'WHERE NOT "political_party" IS NULL AND NOT "candidate_id" IS NULL '
+                         'GROUP BY "$political_party","$candidate-id" '
+                         'ORDER BY "$political_party" ASC,"$candidate-id" ASC '
+                         'LIMIT 10 OFFSET 20) '
+                         'OR "political_party" IS NULL OR "candidate_id" IS NULL '
+                         'GROUP BY "$timestamp","$political_party","$candidate-id" '
+                         'ORDER BY "$timestamp" ASC', str(queries[0]))
+
+    def test_reference_queries_limited_to_same_series(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .reference(f.DayOverDay(mock_dataset.fields.timestamp)) \
+            .limit(10) \
+            .sql
+
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            with self.subTest(str(query)):
+                self.assertIn('WHERE "political_party" IN ('
+                              'SELECT "political_party" "$political_party" '
+                              'FROM "politics"."politician" '
+                              'WHERE NOT "political_party" IS NULL '
+                              'GROUP BY "$political_party" '
+                              'ORDER BY "$political_party" DESC '
+                              'LIMIT 10) '
+                              'OR "political_party" IS NULL ', str(query))
+
+    def test_series_not_limited_without_group_pagination_widget(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+    def test_series_not_limited_with_single_dimension(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+    def test_series_not_limited_with_aggregate_filter(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .filter(mock_dataset.fields.votes > 5) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+    def test_series_not_limited_with_totals_on_series_dimension(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, f.Rollup(mock_dataset.fields.political_party)) \
+            .limit(10) \
+            .sql
+
+        for query in queries:
+            with self.subTest(str(query)):
+                self.assertNotIn('IN (SELECT', str(query))
+
+    @patch.object(mock_dataset.database, 'supports_limit_in_subquery', False)
+    def test_series_not_limited_without_limit_in_subquery_support(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+    @patch.object(mock_dataset.database, 'supports_row_value_comparisons', False)
+    def test_series_of_multiple_dimensions_not_limited_without_row_value_support(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party, mock_dataset.fields['candidate-id']) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+    @patch.object(mock_dataset.database, 'supports_row_value_comparisons', False)
+    def test_series_of_single_dimension_limited_without_row_value_support(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(10) \
+            .sql
+
+        self.assertIn('"political_party" IN (SELECT', str(queries[0]))
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+class QueryBuilderSeriesPaginationTests(TestCase):
+    def test_series_not_limited_in_query_without_pushdown(self):
+        queries = mock_dataset.query \
+            .widget(_line_chart(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(10) \
+            .sql
+
+        self.assertNotIn('IN (SELECT', str(queries[0]))
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+@patch.object(mock_dataset.database, 'pushdown_pagination', True)
+class QueryBuilderRowPaginationPushdownTests(TestCase):
+    maxDiff = None
+
+    def test_rows_limited_in_query_ordered_the_same_as_in_pandas(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .offset(50) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY '
+                         'CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" DESC,'
+                         'CASE WHEN "political_party" IS NULL THEN 1 ELSE 0 END,"$political_party" DESC '
+                         'LIMIT 25 OFFSET 50', str(queries[0]))
+
+    def test_rows_ordered_by_dimensions_not_in_orders_after_orders(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .orderby(mock_dataset.fields.votes, Order.desc) \
+            .limit(25) \
+            .sql
+
+        self.assertTrue(str(queries[0]).endswith(
+            'ORDER BY CASE WHEN SUM("votes") IS NULL THEN 1 ELSE 0 END,"$votes" DESC,'
+            'CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" ASC,'
+            'CASE WHEN "political_party" IS NULL THEN 1 ELSE 0 END,"$political_party" ASC LIMIT 25'
+        ))
+
+    def test_rows_limited_with_operation_computed_with_window_function(self):
+        with patch.object(mock_dataset.database, 'pushdown_operations', True):
+            queries = mock_dataset.query \
+                .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+                .dimension(timestamp_daily) \
+                .orderby(timestamp_daily, Order.asc) \
+                .limit(25) \
+                .sql
+
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(str(queries[0]).endswith(
+            'ORDER BY CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" ASC LIMIT 25'
+        ))
+
+    def test_rows_not_limited_with_operation_applied_in_pandas(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(f.CumSum(mock_dataset.fields.votes))) \
+            .dimension(timestamp_daily) \
+            .limit(25) \
+            .sql
+
+        self.assertNotIn('LIMIT', str(queries[0]))
+
+    def test_rows_not_limited_with_rolling_operation(self):
+        with patch.object(mock_dataset.database, 'pushdown_operations', True):
+            queries = mock_dataset.query \
+                .widget(f.ReactTable(f.RollingMean(mock_dataset.fields.votes, 3))) \
+                .dimension(timestamp_daily) \
+                .limit(25) \
+                .sql
+
+        self.assertNotIn('LIMIT', str(queries[0]))
+
+    def test_rows_not_limited_with_references(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily) \
+            .reference(f.DayOverDay(mock_dataset.fields.timestamp)) \
+            .limit(25) \
+            .sql
+
+        for query in queries:
+            with self.subTest(str(query)):
+                self.assertNotIn('LIMIT', str(query))
+
+    def test_rows_not_limited_with_totals(self):
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, f.Rollup(mock_dataset.fields.political_party)) \
+            .limit(25) \
+            .sql
+
+        for query in queries:
+            with self.subTest(str(query)):
+                self.assertNotIn('LIMIT', str(query))
+
+
+def _page_token(*order_values):
+    data_frame = pd.DataFrame([[value for _, value in order_values]],
+                              columns=['$' + field.alias for field, _ in order_values])
+    return make_page_token(data_frame, [(field, None) for field, _ in order_values])
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+class QueryBuilderKeysetPaginationTests(TestCase):
+    maxDiff = None
+
+    def test_rows_after_page_token_selected_with_row_value_comparison(self):
+        page_token = _page_token((timestamp_daily, pd.Timestamp('2016-01-01')),
+                                 (mock_dataset.fields.political_party, 'd'))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'WHERE (TRUNC("timestamp",\'DD\'),"political_party")<(\'2016-01-01T00:00:00\',\'d\') '
+                         'OR TRUNC("timestamp",\'DD\') IS NULL '
+                         'OR (TRUNC("timestamp",\'DD\')=\'2016-01-01T00:00:00\' AND "political_party" IS NULL) '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY '
+                         'CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" DESC,'
+                         'CASE WHEN "political_party" IS NULL THEN 1 ELSE 0 END,"$political_party" DESC '
+                         'LIMIT 25', str(queries[0]))
+
+    @patch.object(mock_dataset.database, 'supports_row_value_comparisons', False)
+    def test_rows_after_page_token_selected_without_row_value_comparison(self):
+        page_token = _page_token((timestamp_daily, pd.Timestamp('2016-01-01')),
+                                 (mock_dataset.fields.political_party, 'd'))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         '"political_party" "$political_party",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'WHERE TRUNC("timestamp",\'DD\')<\'2016-01-01T00:00:00\' '
+                         'OR TRUNC("timestamp",\'DD\') IS NULL '
+                         'OR (TRUNC("timestamp",\'DD\')=\'2016-01-01T00:00:00\' '
+                         'AND ("political_party"<\'d\' OR "political_party" IS NULL)) '
+                         'GROUP BY "$timestamp","$political_party" '
+                         'ORDER BY '
+                         'CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" DESC,'
+                         'CASE WHEN "political_party" IS NULL THEN 1 ELSE 0 END,"$political_party" DESC '
+                         'LIMIT 25', str(queries[0]))
+
+    def test_rows_after_page_token_selected_in_having_clause_when_ordered_by_metric(self):
+        page_token = _page_token((mock_dataset.fields.votes, 100),
+                                 (timestamp_daily, pd.Timestamp('2016-01-01')))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily) \
+            .orderby(mock_dataset.fields.votes, Order.desc) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertEqual('SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp" '
+                         'HAVING SUM("votes")<100 '
+                         'OR SUM("votes") IS NULL '
+                         'OR (SUM("votes")=100 AND (TRUNC("timestamp",\'DD\')>\'2016-01-01T00:00:00\' '
+                         'OR TRUNC("timestamp",\'DD\') IS NULL)) '
+                         'ORDER BY CASE WHEN SUM("votes") IS NULL THEN 1 ELSE 0 END,"$votes" DESC,'
+                         'CASE WHEN TRUNC("timestamp",\'DD\') IS NULL THEN 1 ELSE 0 END,"$timestamp" ASC '
+                         'LIMIT 25', str(queries[0]))
+
+    def test_rows_after_page_token_with_null_value_selected_with_is_null(self):
+        page_token = _page_token((timestamp_daily, pd.Timestamp('2016-01-01')),
+                                 (mock_dataset.fields.political_party, None))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertIn('WHERE TRUNC("timestamp",\'DD\')<\'2016-01-01T00:00:00\' '
+                      'OR TRUNC("timestamp",\'DD\') IS NULL '
+                      'GROUP BY', str(queries[0]))
+
+    def test_rows_after_page_token_with_null_value_in_first_order_selected_with_is_null(self):
+        page_token = _page_token((timestamp_daily, None),
+                                 (mock_dataset.fields.political_party, 'd'))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertIn('WHERE TRUNC("timestamp",\'DD\') IS NULL '
+                      'AND ("political_party"<\'d\' OR "political_party" IS NULL) '
+                      'GROUP BY', str(queries[0]))
+
+    def test_no_rows_selected_after_page_token_with_only_null_values(self):
+        page_token = _page_token((timestamp_daily, None),
+                                 (mock_dataset.fields.political_party, None))
+
+        queries = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily, mock_dataset.fields.political_party) \
+            .limit(25) \
+            .page_after(page_token) \
+            .sql
+
+        self.assertIn('WHERE 1=0 GROUP BY', str(queries[0]))
+
+    def test_page_token_for_different_orders_raises_exception(self):
+        page_token = _page_token((mock_dataset.fields.votes, 100),
+                                 (timestamp_daily, pd.Timestamp('2016-01-01')))
+
+        with self.assertRaises(QueryException):
+            mock_dataset.query \
+                .widget(f.ReactTable(mock_dataset.fields.votes)) \
+                .dimension(timestamp_daily) \
+                .limit(25) \
+                .page_after(page_token) \
+                .sql
+
+    def test_malformed_page_token_raises_exception(self):
+        with self.assertRaises(QueryException):
+            mock_dataset.query \
+                .widget(f.ReactTable(mock_dataset.fields.votes)) \
+                .dimension(timestamp_daily) \
+                .limit(25) \
+                .page_after('abc') \
+                .sql
+
+    def test_page_token_with_references_raises_exception(self):
+        page_token = _page_token((timestamp_daily, pd.Timestamp('2016-01-01')))
+
+        with self.assertRaises(QueryException):
+            mock_dataset.query \
+                .widget(f.ReactTable(mock_dataset.fields.votes)) \
+                .dimension(timestamp_daily) \
+                .reference(f.DayOverDay(mock_dataset.fields.timestamp)) \
+                .limit(25) \
+                .page_after(page_token) \
+                .sql
+
+
+class PageAfterCriterionTests(TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE politician (year INTEGER, political_party TEXT)")
+        self.connection.executemany(
+            "INSERT INTO politician VALUES (?,?)",
+            itertools.product([1996, 2000, None], ["d", "r", None]),
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_rows_after_each_row_selected_with_nulls_ordered_last(self):
+        table = Table("politician")
+        terms = [table.year, table.political_party]
+
+        for orientations in itertools.product([Order.asc, Order.desc], repeat=2):
+            query = Query.from_(table).select(*terms)
+            for term, orientation in zip(terms, orientations):
+                query = query.orderby(make_nulls_last_term(term)).orderby(term, order=orientation)
+            rows = self.connection.execute(str(query)).fetchall()
+
+            for row_values in (True, False):
+                for i, row in enumerate(rows):
+                    with self.subTest(orientations=orientations, row_values=row_values, row=row):
+                        page_after = make_page_after_criterion(terms, orientations, row, row_values=row_values)
+                        self.assertEqual(
+                            rows[i + 1:],
+                            self.connection.execute(str(query.where(page_after))).fetchall(),
+                        )
+
+
+# noinspection SqlDialectInspection,SqlNoDataSourceInspection
+class MakeCountQueryTests(TestCase):
+    def test_count_query_wraps_query_without_orders_limit_and_offset(self):
+        query = mock_dataset.query \
+            .widget(f.ReactTable(mock_dataset.fields.votes)) \
+            .dimension(timestamp_daily) \
+            .sql[0] \
+            .limit(25) \
+            .offset(50)
+
+        count_query = make_count_query(mock_dataset.database, query)
+
+        self.assertEqual('SELECT COUNT(*) FROM ('
+                         'SELECT '
+                         'TRUNC("timestamp",\'DD\') "$timestamp",'
+                         'SUM("votes") "$votes" '
+                         'FROM "politics"."politician" '
+                         'GROUP BY "$timestamp") "sq0"', str(count_query))
+        self.assertIn('LIMIT 25 OFFSET 50', str(query))
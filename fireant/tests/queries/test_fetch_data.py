@@ -1,21 +1,31 @@
+import io
 from unittest import TestCase
 from unittest.mock import (
     ANY,
     Mock,
+    call,
     patch,
 )
 
+import pandas as pd
+
 import fireant as f
 from fireant import Share
+from fireant.queries.pagination import (
+    make_page_token,
+    read_page_token,
+)
 from fireant.tests.dataset.matchers import (
     FieldMatcher,
     PypikaQueryMatcher,
 )
-from fireant.tests.dataset.mocks import mock_dataset
-from pypika import (
-    Order,
-    functions as fn,
+from fireant.tests.dataset.mocks import (
+    ElectionOverElection,
+    dimx1_date_df,
+    dimx2_date_str_df,
+    mock_dataset,
 )
+from pypika import Order
 
 
 # noinspection SqlDialectInspection,SqlNoDataSourceInspection
@@ -36,7 +46,7 @@ class FindShareDimensionsTests(TestCase):
 
         mock_dataset.query.widget(mock_widget).dimension(*dimensions).fetch()
 
-        mock_fetch_data.assert_called_once_with(ANY, ANY, ANY, [], ANY)
+        mock_fetch_data.assert_called_once_with(ANY, ANY, ANY, [], ANY, ANY)
 
     def test_find_share_dimensions_with_a_single_share_operation(
         self, mock_fetch_data: Mock, mock_paginate: Mock
@@ -55,7 +65,7 @@ class FindShareDimensionsTests(TestCase):
         mock_dataset.query.widget(mock_widget).dimension(*dimensions).fetch()
 
         mock_fetch_data.assert_called_once_with(
-            ANY, ANY, ANY, FieldMatcher(mock_dataset.fields.state), ANY
+            ANY, ANY, ANY, FieldMatcher(mock_dataset.fields.state), ANY, ANY
         )
 
     def test_find_share_dimensions_with_a_multiple_share_operations(
@@ -76,7 +86,7 @@ class FindShareDimensionsTests(TestCase):
         mock_dataset.query.widget(mock_widget).dimension(*dimensions).fetch()
 
         mock_fetch_data.assert_called_once_with(
-            ANY, ANY, ANY, FieldMatcher(mock_dataset.fields.state), ANY
+            ANY, ANY, ANY, FieldMatcher(mock_dataset.fields.state), ANY, ANY
         )
 
     def test_find_share_dimensions_with_a_multiple_share_operations_over_different_dimensions(
@@ -99,7 +109,7 @@ class FindShareDimensionsTests(TestCase):
         expected = FieldMatcher(
             mock_dataset.fields.state, mock_dataset.fields.political_party
         )
-        mock_fetch_data.assert_called_once_with(ANY, ANY, ANY, expected, ANY)
+        mock_fetch_data.assert_called_once_with(ANY, ANY, ANY, expected, ANY, ANY)
 
 
 # noinspection SqlDialectInspection,SqlNoDataSourceInspection
@@ -115,7 +125,7 @@ class QueryBuilderFetchDataTests(TestCase):
         mock_dataset.query.widget(mock_widget).fetch()
 
         mock_fetch_data.assert_called_once_with(
-            mock_dataset.database, ANY, ANY, ANY, ANY
+            mock_dataset.database, ANY, ANY, ANY, ANY, ANY
         )
 
     def test_pass_query_from_builder_as_arg(
@@ -136,6 +146,7 @@ class QueryBuilderFetchDataTests(TestCase):
             ANY,
             ANY,
             ANY,
+            ANY,
         )
 
     def test_builder_dimensions_as_arg_with_zero_dimensions(
@@ -146,7 +157,7 @@ class QueryBuilderFetchDataTests(TestCase):
 
         mock_dataset.query.widget(mock_widget).fetch()
 
-        mock_fetch_data.assert_called_once_with(ANY, ANY, [], ANY, ANY)
+        mock_fetch_data.assert_called_once_with(ANY, ANY, [], ANY, ANY, ANY)
 
     def test_builder_dimensions_as_arg_with_one_dimension(
         self, mock_fetch_data: Mock, mock_paginate: Mock
@@ -159,7 +170,7 @@ class QueryBuilderFetchDataTests(TestCase):
         mock_dataset.query.widget(mock_widget).dimension(*dimensions).fetch()
 
         mock_fetch_data.assert_called_once_with(
-            ANY, ANY, FieldMatcher(*dimensions), ANY, ANY
+            ANY, ANY, FieldMatcher(*dimensions), ANY, ANY, ANY
         )
 
     def test_builder_dimensions_as_arg_with_multiple_dimensions(
@@ -177,7 +188,7 @@ class QueryBuilderFetchDataTests(TestCase):
         mock_dataset.query.widget(mock_widget).dimension(*dimensions).fetch()
 
         mock_fetch_data.assert_called_once_with(
-            ANY, ANY, FieldMatcher(*dimensions), ANY, ANY
+            ANY, ANY, FieldMatcher(*dimensions), ANY, ANY, ANY
         )
 
     def test_call_transform_on_widget(self, mock_fetch_data: Mock, mock_paginate: Mock):
@@ -211,6 +222,148 @@ class QueryBuilderFetchDataTests(TestCase):
 
         self.assertListEqual(result, [mock_widget.transform.return_value])
 
+    def test_returns_results_from_widget_transform_stream_when_streaming(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        mock_widget.transform_stream = Mock()
+
+        # Need to keep widget the last call in the chain otherwise the object gets cloned and the assertion won't work
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .widget(mock_widget)
+            .fetch(stream=True)
+        )
+
+        mock_widget.transform.assert_not_called()
+        mock_widget.transform_stream.assert_called_once_with(
+            mock_paginate.return_value,
+            mock_dataset,
+            FieldMatcher(mock_dataset.fields.timestamp),
+            [],
+        )
+        self.assertListEqual(result, [mock_widget.transform_stream.return_value])
+
+    @patch("fireant.queries.builder.dataset_query_builder.transform_widgets")
+    def test_widgets_transformed_with_max_processes(
+        self, mock_transform_widgets: Mock, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_transform_widgets.return_value = ["result"]
+
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .widget(mock_widget)
+            .fetch(max_processes=4)
+        )
+
+        mock_transform_widgets.assert_called_once_with(
+            [mock_widget],
+            mock_paginate.return_value,
+            mock_dataset,
+            FieldMatcher(mock_dataset.fields.timestamp),
+            [],
+            4,
+            pivot_cache={},
+        )
+        self.assertListEqual(result, ["result"])
+
+    def test_pivot_shared_between_widgets_of_the_same_fetch(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        mock_paginate.return_value = dimx2_date_str_df
+        widgets = [
+            f.ReactTable(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]),
+            f.ReactTable(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]),
+        ]
+        query = mock_dataset.query.dimension(
+            mock_dataset.fields.timestamp, mock_dataset.fields.political_party
+        ).widget(*widgets)
+
+        with patch.object(
+            f.Pandas, "pivot_data_frame", autospec=True, side_effect=f.Pandas.pivot_data_frame
+        ) as mock_pivot_data_frame:
+            query.fetch()
+            self.assertEqual(1, mock_pivot_data_frame.call_count)
+
+            query.fetch()
+            self.assertEqual(2, mock_pivot_data_frame.call_count)
+
+
+@patch("fireant.queries.builder.dataset_query_builder.paginate")
+@patch("fireant.queries.builder.dataset_query_builder.fetch_data")
+class QueryBuilderLazyFetchTests(TestCase):
+    def _make_widgets(self):
+        widgets = [f.Widget(mock_dataset.fields.votes), f.Widget(mock_dataset.fields.wins)]
+        for widget in widgets:
+            widget.transform = Mock()
+        return widgets
+
+    def test_widgets_not_transformed_until_accessed(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        widgets = self._make_widgets()
+
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .widget(*widgets)
+            .fetch(lazy=True)
+        )
+
+        self.assertEqual(2, len(result))
+        widgets[0].transform.assert_not_called()
+        widgets[1].transform.assert_not_called()
+
+        self.assertEqual(widgets[1].transform.return_value, result[1])
+        widgets[0].transform.assert_not_called()
+        widgets[1].transform.assert_called_once_with(
+            mock_paginate.return_value,
+            mock_dataset,
+            FieldMatcher(mock_dataset.fields.timestamp),
+            [],
+        )
+        self.assertFalse(result.is_transformed(0))
+        self.assertTrue(result.is_transformed(1))
+
+    def test_widgets_transformed_once(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        widgets = self._make_widgets()
+
+        result = mock_dataset.query.widget(*widgets).fetch(lazy=True)
+
+        self.assertEqual(result[0], result[-2])
+        self.assertListEqual(
+            [widgets[0].transform.return_value, widgets[1].transform.return_value],
+            list(result),
+        )
+        widgets[0].transform.assert_called_once()
+        widgets[1].transform.assert_called_once()
+
+    def test_result_set_is_not_copied(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        widgets = self._make_widgets()
+
+        result = mock_dataset.query.widget(*widgets).fetch(lazy=True)
+
+        self.assertIs(mock_paginate.return_value, result.data_frame)
+        self.assertEqual(0, result.total_rows)
+        self.assertIsNone(result.next_page_token)
+
+    def test_widgets_transformed_as_streams(
+        self, mock_fetch_data: Mock, mock_paginate: Mock
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        mock_widget.transform_stream = Mock()
+
+        result = mock_dataset.query.widget(mock_widget).fetch(stream=True, lazy=True)
+
+        self.assertEqual(mock_widget.transform_stream.return_value, result[0])
+        mock_widget.transform.assert_not_called()
+
 
 @patch(
     "fireant.queries.builder.dataset_query_builder.scrub_totals_from_share_results",
@@ -294,3 +447,398 @@ class QueryBuilderPaginationTests(TestCase):
             offset=None,
             orders=orders,
         )
+
+    @patch.object(mock_dataset.database, "pushdown_pagination", True)
+    def test_series_pagination_not_applied_again_when_pushed_down(
+        self, mock_fetch_data: Mock, mock_paginate: Mock, *mocks
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.group_pagination = True
+        mock_widget.transform = Mock()
+
+        # Need to keep widget the last call in the chain otherwise the object gets cloned and the assertion won't work
+        mock_dataset.query.dimension(
+            mock_dataset.fields.timestamp, mock_dataset.fields.political_party
+        ).widget(mock_widget).limit(15).offset(20).fetch()
+
+        mock_paginate.assert_called_once_with(
+            mock_fetch_data.return_value,
+            [mock_widget],
+            limit=None,
+            offset=None,
+            orders=[
+                (mock_dataset.fields.timestamp, None),
+                (mock_dataset.fields.political_party, None),
+            ],
+        )
+
+    def test_total_rows_before_pagination_returned_with_widgets(
+        self, mock_fetch_data: Mock, mock_paginate: Mock, *mocks
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        mock_fetch_data.return_value = dimx1_date_df
+
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .widget(mock_widget)
+            .limit(2)
+            .fetch()
+        )
+
+        self.assertEqual(len(dimx1_date_df), result.total_rows)
+
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_paginated_data")
+    @patch.object(mock_dataset.database, "pushdown_pagination", True)
+    def test_rows_counted_with_count_query_when_pagination_pushed_down(
+        self,
+        mock_fetch_paginated_data: Mock,
+        mock_fetch_data: Mock,
+        mock_paginate: Mock,
+        *mocks
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        mock_fetch_paginated_data.return_value = dimx1_date_df, 1234
+
+        # Need to keep widget the last call in the chain otherwise the object gets cloned and the assertion won't work
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .limit(15)
+            .offset(20)
+            .widget(mock_widget)
+            .fetch()
+        )
+
+        mock_fetch_data.assert_not_called()
+        mock_fetch_paginated_data.assert_called_once_with(
+            ANY,
+            [
+                PypikaQueryMatcher(
+                    'SELECT "timestamp" "$timestamp",SUM("votes") "$votes" '
+                    'FROM "politics"."politician" '
+                    'GROUP BY "$timestamp" '
+                    'ORDER BY CASE WHEN "timestamp" IS NULL THEN 1 ELSE 0 END,"$timestamp" DESC '
+                    "LIMIT 15 OFFSET 20"
+                )
+            ],
+            PypikaQueryMatcher(
+                'SELECT COUNT(*) FROM ('
+                'SELECT "timestamp" "$timestamp",SUM("votes") "$votes" '
+                'FROM "politics"."politician" '
+                'GROUP BY "$timestamp") "sq0"'
+            ),
+            ANY,
+            ANY,
+            ANY,
+            ANY,
+        )
+        mock_paginate.assert_called_once_with(
+            dimx1_date_df,
+            [mock_widget],
+            limit=None,
+            offset=None,
+            orders=[(mock_dataset.fields.timestamp, Order.desc)],
+        )
+        self.assertEqual(1234, result.total_rows)
+        self.assertIsNone(result.next_page_token)
+
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_paginated_data")
+    def test_next_page_token_returned_when_page_is_full(
+        self,
+        mock_fetch_paginated_data: Mock,
+        mock_fetch_data: Mock,
+        mock_paginate: Mock,
+        *mocks
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        page_df = dimx1_date_df.iloc[:2]
+        mock_fetch_paginated_data.return_value = page_df, 1234
+        mock_paginate.side_effect = lambda data_frame, *args, **kwargs: data_frame
+
+        result = (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .limit(2)
+            .page_after(
+                make_page_token(
+                    dimx1_date_df.iloc[:1], [(mock_dataset.fields.timestamp, None)]
+                )
+            )
+            .widget(mock_widget)
+            .fetch()
+        )
+
+        self.assertEqual(
+            [("$timestamp", page_df.index[-1].to_pydatetime())],
+            read_page_token(result.next_page_token),
+        )
+
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_paginated_data")
+    def test_rows_before_page_token_counted_with_count_query(
+        self,
+        mock_fetch_paginated_data: Mock,
+        mock_fetch_data: Mock,
+        mock_paginate: Mock,
+        *mocks
+    ):
+        mock_widget = f.Widget(mock_dataset.fields.votes)
+        mock_widget.transform = Mock()
+        mock_fetch_paginated_data.return_value = dimx1_date_df.iloc[1:3], 1234
+
+        (
+            mock_dataset.query.dimension(mock_dataset.fields.timestamp)
+            .limit(2)
+            .page_after(
+                make_page_token(
+                    dimx1_date_df.iloc[:1], [(mock_dataset.fields.timestamp, None)]
+                )
+            )
+            .widget(mock_widget)
+            .fetch()
+        )
+
+        mock_fetch_paginated_data.assert_called_once_with(
+            ANY,
+            ANY,
+            PypikaQueryMatcher(
+                'SELECT COUNT(*) FROM ('
+                'SELECT "timestamp" "$timestamp",SUM("votes") "$votes" '
+                'FROM "politics"."politician" '
+                'GROUP BY "$timestamp") "sq0"'
+            ),
+            ANY,
+            ANY,
+            ANY,
+            ANY,
+        )
+
+
+class QueryBuilderExportTests(TestCase):
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_data_batches")
+    def test_rows_fetched_in_batches_without_limit(self, mock_fetch_data_batches: Mock):
+        mock_fetch_data_batches.return_value = iter(
+            [dimx1_date_df.iloc[:3], dimx1_date_df.iloc[3:]]
+        )
+        query = (
+            mock_dataset.query.widget(f.CSV(mock_dataset.fields.votes))
+            .dimension(f.day(mock_dataset.fields.timestamp))
+            .limit(2)
+            .offset(1)
+        )
+
+        file = io.BytesIO()
+        exported_rows = query.export(file, batch_size=3)
+
+        mock_fetch_data_batches.assert_called_once_with(
+            ANY,
+            PypikaQueryMatcher(
+                "SELECT "
+                'TRUNC("timestamp",\'DD\') "$timestamp",'
+                'SUM("votes") "$votes" '
+                'FROM "politics"."politician" '
+                'GROUP BY "$timestamp" '
+                'ORDER BY "$timestamp" DESC'
+            ),
+            ANY,
+            3,
+        )
+        self.assertEqual(len(dimx1_date_df), exported_rows)
+        self.assertEqual(
+            f.CSV(mock_dataset.fields.votes).transform(
+                dimx1_date_df,
+                mock_dataset,
+                [f.day(mock_dataset.fields.timestamp)],
+                [],
+            ),
+            file.getvalue().decode("utf-8"),
+        )
+
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_data_batches")
+    def test_progress_called_with_rows_exported_after_each_batch(
+        self, mock_fetch_data_batches: Mock
+    ):
+        mock_fetch_data_batches.return_value = iter(
+            [dimx1_date_df.iloc[:3], dimx1_date_df.iloc[3:]]
+        )
+        mock_progress = Mock()
+
+        mock_dataset.query.widget(f.CSV(mock_dataset.fields.votes)).dimension(
+            f.day(mock_dataset.fields.timestamp)
+        ).export(io.BytesIO(), batch_size=3, progress=mock_progress)
+
+        mock_progress.assert_has_calls([call(3), call(len(dimx1_date_df))])
+
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_data_batches")
+    @patch("fireant.queries.builder.dataset_query_builder.fetch_all_data")
+    def test_full_result_set_fetched_with_operations_applied_in_pandas(
+        self, mock_fetch_all_data: Mock, mock_fetch_data_batches: Mock
+    ):
+        mock_fetch_all_data.return_value = dimx1_date_df
+        widget = f.CSV(f.CumSum(mock_dataset.fields.votes))
+
+        file = io.BytesIO()
+        exported_rows = (
+            mock_dataset.query.widget(widget)
+            .dimension(f.day(mock_dataset.fields.timestamp))
+            .export(file, batch_size=3)
+        )
+
+        mock_fetch_data_batches.assert_not_called()
+        mock_fetch_all_data.assert_called_once()
+        self.assertEqual(len(dimx1_date_df), exported_rows)
+        self.assertIn("CumSum(Votes)", file.getvalue().decode("utf-8"))
+
+
+@patch.object(mock_dataset.database, "pushdown_pivot", True)
+@patch("fireant.queries.builder.dataset_query_builder.fetch_data")
+@patch("fireant.queries.builder.dataset_query_builder.fetch_pivoted_data")
+@patch("fireant.queries.builder.dataset_query_builder.fetch_pivot_values")
+class QueryBuilderPivotPushdownTests(TestCase):
+    dimensions = [f.day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+    party_values = pd.Index(["Democrat", "Independent", "Republican"])
+
+    def test_dimension_pivoted_in_query_when_its_values_fit_in_the_columns(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_pivot_values.return_value = self.party_values
+        mock_fetch_pivoted_data.return_value = dimx2_date_str_df[["$votes"]].unstack("$political_party")
+        widget = f.ReactTable(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party])
+
+        result = mock_dataset.query.widget(widget).dimension(*self.dimensions).fetch()
+
+        mock_fetch_data.assert_not_called()
+        mock_fetch_pivot_values.assert_called_once_with(
+            ANY,
+            PypikaQueryMatcher(
+                'SELECT "political_party" "$political_party" '
+                'FROM "politics"."politician" '
+                'GROUP BY "$political_party" '
+                "LIMIT 25"
+            ),
+            ANY,
+        )
+        mock_fetch_pivoted_data.assert_called_once_with(
+            ANY,
+            PypikaQueryMatcher(
+                'SELECT TRUNC("timestamp",\'DD\') "$timestamp",'
+                'SUM(CASE WHEN "political_party"=\'Democrat\' THEN "votes" END) "$votes_0",'
+                'SUM(CASE WHEN "political_party"=\'Independent\' THEN "votes" END) "$votes_1",'
+                'SUM(CASE WHEN "political_party"=\'Republican\' THEN "votes" END) "$votes_2" '
+                'FROM "politics"."politician" '
+                'GROUP BY "$timestamp"'
+            ),
+            ANY,
+            FieldMatcher(mock_dataset.fields.votes),
+            ANY,
+            self.party_values,
+        )
+        self.assertEqual(
+            widget.transform(dimx2_date_str_df, mock_dataset, self.dimensions, []),
+            result[0],
+        )
+
+    def test_dimension_pivoted_in_query_for_widgets_with_different_metrics(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_pivot_values.return_value = self.party_values
+        mock_fetch_pivoted_data.return_value = dimx2_date_str_df[["$votes", "$wins"]].unstack("$political_party")
+        votes_widget = f.ReactTable(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party])
+        wins_widget = f.ReactTable(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party])
+
+        result = mock_dataset.query.widget(votes_widget, wins_widget).dimension(*self.dimensions).fetch()
+
+        mock_fetch_data.assert_not_called()
+        for i, widget in enumerate([votes_widget, wins_widget]):
+            with self.subTest(widget=i):
+                self.assertEqual(
+                    widget.transform(dimx2_date_str_df, mock_dataset, self.dimensions, []),
+                    result[i],
+                )
+
+    def test_count_metric_pivoted_in_query_as_null_for_values_without_rows(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_pivot_values.return_value = pd.Index(["Democrat"])
+        widget = f.Pandas(mock_dataset.fields.voters, pivot=[mock_dataset.fields.political_party])
+
+        mock_dataset.query.widget(widget).dimension(*self.dimensions).fetch()
+
+        self.assertIn(
+            'CASE WHEN COUNT(CASE WHEN "politician"."political_party"=\'Democrat\' THEN 1 END)>0 '
+            'THEN COUNT(CASE WHEN "politician"."political_party"=\'Democrat\' THEN "voter"."id" END) '
+            'END "$voters_0"',
+            str(mock_fetch_pivoted_data.call_args[0][1]),
+        )
+
+    def test_dimension_pivoted_in_widgets_when_there_are_too_many_values(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_pivot_values.return_value = pd.Index(range(13))
+        mock_fetch_data.return_value = dimx2_date_str_df
+        widget = f.Pandas(
+            mock_dataset.fields.votes, mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]
+        )
+
+        mock_dataset.query.widget(widget).dimension(*self.dimensions).fetch()
+
+        # 24 columns fit 12 values of each metric
+        self.assertIn("LIMIT 13", str(mock_fetch_pivot_values.call_args[0][1]))
+        mock_fetch_pivoted_data.assert_not_called()
+        mock_fetch_data.assert_called_once()
+
+    def test_dimension_pivoted_in_widgets_when_one_of_the_values_is_null(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_pivot_values.return_value = pd.Index(["Democrat", None])
+        mock_fetch_data.return_value = dimx2_date_str_df
+        widget = f.Pandas(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party])
+
+        mock_dataset.query.widget(widget).dimension(*self.dimensions).fetch()
+
+        mock_fetch_pivoted_data.assert_not_called()
+        mock_fetch_data.assert_called_once()
+
+    def test_dimension_pivoted_in_widgets_when_not_every_widget_pivots_it(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_data.return_value = dimx2_date_str_df
+
+        mock_dataset.query.widget(
+            f.Pandas(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party]),
+            f.Pandas(mock_dataset.fields.votes),
+        ).dimension(*self.dimensions).fetch()
+
+        mock_fetch_pivot_values.assert_not_called()
+        mock_fetch_pivoted_data.assert_not_called()
+
+    def test_dimension_pivoted_in_widgets_with_references_totals_operations_or_pagination(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        query = (
+            mock_dataset.query.widget(f.Pandas(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party]))
+            .dimension(*self.dimensions)
+        )
+
+        self.assertIsNotNone(query._pushdown_pivot([]))
+        self.assertIsNone(query._pushdown_pivot([f.CumSum(mock_dataset.fields.votes)]))
+        for not_pushed_down_query in [
+            query.reference(ElectionOverElection(mock_dataset.fields.timestamp)),
+            query.dimension(f.Rollup(mock_dataset.fields.state)),
+            query.limit(10),
+            query.filter(mock_dataset.fields.votes > 10),
+        ]:
+            self.assertIsNone(not_pushed_down_query._pushdown_pivot([]))
+
+    def test_dimension_pivoted_in_widgets_without_pivot_pushdown(
+        self, mock_fetch_pivot_values: Mock, mock_fetch_pivoted_data: Mock, mock_fetch_data: Mock
+    ):
+        mock_fetch_data.return_value = dimx2_date_str_df
+
+        with patch.object(mock_dataset.database, "pushdown_pivot", False):
+            mock_dataset.query.widget(
+                f.Pandas(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party])
+            ).dimension(*self.dimensions).fetch()
+
+        mock_fetch_pivot_values.assert_not_called()
+        mock_fetch_data.assert_called_once()
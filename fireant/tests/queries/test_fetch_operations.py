@@ -6,6 +6,8 @@ from unittest.mock import (
     patch,
 )
 
+import pandas as pd
+
 import fireant as f
 from fireant.tests.dataset.mocks import (
     ElectionOverElection,
@@ -21,7 +23,7 @@ class QueryBuilderOperationsTests(TestCase):
     def test_operations_evaluated(self, mock_fetch_data: Mock, *mocks):
         mock_operation = Mock(name='mock_operation ', spec=f.Operation)
         mock_operation.alias, mock_operation.definition = 'mock_operation', mock_dataset.table.abc
-        mock_operation.metrics = []
+        mock_operation.metrics, mock_operation.operations = [], []
 
         mock_widget = f.Widget(mock_operation)
         mock_widget.transform = Mock()
@@ -42,7 +44,7 @@ class QueryBuilderOperationsTests(TestCase):
 
         mock_operation = Mock(name='mock_operation ', spec=f.Operation)
         mock_operation.alias, mock_operation.definition = 'mock_operation', mock_dataset.table.abc
-        mock_operation.metrics = []
+        mock_operation.metrics, mock_operation.operations = [], []
 
         mock_widget = f.Widget(mock_operation)
         mock_widget.transform = Mock()
@@ -65,7 +67,7 @@ class QueryBuilderOperationsTests(TestCase):
     def test_operations_results_stored_in_data_frame(self, mock_fetch_data: Mock, *mocks):
         mock_operation = Mock(name='mock_operation ', spec=f.Operation)
         mock_operation.alias, mock_operation.definition = 'mock_operation', mock_dataset.table.abc
-        mock_operation.metrics = []
+        mock_operation.metrics, mock_operation.operations = [], []
 
         mock_widget = f.Widget(mock_operation)
         mock_widget.transform = Mock()
@@ -82,3 +84,53 @@ class QueryBuilderOperationsTests(TestCase):
         f_op_key = alias_selector(mock_operation.alias)
         self.assertIn(f_op_key, mock_df)
         self.assertEqual(mock_df[f_op_key], mock_operation.apply.return_value)
+
+    def test_operations_not_evaluated_when_already_selected_in_query(self, mock_fetch_data: Mock, *mocks):
+        mock_operation = Mock(name='mock_operation ', spec=f.Operation)
+        mock_operation.alias, mock_operation.definition = 'mock_operation', mock_dataset.table.abc
+        mock_operation.metrics, mock_operation.operations = [], []
+
+        mock_widget = f.Widget(mock_operation)
+        mock_widget.transform = Mock()
+
+        f_op_key = alias_selector(mock_operation.alias)
+        mock_df = {f_op_key: Mock()}
+        mock_fetch_data.return_value = mock_df
+
+        # Need to keep widget the last call in the chain otherwise the object gets cloned and the assertion won't work
+        mock_dataset.query \
+            .dimension(mock_dataset.fields.timestamp) \
+            .widget(mock_widget) \
+            .fetch()
+
+        mock_operation.apply.assert_not_called()
+
+
+@patch('fireant.queries.builder.dataset_query_builder.fetch_data')
+class QueryBuilderCumulativeOperationsWithDeltaPercentReferenceTests(TestCase):
+    def test_cumulative_operation_evaluated_for_delta_percent_reference(self, mock_fetch_data: Mock):
+        timestamp = f.day(mock_dataset.fields.timestamp)
+        reference = f.DayOverDay(mock_dataset.fields.timestamp, delta_percent=True)
+        data_frame = pd.DataFrame(
+            {
+                '$votes': [55, 60, 108],
+                '$votes_dod_delta_percent': [10.0, 20.0, 8.0],
+            },
+            index=pd.DatetimeIndex(['2019-01-01', '2019-01-02', '2019-01-03'], name='$timestamp'),
+        )
+        mock_fetch_data.return_value = data_frame
+
+        # The reference values are 50, 50 and 100, so the delta percent of both the sum and the mean is the same
+        for operation_class in (f.CumSum, f.CumMean):
+            with self.subTest(operation_class.__name__):
+                operation = operation_class(mock_dataset.fields.votes)
+
+                result = mock_dataset.query \
+                    .widget(f.Pandas(operation)) \
+                    .dimension(timestamp) \
+                    .reference(reference) \
+                    .fetch()
+
+                values = result[0]['{} DoD Δ%'.format(operation.label)]
+                # Rows are sorted by the timestamp in descending order
+                self.assertEqual(['11.5%', '15%', '10%'], list(values))
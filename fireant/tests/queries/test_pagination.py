@@ -9,7 +9,11 @@ import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal
 
-from fireant.queries.pagination import paginate
+from fireant.queries.pagination import (
+    make_page_token,
+    paginate,
+    read_page_token,
+)
 from fireant.tests.dataset.mocks import (
     dimx2_date_bool_df,
     dimx2_date_str_df,
@@ -149,6 +153,76 @@ class SimplePaginationTests(TestCase):
         assert_frame_equal(expected, paginated)
 
 
+class TopRowsPaginationTests(TestCase):
+    mock_wins_definition = Mock(alias="$wins")
+    mock_timestamp_definition = Mock(alias=TS)
+
+    def setUp(self):
+        random = np.random.RandomState(1)
+        index = pd.MultiIndex.from_product(
+            [pd.date_range("2016-01-01", periods=50), np.arange(20)],
+            names=[TS, "$candidate-id"],
+        )
+        votes = random.randint(0, 100, len(index)).astype(float)
+        votes[random.rand(len(index)) < 0.05] = np.nan
+        self.data_frame = pd.DataFrame(
+            {"$votes": votes, "$wins": random.randint(0, 3, len(index))}, index=index
+        )
+
+    def assert_paginated_like_full_sort(self, orders, start, end):
+        paginated = paginate(
+            self.data_frame,
+            [mock_table_widget],
+            orders=orders,
+            limit=end - start,
+            offset=start,
+        )
+
+        sort = [field.alias for field, _ in orders]
+        ascending = [orientation is Order.asc for _, orientation in orders]
+        expected = self.data_frame.sort_values(
+            by=sort, ascending=ascending, kind="mergesort"
+        )[start:end]
+        assert_frame_equal(expected, paginated)
+
+    def test_top_rows_by_metric_with_ties_are_in_original_order(self):
+        self.assert_paginated_like_full_sort(
+            [(self.mock_wins_definition, Order.desc)], 0, 10
+        )
+
+    def test_top_rows_by_metric_with_nans_asc(self):
+        self.assert_paginated_like_full_sort(
+            [(mock_metric_definition, Order.asc)], 0, 50
+        )
+
+    def test_top_rows_with_offset_and_mixed_orders(self):
+        self.assert_paginated_like_full_sort(
+            [
+                (self.mock_wins_definition, Order.asc),
+                (mock_metric_definition, Order.desc),
+            ],
+            20,
+            40,
+        )
+
+    def test_top_rows_by_date_dimension(self):
+        self.assert_paginated_like_full_sort(
+            [(self.mock_timestamp_definition, Order.desc), (mock_metric_definition, Order.asc)],
+            0,
+            30,
+        )
+
+    @patch("fireant.queries.pagination._select_top_rows")
+    def test_full_sort_without_selecting_top_rows_for_large_offset(
+        self, mock_select_top_rows
+    ):
+        self.assert_paginated_like_full_sort(
+            [(mock_metric_definition, Order.desc)], 600, 700
+        )
+
+        mock_select_top_rows.assert_not_called()
+
+
 class GroupPaginationTests(TestCase):
     @patch("fireant.queries.pagination._group_paginate")
     def test_with_one_widget_using_group_pagination_that_group_pagination_is_applied(
@@ -295,3 +369,76 @@ class GroupPaginationTests(TestCase):
         paginated = paginate(dimx2_date_bool_df, [mock_chart_widget], limit=1)
         expected = dimx2_date_bool_df.loc[(slice(None), False), :]
         assert_frame_equal(expected, paginated)
+
+    def test_group_paginate_keeps_series_with_null_dimension_values_after_paginated_series(
+        self,
+    ):
+        data_frame = dimx2_date_str_df.reset_index()
+        data_frame["$political_party"] = data_frame["$political_party"].replace(
+            "Independent", np.nan
+        )
+        data_frame = data_frame.set_index(["$timestamp", "$political_party"])
+
+        paginated = paginate(
+            data_frame,
+            [mock_chart_widget],
+            limit=1,
+            orders=[(mock_metric_definition, Order.desc)],
+        )
+
+        expected = data_frame.loc[
+            data_frame.index.get_level_values(1).isin(["Republican", np.nan])
+        ]
+        expected = expected.iloc[
+            np.lexsort(
+                (
+                    pd.isnull(expected.index.get_level_values(1)),
+                    expected.index.get_level_values(0),
+                )
+            )
+        ]
+        assert_frame_equal(expected, paginated)
+
+
+class PageTokenTests(TestCase):
+    def test_page_token_holds_order_values_of_last_row(self):
+        token = make_page_token(
+            dimx2_date_str_df,
+            [(mock_metric_definition, Order.desc), (mock_dimension_definition, Order.asc)],
+        )
+
+        self.assertEqual(
+            [("$votes", 13438835), ("$political_party", "Republican")],
+            read_page_token(token),
+        )
+
+    def test_page_token_keeps_dates_and_converts_nans_to_none(self):
+        data_frame = dimx2_date_str_df.copy()
+        data_frame.iloc[-1, data_frame.columns.get_loc("$votes")] = np.nan
+        mock_timestamp_definition = Mock()
+        mock_timestamp_definition.alias = "$timestamp"
+
+        token = make_page_token(
+            data_frame,
+            [(mock_timestamp_definition, Order.asc), (mock_metric_definition, Order.asc)],
+        )
+
+        self.assertEqual(
+            [("$timestamp", pd.Timestamp("2016-01-01").to_pydatetime()), ("$votes", None)],
+            read_page_token(token),
+        )
+
+    def test_page_token_converts_missing_dates_to_none(self):
+        data_frame = pd.DataFrame(
+            {"$timestamp": [pd.Timestamp("2016-01-01"), pd.NaT]}
+        )
+        mock_timestamp_definition = Mock()
+        mock_timestamp_definition.alias = "$timestamp"
+
+        token = make_page_token(data_frame, [(mock_timestamp_definition, Order.asc)])
+
+        self.assertEqual([("$timestamp", None)], read_page_token(token))
+
+    def test_malformed_page_token_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            read_page_token("not a token")
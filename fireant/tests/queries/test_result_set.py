@@ -0,0 +1,116 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from fireant.dataset.totals import TEXT_TOTALS
+from fireant.queries.result_set import ResultSet
+from fireant.tests.dataset.mocks import (
+    dimx0_metricx2_df,
+    dimx1_str_df,
+    dimx2_date_str_df,
+    dimx2_date_str_totals_df,
+)
+
+
+class ResultSetTests(TestCase):
+    def test_convert_data_frame_with_multiindex(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+
+        self.assertListEqual(
+            ["$timestamp", "$political_party"], result_set.dimension_keys
+        )
+        self.assertEqual(len(dimx2_date_str_df), len(result_set))
+        pdt.assert_frame_equal(dimx2_date_str_df, result_set.to_data_frame())
+
+    def test_convert_data_frame_with_single_index(self):
+        result_set = ResultSet.from_data_frame(dimx1_str_df)
+
+        self.assertListEqual(["$political_party"], result_set.dimension_keys)
+        pdt.assert_frame_equal(dimx1_str_df, result_set.to_data_frame())
+
+    def test_convert_data_frame_without_dimensions(self):
+        result_set = ResultSet.from_data_frame(dimx0_metricx2_df)
+
+        self.assertListEqual([], result_set.dimension_keys)
+        pdt.assert_frame_equal(dimx0_metricx2_df, result_set.to_data_frame())
+
+    def test_codes_and_metrics_are_not_copied(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+
+        self.assertIs(dimx2_date_str_df.index.levels[1], result_set.values[1])
+        self.assertTrue(
+            np.shares_memory(
+                dimx2_date_str_df.index.labels[1], result_set.codes[1]
+            )
+        )
+        self.assertTrue(
+            np.shares_memory(
+                dimx2_date_str_df["$votes"].values, result_set.metric("$votes")
+            )
+        )
+
+    def test_slice_returns_views(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+
+        sliced = result_set[2:5]
+
+        self.assertEqual(3, len(sliced))
+        self.assertTrue(np.shares_memory(result_set.codes[0], sliced.codes[0]))
+        self.assertTrue(
+            np.shares_memory(result_set.metric("$votes"), sliced.metric("$votes"))
+        )
+        pdt.assert_frame_equal(dimx2_date_str_df[2:5], sliced.to_data_frame())
+
+    def test_select_rows_with_mask(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+        mask = result_set.dimension_mask("$political_party", "d")
+
+        pdt.assert_frame_equal(
+            dimx2_date_str_df[
+                dimx2_date_str_df.index.get_level_values(1) == "d"
+            ],
+            result_set[mask].to_data_frame(),
+        )
+
+    def test_dimension_is_categorical(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+
+        dimension = result_set.dimension("$political_party")
+
+        self.assertIsInstance(dimension, pd.Categorical)
+        self.assertListEqual(
+            list(dimx2_date_str_df.index.get_level_values(1)), list(dimension)
+        )
+
+    def test_totals_mask(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_totals_df)
+
+        self.assertListEqual(
+            list(dimx2_date_str_totals_df.index.get_level_values(1) == TEXT_TOTALS),
+            list(result_set.totals_mask("$political_party")),
+        )
+        self.assertFalse(result_set.totals_mask("$timestamp").any())
+
+    def test_fill_null_dimension(self):
+        data_frame = pd.DataFrame(
+            {"$a": ["x", None, "y", None], "$b": [1, 2, 1, 2], "$m": [1.0, 2, 3, 4]}
+        ).set_index(["$a", "$b"])
+        result_set = ResultSet.from_data_frame(data_frame)
+
+        filled = result_set.fill_null_dimension("$a", TEXT_TOTALS)
+
+        self.assertListEqual(
+            ["x", TEXT_TOTALS, "y", TEXT_TOTALS],
+            list(filled.make_index().get_level_values(0)),
+        )
+        self.assertIs(result_set.codes[1], filled.codes[1])
+        self.assertIs(result_set.metrics[0], filled.metrics[0])
+
+    def test_fill_null_dimension_without_nulls_returns_same_result_set(self):
+        result_set = ResultSet.from_data_frame(dimx2_date_str_df)
+
+        self.assertIs(
+            result_set, result_set.fill_null_dimension("$political_party", "~~")
+        )
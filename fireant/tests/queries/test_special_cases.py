@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+import pandas as pd
+import pandas.testing
+
+from fireant import RollingMean
+from fireant.queries.special_cases import adjust_dataframe_for_rolling_window
+from fireant.tests.dataset.mocks import (
+    dimx1_date_df,
+    dimx2_date_str_df,
+    mock_dataset,
+)
+
+
+class AdjustDataFrameForRollingWindowTests(TestCase):
+    def test_no_adjustment_without_rolling_operations(self):
+        result = adjust_dataframe_for_rolling_window([], dimx2_date_str_df)
+
+        pandas.testing.assert_frame_equal(dimx2_date_str_df, result)
+
+    def test_first_rows_removed_from_timeseries(self):
+        operations = [RollingMean(mock_dataset.fields.wins, 3)]
+        result = adjust_dataframe_for_rolling_window(operations, dimx1_date_df)
+
+        pandas.testing.assert_frame_equal(dimx1_date_df.iloc[2:], result)
+
+    def test_first_rows_removed_from_each_series_using_largest_window(self):
+        operations = [RollingMean(mock_dataset.fields.wins, 2), RollingMean(mock_dataset.fields.votes, 3)]
+        result = adjust_dataframe_for_rolling_window(operations, dimx2_date_str_df)
+
+        expected = dimx2_date_str_df.loc[pd.Timestamp('2004-01-01'):]
+        pandas.testing.assert_frame_equal(expected, result)
+
+    def test_series_with_null_dimension_value_removed(self):
+        data_frame = dimx2_date_str_df.reset_index()
+        data_frame.loc[data_frame['$political_party'] == 'Republican', '$political_party'] = None
+        data_frame = data_frame.set_index(['$timestamp', '$political_party'])
+
+        operations = [RollingMean(mock_dataset.fields.wins, 3)]
+        result = adjust_dataframe_for_rolling_window(operations, data_frame)
+
+        self.assertEqual({'Democrat'}, set(result.index.get_level_values(1)))
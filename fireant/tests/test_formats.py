@@ -5,6 +5,8 @@ from datetime import (
 from unittest import TestCase
 
 import numpy as np
+import pandas as pd
+import pandas.testing
 
 from fireant import (
     DataType,
@@ -125,6 +127,43 @@ class FormatRawValueTests(TestCase):
         )
 
 
+class FormatRawValuesTests(TestCase):
+    def test_float_values_converted_like_raw_value(self):
+        values = np.array([0.0, -1.1, 1.1, np.nan, np.inf, -np.inf])
+
+        result = formats.raw_values(values, number_field)
+
+        self.assertEqual([0.0, -1.1, 1.1, None, None, None], result)
+        self.assertEqual(
+            [formats.raw_value(value, number_field) for value in values], result
+        )
+
+    def test_int_values_returned_as_python_ints(self):
+        result = formats.raw_values(np.array([0, -1, 100]), number_field)
+
+        self.assertEqual([0, -1, 100], result)
+        self.assertTrue(all(type(value) is int for value in result))
+
+    def test_int_totals_marker_returned_as_totals_marker(self):
+        result = formats.raw_values(np.array([1, NUMBER_TOTALS]), number_field)
+
+        self.assertEqual([1, "$totals"], result)
+
+    def test_date_values_returned_as_iso_date_strings(self):
+        values = np.array(["2019-01-01T12:30:02", "NaT"], dtype="datetime64[ns]")
+
+        result = formats.raw_values(values, date_field)
+
+        self.assertEqual(["2019-01-01T12:30:02", None], result)
+
+    def test_text_values_converted_like_raw_value(self):
+        result = formats.raw_values(
+            np.array(["abc", None, TEXT_TOTALS], dtype=object), text_field
+        )
+
+        self.assertEqual(["abc", None, "$totals"], result)
+
+
 class FormatDisplayValueTests(TestCase):
     def test_none_returned_as_nan_value_arg(self):
         for expected in ("", "abcdefg"):
@@ -234,6 +273,79 @@ class FormatDisplayValueTests(TestCase):
                 self.assertEqual("2019", formats.display_value(d, year(date_field)))
 
 
+class FormatDisplayValuesTests(TestCase):
+    def assert_display_values_like_display_value(self, values, field, **kwargs):
+        expected = [
+            formats.display_value(value, field, **kwargs)
+            for value in pd.Series(values).tolist()
+        ]
+        self.assertEqual(expected, formats.display_values(values, field, **kwargs))
+
+    def test_number_values_formatted_like_display_value(self):
+        values = np.array([0.0, -1.1, 1234567.891, np.nan, np.inf, -np.inf])
+        fields = [
+            number_field,
+            Field("number", None, data_type=DataType.number, precision=2),
+            Field("number", None, data_type=DataType.number, thousands=","),
+            Field(
+                "number",
+                None,
+                data_type=DataType.number,
+                prefix="$",
+                suffix="€",
+                thousands=",",
+                precision=0,
+            ),
+        ]
+        for field in fields:
+            for use_raw_value in (False, True):
+                with self.subTest(field=field, use_raw_value=use_raw_value):
+                    self.assert_display_values_like_display_value(
+                        values, field, use_raw_value=use_raw_value
+                    )
+
+    def test_int_values_formatted_like_display_value(self):
+        field = Field("number", None, data_type=DataType.number, thousands=",")
+        self.assert_display_values_like_display_value(
+            np.array([0, -1, 1234567, NUMBER_TOTALS]), field
+        )
+
+    def test_nan_value_used_for_missing_numbers(self):
+        self.assertEqual(
+            ["1", ""],
+            formats.display_values(np.array([1.0, np.nan]), number_field, nan_value=""),
+        )
+
+    def test_date_values_formatted_like_display_value(self):
+        values = pd.Series(
+            pd.to_datetime(["2019-01-01", "2019-01-02", None, "2019-01-01"])
+        )
+        for interval in (day, month, year):
+            field = interval(date_field)
+            with self.subTest(field.interval_key):
+                self.assert_display_values_like_display_value(values, field)
+
+    def test_boolean_values_formatted_like_display_value(self):
+        self.assert_display_values_like_display_value(
+            np.array([True, False, True]), boolean_field
+        )
+
+    def test_text_values_formatted_like_display_value(self):
+        self.assert_display_values_like_display_value(
+            np.array(["abc", None, TEXT_TOTALS], dtype=object), text_field
+        )
+
+    def test_format_series_keeps_index_and_name(self):
+        series = pd.Series([1.0, 2.5], index=["a", "b"], name="$number")
+
+        result = formats.format_series(series, number_field)
+
+        pandas.testing.assert_series_equal(
+            pd.Series(["1", "2.5"], index=["a", "b"], name="$number", dtype=object),
+            result,
+        )
+
+
 class FormatDisplayValueStyleTests(TestCase):
     def test_style_numbers_with_prefix(self):
         dollar_field = Field("number", None, data_type=DataType.number, prefix="$")
@@ -269,3 +381,19 @@ class FormatDisplayValueStyleTests(TestCase):
     def test_use_raw_value(self):
         field = Field("number", None, data_type=DataType.number, suffix="€", prefix="$")
         self.assertEqual("1234", formats.display_value(1234, field, use_raw_value=True))
+
+
+class EncodeJSONTests(TestCase):
+    def test_nested_values_made_safe_like_json_value(self):
+        encoded = formats.encode_json(
+            {
+                "a": [1.5, np.nan, np.inf, None],
+                "b": {"c": (np.int64(2), np.float64(-np.inf), NUMBER_TOTALS)},
+                "d": TEXT_TOTALS,
+            }
+        )
+
+        self.assertEqual(
+            b'{"a":[1.5,null,"inf",null],"b":{"c":[2,"inf","$totals"]},"d":"$totals"}',
+            encoded,
+        )
@@ -0,0 +1,139 @@
+import io
+import json
+from unittest import (
+    TestCase,
+    skipIf,
+)
+
+import numpy as np
+
+from fireant import (
+    Arrow,
+    Rollup,
+    day,
+)
+from fireant.tests.dataset.mocks import (
+    ElectionOverElection,
+    dimx0_metricx1_df,
+    dimx1_date_df,
+    dimx2_date_str_ref_df,
+    dimx2_date_str_totals_df,
+    mock_dataset,
+)
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+@skipIf(pyarrow is None, "Optional dependency pyarrow is not installed")
+class ArrowWidgetTests(TestCase):
+    maxDiff = None
+
+    def read_parquet(self, data):
+        return pyarrow.parquet.read_table(io.BytesIO(data))
+
+    def test_single_metric(self):
+        result = Arrow(mock_dataset.fields.votes).transform(dimx0_metricx1_df, mock_dataset, [], [])
+
+        self.assertEqual({'votes': [111674336]}, self.read_parquet(result).to_pydict())
+
+    def test_dimensions_and_metrics_keep_their_types(self):
+        result = Arrow(mock_dataset.fields.votes, mock_dataset.fields.wins).transform(
+            dimx2_date_str_ref_df,
+            mock_dataset,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            [ElectionOverElection(mock_dataset.fields.timestamp)],
+        )
+
+        schema = self.read_parquet(result).schema
+        self.assertEqual(['timestamp', 'political_party', 'votes', 'votes_eoe', 'wins', 'wins_eoe'], schema.names)
+        self.assertTrue(pyarrow.types.is_timestamp(schema.field('timestamp').type))
+        self.assertEqual(pyarrow.string(), schema.field('political_party').type)
+        self.assertEqual(pyarrow.int64(), schema.field('votes').type)
+        self.assertEqual(pyarrow.float64(), schema.field('votes_eoe').type)
+
+    def test_labels_recorded_as_metadata(self):
+        result = Arrow(mock_dataset.fields.votes).transform(
+            dimx2_date_str_ref_df,
+            mock_dataset,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            [ElectionOverElection(mock_dataset.fields.timestamp)],
+        )
+
+        schema = self.read_parquet(result).schema
+        self.assertEqual(b'Votes EoE', schema.field('votes_eoe').metadata[b'label'])
+        self.assertEqual(
+            {
+                'dimensions': [
+                    {'alias': 'timestamp', 'label': 'Timestamp'},
+                    {'alias': 'political_party', 'label': 'Party'},
+                ],
+                'metrics': [
+                    {'alias': 'votes', 'label': 'Votes'},
+                    {'alias': 'votes_eoe', 'label': 'Votes EoE'},
+                ],
+            },
+            json.loads(schema.metadata[b'fireant'].decode('utf-8')),
+        )
+
+    def test_totals_written_as_nulls(self):
+        result = Arrow(mock_dataset.fields.votes).transform(
+            dimx2_date_str_totals_df,
+            mock_dataset,
+            [day(mock_dataset.fields.timestamp), Rollup(mock_dataset.fields.political_party)],
+            [],
+        )
+
+        political_parties = self.read_parquet(result).column('political_party').to_pylist()
+        self.assertEqual(
+            len(dimx2_date_str_totals_df.index.levels[0]),
+            political_parties.count(None),
+        )
+
+    def test_arrow_file_format(self):
+        result = Arrow(mock_dataset.fields.votes, file_format='feather').transform(
+            dimx1_date_df, mock_dataset, [day(mock_dataset.fields.timestamp)], []
+        )
+
+        table = pyarrow.ipc.open_file(pyarrow.BufferReader(result)).read_all()
+        self.assertEqual(list(dimx1_date_df['$votes']), table.column('votes').to_pylist())
+
+    def test_unknown_file_format_raises_exception(self):
+        with self.assertRaises(ValueError):
+            Arrow(mock_dataset.fields.votes, file_format='xlsx')
+
+    def test_stream_writes_a_chunk_for_each_batch(self):
+        chunks = list(
+            Arrow(mock_dataset.fields.votes).transform_stream(
+                dimx1_date_df, mock_dataset, [day(mock_dataset.fields.timestamp)], [], batch_size=2
+            )
+        )
+
+        table = self.read_parquet(b''.join(chunks))
+        self.assertEqual(len(range(0, len(dimx1_date_df), 2)) + 1, len(chunks))
+        self.assertEqual(list(dimx1_date_df['$votes']), table.column('votes').to_pylist())
+
+    def test_batches_with_nulls_cast_to_types_of_first_batch(self):
+        second_batch = dimx1_date_df.iloc[3:].copy()
+        second_batch['$votes'] = np.nan
+
+        chunks = Arrow(mock_dataset.fields.votes).transform_batches(
+            [dimx1_date_df.iloc[:3], second_batch], mock_dataset, [day(mock_dataset.fields.timestamp)], []
+        )
+
+        votes = self.read_parquet(b''.join(chunks)).column('votes')
+        self.assertEqual(pyarrow.int64(), votes.type)
+        self.assertEqual(list(dimx1_date_df['$votes'][:3]) + [None] * len(second_batch), votes.to_pylist())
+
+    def test_empty_result_set(self):
+        result = Arrow(mock_dataset.fields.votes).transform(
+            dimx1_date_df.iloc[:0], mock_dataset, [day(mock_dataset.fields.timestamp)], []
+        )
+
+        table = self.read_parquet(result)
+        self.assertEqual(0, table.num_rows)
+        self.assertEqual(['timestamp', 'votes'], table.schema.names)
@@ -3,7 +3,11 @@ from unittest import TestCase
 
 import pandas as pd
 
-from fireant import CSV
+from fireant import (
+    CSV,
+    day,
+    hour,
+)
 from fireant.tests.dataset.mocks import (
     CumSum,
     ElectionOverElection,
@@ -18,7 +22,10 @@ from fireant.tests.dataset.mocks import (
     dimx2_date_str_ref_df,
     mock_dataset,
 )
-from fireant.tests.widgets.test_pandas import _format_float
+from fireant.tests.widgets.test_pandas import (
+    _format_float,
+    _make_dimx2_date_str_df,
+)
 from fireant.utils import alias_selector as f
 
 csv_options = {'quoting': QUOTE_MINIMAL}
@@ -174,3 +181,136 @@ class CSVWidgetTests(TestCase):
         expected = expected.applymap(_format_float)
 
         self.assertEqual(expected.to_csv(**csv_options), result)
+
+    def test_all_pivoted_values_written_with_max_columns(self):
+        data_frame = _make_dimx2_date_str_df(n_values=30)
+
+        result = CSV(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party], max_columns=2) \
+            .transform(data_frame, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        header = result.splitlines()[0].split(',')
+        self.assertEqual(['Timestamp'] + ['party {:02d}'.format(i) for i in range(30)], header)
+
+
+class CSVTransformStreamTests(TestCase):
+    maxDiff = None
+
+    def assert_stream_writes_transform(self, widget, data_frame, dimensions, references=(), batch_size=2):
+        references = list(references)
+        result = widget.transform(data_frame, mock_dataset, dimensions, references)
+        chunks = list(widget.transform_stream(data_frame, mock_dataset, dimensions, references, batch_size))
+
+        self.assertEqual(result, b''.join(chunks).decode('utf-8'))
+        return chunks
+
+    def test_rows_written_in_batches(self):
+        chunks = self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes), dimx1_date_df, [mock_dataset.fields.timestamp]
+        )
+
+        self.assertEqual(3, len(chunks))
+
+    def test_no_dimensions(self):
+        self.assert_stream_writes_transform(CSV(mock_dataset.fields.votes, mock_dataset.fields.wins),
+                                            dimx0_metricx2_df, [])
+
+    def test_empty_data_frame_writes_header(self):
+        chunks = self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes), dimx1_date_df.iloc[:0], [mock_dataset.fields.timestamp]
+        )
+
+        self.assertEqual([b'Timestamp,Votes\n'], chunks)
+
+    def test_dates_written_with_time_when_any_date_has_time(self):
+        data_frame = dimx1_date_df.copy()
+        timestamps = list(data_frame.index)
+        timestamps[-1] += pd.Timedelta(hours=5)
+        data_frame.index = pd.DatetimeIndex(timestamps, name=data_frame.index.name)
+
+        chunks = self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes), data_frame, [mock_dataset.fields.timestamp]
+        )
+
+        self.assertIn(b'2004-01-01 00:00:00', chunks[1])
+
+    def test_dates_with_time_zone_written_in_one_batch(self):
+        data_frame = dimx1_date_df.copy()
+        data_frame.index = data_frame.index.tz_localize('UTC')
+
+        chunks = self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes), data_frame, [mock_dataset.fields.timestamp]
+        )
+
+        self.assertEqual(1, len(chunks))
+
+    def test_multi_dimx2_date_str_with_references(self):
+        self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes, mock_dataset.fields.wins),
+            dimx2_date_str_ref_df,
+            [mock_dataset.fields.timestamp, mock_dataset.fields.political_party],
+            [ElectionOverElection(mock_dataset.fields.timestamp)],
+        )
+
+    def test_sorted_rows(self):
+        self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.votes, sort=[1], ascending=[False]),
+            dimx2_date_str_df,
+            [mock_dataset.fields.timestamp, mock_dataset.fields.political_party],
+        )
+
+    def test_pivoted_multi_dimx2_date_str(self):
+        chunks = self.assert_stream_writes_transform(
+            CSV(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]),
+            dimx2_date_str_df,
+            [mock_dataset.fields.timestamp, mock_dataset.fields.political_party],
+        )
+
+        self.assertEqual(1, len(chunks))
+
+
+class CSVTransformBatchesTests(TestCase):
+    maxDiff = None
+
+    def assert_batches_write_transform(self, widget, data_frame, dimensions, references=(), batch_size=2):
+        references = list(references)
+        result = widget.transform(data_frame, mock_dataset, dimensions, references)
+        batches = [data_frame.iloc[start:start + batch_size] for start in range(0, max(len(data_frame), 1), batch_size)]
+        chunks = list(widget.transform_batches(iter(batches), mock_dataset, dimensions, references))
+
+        self.assertEqual(result, b''.join(chunks).decode('utf-8'))
+        return chunks
+
+    def test_each_batch_written_as_it_is_fetched(self):
+        chunks = self.assert_batches_write_transform(
+            CSV(mock_dataset.fields.votes),
+            dimx2_date_str_df,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+        )
+
+        self.assertEqual(len(range(0, len(dimx2_date_str_df), 2)), len(chunks))
+
+    def test_empty_result_set_writes_header(self):
+        chunks = self.assert_batches_write_transform(
+            CSV(mock_dataset.fields.votes), dimx1_date_df.iloc[:0], [day(mock_dataset.fields.timestamp)]
+        )
+
+        self.assertEqual([b'Timestamp,Votes\n'], chunks)
+
+    def test_dates_written_with_time_for_intervals_shorter_than_a_day(self):
+        chunks = list(
+            CSV(mock_dataset.fields.votes).transform_batches(
+                [dimx1_date_df], mock_dataset, [hour(mock_dataset.fields.timestamp)], []
+            )
+        )
+
+        self.assertIn(b'1996-01-01 00:00:00', chunks[0])
+
+    def test_sorted_rows_written_all_together(self):
+        chunks = self.assert_batches_write_transform(
+            CSV(mock_dataset.fields.votes, sort=[1], ascending=[False]),
+            dimx2_date_str_df,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+        )
+
+        self.assertEqual(1, len(chunks))
@@ -1,8 +1,11 @@
+import json
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 
 from fireant import CumSum, Rollup
+from fireant.formats import encode_json
 from fireant.tests.dataset.mocks import (
     ElectionOverElection,
     day,
@@ -3126,3 +3129,180 @@ class HighChartsPieChartTransformerTests(TestCase):
             },
             result,
         )
+
+
+class HighChartsTransformStreamTests(TestCase):
+    def assert_stream_encodes_transform(self, chart, data_frame, dimensions, references=()):
+        references = list(references)
+        result = chart.transform(data_frame, mock_dataset, dimensions, references)
+        chunks = list(
+            chart.transform_stream(data_frame, mock_dataset, dimensions, references)
+        )
+
+        self.assertEqual(json.loads(encode_json(result)), json.loads(b"".join(chunks)))
+        return chunks
+
+    def test_stream_yields_one_chunk_per_series(self):
+        data_frame = dimx2_date_str_df.copy()
+        data_frame.iloc[0, 0] = np.nan
+        data_frame.iloc[1, 0] = np.inf
+        chart = HighCharts().axis(
+            HighCharts.LineSeries(mock_dataset.fields.votes),
+            HighCharts.LineSeries(mock_dataset.fields.wins),
+        )
+
+        chunks = self.assert_stream_encodes_transform(
+            chart, data_frame, [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+        )
+
+        # The header, six series (two metrics for each of three parties) and the y-axes
+        self.assertEqual(8, len(chunks))
+
+    def test_stream_with_references_and_multiple_axes(self):
+        chart = HighCharts() \
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes)) \
+            .axis(HighCharts.ColumnSeries(mock_dataset.fields.wins))
+
+        self.assert_stream_encodes_transform(
+            chart,
+            dimx2_date_str_ref_df,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            [ElectionOverElection(mock_dataset.fields.timestamp)],
+        )
+
+    def test_stream_pie_chart(self):
+        chart = HighCharts().axis(HighCharts.PieSeries(mock_dataset.fields.wins))
+
+        self.assert_stream_encodes_transform(
+            chart, dimx1_str_df, [mock_dataset.fields.political_party]
+        )
+
+
+class HighChartsDownsampleTests(TestCase):
+    timeseries_dimensions = [day(mock_dataset.fields.timestamp)]
+
+    @staticmethod
+    def make_timeseries_df(values):
+        index = pd.date_range("2016-01-01", periods=len(values), name="$timestamp")
+        return pd.DataFrame({"$votes": values}, index=index)
+
+    def test_series_downsampled_to_max_points(self):
+        result = (
+            HighCharts(max_points=4)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+            .transform(dimx1_date_df, mock_dataset, self.timeseries_dimensions, [])
+        )
+
+        data = result["series"][0]["data"]
+        self.assertEqual(4, len(data))
+        self.assertEqual((820454400000, 15220449), data[0])
+        self.assertEqual((1451606400000, 18310513), data[-1])
+
+    def test_peaks_kept_when_downsampling(self):
+        values = np.zeros(100)
+        values[37] = 100
+        values[71] = -100
+        data_frame = self.make_timeseries_df(values)
+
+        result = (
+            HighCharts(max_points=10)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+            .transform(data_frame, mock_dataset, self.timeseries_dimensions, [])
+        )
+
+        data = result["series"][0]["data"]
+        self.assertEqual(10, len(data))
+        self.assertIn(100.0, [y for x, y in data])
+        self.assertIn(-100.0, [y for x, y in data])
+
+    def test_missing_values_only_kept_when_bucket_has_no_values(self):
+        values = np.arange(20, dtype=float)
+        values[5:9] = np.nan
+        data_frame = self.make_timeseries_df(values)
+
+        result = (
+            HighCharts(max_points=5)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+            .transform(data_frame, mock_dataset, self.timeseries_dimensions, [])
+        )
+
+        data = result["series"][0]["data"]
+        self.assertEqual(5, len(data))
+        self.assertNotIn(None, [y for x, y in data])
+
+    def test_series_with_fewer_points_than_max_not_downsampled(self):
+        chart = HighCharts().axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+        downsampled_chart = HighCharts(max_points=6).axis(
+            HighCharts.LineSeries(mock_dataset.fields.votes)
+        )
+
+        self.assertEqual(
+            chart.transform(dimx1_date_df, mock_dataset, self.timeseries_dimensions, []),
+            downsampled_chart.transform(
+                dimx1_date_df, mock_dataset, self.timeseries_dimensions, []
+            ),
+        )
+
+    def test_series_max_points_overrides_chart_max_points(self):
+        result = (
+            HighCharts(max_points=5)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes, max_points=3))
+            .transform(dimx1_date_df, mock_dataset, self.timeseries_dimensions, [])
+        )
+
+        self.assertEqual(3, len(result["series"][0]["data"]))
+
+    def test_references_downsampled_to_same_points_as_series(self):
+        dimensions = [
+            day(mock_dataset.fields.timestamp),
+            mock_dataset.fields.political_party,
+        ]
+        references = [ElectionOverElection(mock_dataset.fields.timestamp)]
+
+        result = (
+            HighCharts(max_points=3)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+            .transform(dimx2_date_str_ref_df, mock_dataset, dimensions, references)
+        )
+
+        series = result["series"]
+        self.assertEqual(4, len(series))
+        for base, reference in zip(series[::2], series[1::2]):
+            with self.subTest(base["name"]):
+                self.assertEqual(3, len(base["data"]))
+                self.assertEqual(
+                    [x for x, y in base["data"]], [x for x, y in reference["data"]]
+                )
+
+    def test_totals_series_downsampled(self):
+        dimensions = [
+            day(mock_dataset.fields.timestamp),
+            Rollup(mock_dataset.fields.political_party),
+        ]
+
+        result = (
+            HighCharts(max_points=3)
+            .axis(HighCharts.LineSeries(mock_dataset.fields.votes))
+            .transform(dimx2_date_str_totals_df, mock_dataset, dimensions, [])
+        )
+
+        self.assertEqual("Votes (Totals)", result["series"][-1]["name"])
+        for series in result["series"]:
+            with self.subTest(series["name"]):
+                self.assertLessEqual(len(series["data"]), 3)
+
+    def test_category_series_not_downsampled(self):
+        data_frame = pd.DataFrame(
+            {"$votes": np.arange(10)},
+            index=pd.Index(list("abcdefghij"), name="$political_party"),
+        )
+
+        result = (
+            HighCharts(max_points=3)
+            .axis(HighCharts.ColumnSeries(mock_dataset.fields.votes))
+            .transform(
+                data_frame, mock_dataset, [mock_dataset.fields.political_party], []
+            )
+        )
+
+        self.assertEqual(10, len(result["series"][0]["data"]))
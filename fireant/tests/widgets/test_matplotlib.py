@@ -25,5 +25,11 @@ try:
 
             self.assertEqual(1, len(result))
 
+        def test_transform_stream_raises_exception(self):
+            chart = Matplotlib().axis(self.chart_class(mock_dataset.fields.votes))
+
+            with self.assertRaises(NotImplementedError):
+                list(chart.transform_stream(dimx1_date_df, mock_dataset, [mock_dataset.fields.timestamp], []))
+
 except ImportError:
     pass
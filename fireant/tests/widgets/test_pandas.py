@@ -1,5 +1,7 @@
 import copy
+import json
 from unittest import TestCase
+from unittest.mock import patch
 
 import numpy as np
 import pandas as pd
@@ -30,6 +32,14 @@ def _format_float(x):
     return '{:,.0f}'.format(x)
 
 
+def _make_dimx2_date_str_df(n_values):
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2016-01-01', periods=3), ['party {:02d}'.format(i) for i in range(n_values)]],
+        names=[f('timestamp'), f('political_party')],
+    )
+    return pd.DataFrame({f('votes'): np.arange(len(index)), f('wins'): np.arange(len(index))}, index=index)
+
+
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
@@ -171,6 +181,109 @@ class PandasTransformerTests(TestCase):
 
         pandas.testing.assert_frame_equal(expected, result)
 
+    def test_transform_stream_yields_pivoted_data_frame_as_json(self):
+        dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields.political_party]
+        widget = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party])
+
+        chunks = list(widget.transform_stream(dimx2_date_str_df, mock_dataset, dimensions, []))
+        result = json.loads(b''.join(chunks).decode('utf-8'))
+
+        expected = widget.transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+        self.assertEqual(['Democrat', 'Independent', 'Republican'], result['columns'])
+        self.assertEqual('1996-01-01T00:00:00.000Z', result['index'][0])
+        self.assertEqual(expected.values.tolist(), result['data'])
+
+    def test_pivoted_dimx2_date_str_with_max_columns(self):
+        result = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party], max_columns=2) \
+            .transform(dimx2_date_str_df, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        expected = dimx2_date_str_df.copy()[[f('wins')]]
+        expected = expected.unstack(level=[1])
+        expected.index.names = ['Timestamp']
+        expected.columns = ['Democrat', 'Independent', 'Republican']
+        expected.columns.names = ['Party']
+        expected = expected.reindex(columns=pd.Index(['Democrat', 'Independent', '...'], name='Party'))
+        expected = expected.applymap(_format_float)
+
+        pandas.testing.assert_frame_equal(expected, result)
+
+    def test_pivoted_dimx2_date_str_metricx2_with_max_columns_per_metric(self):
+        result = Pandas(mock_dataset.fields.votes, mock_dataset.fields.wins,
+                        pivot=[mock_dataset.fields.political_party], max_columns=5) \
+            .transform(dimx2_date_str_df, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        self.assertEqual([('Votes', 'Democrat'), ('Votes', 'Independent'), ('Votes', '...'),
+                          ('Wins', 'Democrat'), ('Wins', 'Independent'), ('Wins', '...')], list(result.columns))
+        self.assertEqual(len(dimx2_date_str_df.index.levels[0]), len(result))
+
+    def test_rows_kept_when_pivoted_values_beyond_max_columns(self):
+        data_frame = dimx2_date_str_df.drop('Democrat', level=1)
+
+        result = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party], max_columns=1) \
+            .transform(data_frame, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        self.assertEqual(['Independent', '...'], list(result.columns))
+        self.assertEqual(len(data_frame.index.levels[0]), len(result))
+
+    def test_pivoted_dimx1_str_with_max_columns(self):
+        result = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party], max_columns=2) \
+            .transform(dimx1_str_df, mock_dataset, [mock_dataset.fields.political_party], [])
+
+        self.assertEqual(['Democrat', 'Independent', '...'], list(result.columns))
+
+    def test_all_pivoted_values_kept_without_max_columns(self):
+        data_frame = _make_dimx2_date_str_df(n_values=30)
+
+        result = Pandas(mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party]) \
+            .transform(data_frame, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        self.assertEqual(30, len(result.columns))
+        self.assertNotIn('...', list(result.columns))
+
+    def test_pivoted_values_dropped_with_max_columns_when_transposed(self):
+        result = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party], transpose=True,
+                        max_columns=2) \
+            .transform(dimx2_date_str_df, mock_dataset,
+                       [mock_dataset.fields.timestamp, mock_dataset.fields.political_party], [])
+
+        self.assertEqual([('Wins', 'Democrat'), ('Wins', 'Independent'), ('Wins', '...')], list(result.index))
+        self.assertEqual([''] * 6, list(result.loc[('Wins', '...')]))
+
+    def test_pivot_shared_between_widgets_with_same_settings(self):
+        dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields.political_party]
+        data_frame = dimx2_date_str_df.copy()
+        widgets = [
+            Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]),
+            Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party]),
+            Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party], transpose=True),
+        ]
+
+        pivot_cache = {}
+
+        with patch.object(Pandas, 'pivot_data_frame', autospec=True,
+                          side_effect=Pandas.pivot_data_frame) as mock_pivot_data_frame:
+            results = [widget.transform(data_frame, mock_dataset, dimensions, [], pivot_cache=pivot_cache)
+                       for widget in widgets]
+
+        self.assertEqual(2, mock_pivot_data_frame.call_count)
+        self.assertEqual(2, len(pivot_cache))
+        pandas.testing.assert_frame_equal(results[0], results[1])
+
+    def test_pivot_not_shared_without_pivot_cache(self):
+        dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields.political_party]
+        widget = Pandas(mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party])
+
+        with patch.object(Pandas, 'pivot_data_frame', autospec=True,
+                          side_effect=Pandas.pivot_data_frame) as mock_pivot_data_frame:
+            widget.transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+            widget.transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+
+        self.assertEqual(2, mock_pivot_data_frame.call_count)
+
     def test_time_series_ref(self):
         dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields.political_party]
         references = [ElectionOverElection(mock_dataset.fields.timestamp)]
@@ -274,6 +387,20 @@ class PandasTransformerTests(TestCase):
 
         pandas.testing.assert_frame_equal(expected, result)
 
+    def test_data_frame_pivoted_in_query_is_not_pivoted_again(self):
+        dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields.political_party]
+        pivoted_df = dimx2_date_str_df[[f('votes'), f('wins')]].unstack(f('political_party'))
+
+        for transpose in (False, True):
+            widget = Pandas(mock_dataset.fields.votes, mock_dataset.fields.wins,
+                            pivot=[mock_dataset.fields.political_party], transpose=transpose)
+
+            with patch.object(pd.DataFrame, 'unstack', side_effect=AssertionError):
+                result = widget.transform(pivoted_df, mock_dataset, dimensions, [])
+
+            expected = widget.transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+            pandas.testing.assert_frame_equal(expected, result)
+
 
 class PandasTransformerSortTests(TestCase):
     def test_metricx2_sort_index_asc(self):
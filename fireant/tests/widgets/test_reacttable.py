@@ -1,10 +1,20 @@
+import json
 from unittest import TestCase
 
+import numpy as np
+
 from fireant import (
     DataType,
     Rollup,
     day,
 )
+from fireant.dataset.totals import NUMBER_TOTALS
+from fireant.formats import (
+    display_value,
+    encode_json,
+    raw_value,
+    return_none,
+)
 from fireant.tests.dataset.mocks import (
     CumSum,
     ElectionOverElection,
@@ -1637,6 +1647,17 @@ class ReactTableTransformerTests(TestCase):
             result,
         )
 
+    def test_data_frame_pivoted_in_query(self):
+        dimensions = [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+        pivoted_df = dimx2_date_str_df[["$votes", "$wins"]].unstack("$political_party")
+        widget = ReactTable(
+            mock_dataset.fields.votes, mock_dataset.fields.wins, pivot=[mock_dataset.fields.political_party],
+        )
+
+        result = widget.transform(pivoted_df, mock_dataset, dimensions, [])
+
+        self.assertEqual(widget.transform(dimx2_date_str_df, mock_dataset, dimensions, []), result)
+
 
 class ReactTableHyperlinkTransformerTests(TestCase):
     maxDiff = None
@@ -1849,3 +1870,192 @@ class ReactTableReferenceItemFormatTests(TestCase):
         ref_item = ReferenceItem(mock_dataset.fields.wins_with_style, ref)
 
         self.assert_object_dict(ref_item, exp_ref_item, self.ref_item_attrs)
+
+
+class ReactTableMetricValuesTests(TestCase):
+    def assert_same_as_formatting_each_value(self, values, field):
+        cells = ReactTable.transform_metric_values(values, field)
+
+        expected = []
+        for value in values.tolist():
+            data = {"raw": raw_value(value, field)}
+            display = display_value(
+                value, field, date_as=return_none, nan_value="", null_value=""
+            )
+            if display is not None:
+                data["display"] = display
+            expected.append(data)
+
+        self.assertEqual(expected, cells)
+        self.assertEqual(
+            [type(data["raw"]) for data in expected],
+            [type(data["raw"]) for data in cells],
+        )
+
+    def test_float_values_with_nan_and_inf(self):
+        values = np.array([1234.5678, np.nan, np.inf, -np.inf, -0.5, 0.0, 1e12])
+
+        for field in (
+            mock_dataset.fields.votes,
+            mock_dataset.fields.turnout,
+            mock_dataset.fields.wins_with_style,
+            mock_dataset.fields.wins,
+        ):
+            with self.subTest(field.alias):
+                self.assert_same_as_formatting_each_value(values, field)
+
+    def test_int_values_with_totals_marker(self):
+        values = np.array([1234567, -5, 0, NUMBER_TOTALS])
+
+        for field in (mock_dataset.fields.votes, mock_dataset.fields.wins_with_style):
+            with self.subTest(field.alias):
+                self.assert_same_as_formatting_each_value(values, field)
+
+    def test_values_of_text_and_boolean_fields(self):
+        self.assert_same_as_formatting_each_value(
+            np.array(["a", None, "b"], dtype=object), mock_dataset.fields.state
+        )
+        self.assert_same_as_formatting_each_value(
+            np.array([True, False]), mock_dataset.fields.winner
+        )
+
+
+class ReactTableMaxColumnsTests(TestCase):
+    def test_dropped_pivoted_date_values_marked_by_column(self):
+        dimensions = [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+        result = ReactTable(
+            mock_dataset.fields.votes, pivot=[mock_dataset.fields.timestamp], max_columns=2
+        ).transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+
+        self.assertEqual(
+            [
+                {"Header": "Party", "accessor": "$political_party"},
+                {"Header": "1996-01-01", "accessor": "$votes.1996-01-01T00:00:00"},
+                {"Header": "2000-01-01", "accessor": "$votes.2000-01-01T00:00:00"},
+                {"Header": "...", "accessor": "$votes.$$$"},
+            ],
+            result["columns"],
+        )
+        self.assertEqual({"raw": None, "display": ""}, result["data"][0]["$votes"]["$$$"])
+
+    def test_dropped_pivoted_values_of_transposed_table_marked_by_row(self):
+        dimensions = [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+        result = ReactTable(
+            mock_dataset.fields.votes,
+            pivot=[mock_dataset.fields.political_party],
+            transpose=True,
+            max_columns=2,
+        ).transform(dimx2_date_str_df, mock_dataset, dimensions, [])
+
+        self.assertEqual(
+            {"raw": "...", "display": "..."}, result["data"][-1]["$political_party"]
+        )
+
+
+class ReactTableFormatDataFrameTests(TestCase):
+    def test_metrics_level_named_without_copying_or_modifying_data_frame(self):
+        data_frame = dimx2_date_str_df.copy()
+
+        result = ReactTable.format_data_frame(data_frame)
+
+        self.assertEqual("$metrics", result.columns.name)
+        self.assertIsNone(data_frame.columns.name)
+        self.assertTrue(np.shares_memory(data_frame["$votes"].values, result["$votes"].values))
+
+
+class ReactTableTransformStreamTests(TestCase):
+    def assert_stream_encodes_transform(self, table, data_frame, dimensions, **kwargs):
+        result = table.transform(data_frame, mock_dataset, dimensions, [])
+        chunks = list(
+            table.transform_stream(data_frame, mock_dataset, dimensions, [], **kwargs)
+        )
+
+        self.assertEqual(json.loads(encode_json(result)), json.loads(b"".join(chunks)))
+        return chunks
+
+    def test_stream_yields_columns_then_batches_of_rows(self):
+        data_frame = dimx2_date_str_df.copy()
+        data_frame.iloc[0, 0] = np.nan
+        data_frame.iloc[1, 1] = np.inf
+        table = ReactTable(mock_dataset.fields.votes, mock_dataset.fields.wins)
+
+        chunks = self.assert_stream_encodes_transform(
+            table,
+            data_frame,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            batch_size=5,
+        )
+
+        # The columns, three batches of rows and the closing brackets
+        self.assertEqual(5, len(chunks))
+
+    def test_stream_pivoted_table_with_single_metric(self):
+        table = ReactTable(
+            mock_dataset.fields.votes, pivot=[mock_dataset.fields.political_party]
+        )
+
+        self.assert_stream_encodes_transform(
+            table,
+            dimx2_date_str_df,
+            [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party],
+            batch_size=2,
+        )
+
+    def test_stream_empty_table(self):
+        table = ReactTable(mock_dataset.fields.votes)
+
+        self.assert_stream_encodes_transform(
+            table, dimx1_date_df.iloc[:0], [day(mock_dataset.fields.timestamp)]
+        )
+
+
+class ReactTableSparseTests(TestCase):
+    dimensions = [day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+
+    def assert_sparse_omits_null_cells(self, **kwargs):
+        dense = ReactTable(mock_dataset.fields.votes, mock_dataset.fields.wins, **kwargs).transform(
+            dimx2_date_str_df, mock_dataset, self.dimensions, []
+        )
+        sparse = ReactTable(mock_dataset.fields.votes, mock_dataset.fields.wins, sparse=True, **kwargs).transform(
+            dimx2_date_str_df, mock_dataset, self.dimensions, []
+        )
+
+        def omit_null_cells(cells):
+            return {
+                key: omit_null_cells(value) if "raw" not in value else value
+                for key, value in cells.items()
+                if value.get("raw", True) is not None
+            }
+
+        self.assertEqual(dense["columns"], sparse["columns"])
+        self.assertEqual([omit_null_cells(row) for row in dense["data"]], sparse["data"])
+        return sparse
+
+    def test_sparse_pivot_omits_null_cells(self):
+        result = self.assert_sparse_omits_null_cells(pivot=[mock_dataset.fields.political_party])
+
+        self.assertEqual(
+            {
+                "$timestamp": {"display": "2000-01-01", "raw": "2000-01-01T00:00:00"},
+                "$votes": {
+                    "Democrat": {"display": "8,294,949", "raw": 8294949},
+                    "Republican": {"display": "8,367,068", "raw": 8367068},
+                },
+                "$wins": {
+                    "Democrat": {"display": "0", "raw": 0},
+                    "Republican": {"display": "2", "raw": 2},
+                },
+            },
+            result["data"][1],
+        )
+
+    def test_sparse_transposed_pivot_omits_null_cells(self):
+        self.assert_sparse_omits_null_cells(pivot=[mock_dataset.fields.political_party], transpose=True)
+
+    def test_sparse_pivot_of_all_dimensions_omits_null_cells(self):
+        self.assert_sparse_omits_null_cells(
+            pivot=[day(mock_dataset.fields.timestamp), mock_dataset.fields.political_party]
+        )
+
+    def test_sparse_table_without_nulls_is_unchanged(self):
+        self.assert_sparse_omits_null_cells()
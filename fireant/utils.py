@@ -3,12 +3,12 @@ import csv
 import inspect
 import tempfile
 from collections import OrderedDict
-from functools import (
-    partial,
-    wraps,
-)
+from functools import wraps
 from types import GeneratorType
 
+import numpy as np
+import pandas as pd
+
 
 def immutable(func):
     """
@@ -173,12 +173,22 @@ def apply_kwargs(f, *args, **kwargs):
 
 def filter_kwargs(f):
     """
-    Removes any kwargs from function call that are not accepted by the called function.
+    Removes any kwargs from function call that are not accepted by the called function. The accepted kwargs are read
+    once, when the function is decorated.
 
     :param f:
     :return:
     """
-    return partial(apply_kwargs, f)
+    argspec = inspect.getfullargspec(f)
+    allowed = set(argspec.args[-len(argspec.defaults or ()) :])
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not argspec.varkw:
+            kwargs = {key: kwarg for key, kwarg in kwargs.items() if key in allowed}
+        return f(*args, **kwargs)
+
+    return wrapper
 
 
 def flatten(items):
@@ -246,6 +256,36 @@ def reduce_data_frame_levels(data_frame, level):
     return reduced
 
 
+def upcast_numeric(values, precision=None):
+    """
+    Converts the values of a series, or of each column of a data frame, from floats or integers of less than 64 bits to
+    64 bit floats or integers. This is used for calculations on downcast metrics which need the full range and precision
+    of the values. Values which are not downcast are returned as they are.
+
+    :param values:
+        A series or a data frame.
+    :param precision:
+        (Optional) The precision of the values. Floats are rounded to it, which restores the values exactly when they
+        had no more decimals than the precision before they were downcast.
+    """
+    if isinstance(values, pd.DataFrame):
+        if not any(_is_downcast(dtype) for dtype in values.dtypes):
+            return values
+        return values.apply(upcast_numeric, precision=precision)
+
+    if not isinstance(values, pd.Series) or not _is_downcast(values.dtype):
+        return values
+    if values.dtype.kind == "i":
+        return values.astype(np.int64)
+
+    upcast = values.astype(np.float64)
+    return upcast if precision is None else upcast.round(precision)
+
+
+def _is_downcast(dtype):
+    return dtype.kind in "fi" and dtype.itemsize < 8
+
+
 def read_csv(fp):
     """
     Read a csv file and return its content.
@@ -1,3 +1,4 @@
+from .arrow import Arrow
 from .base import Widget
 from .csv import CSV
 from .highcharts import HighCharts
@@ -0,0 +1,270 @@
+import json
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from fireant.dataset.fields import (
+    DataType,
+    Field,
+)
+from fireant.dataset.totals import (
+    DATE_TOTALS,
+    NUMBER_TOTALS,
+    TOTALS_MARKERS,
+)
+from fireant.utils import alias_selector
+from .base import (
+    ReferenceItem,
+    TransformableWidget,
+)
+
+PARQUET = "parquet"
+ARROW = "arrow"
+FEATHER = "feather"
+
+# Feather version 2 files are Arrow IPC files
+FILE_FORMATS = {PARQUET: PARQUET, ARROW: ARROW, FEATHER: ARROW}
+
+# The key of the schema metadata that describes the dimensions and metrics in the file
+METADATA_KEY = b"fireant"
+
+
+class Arrow(TransformableWidget):
+    """
+    Writes the result set to a columnar binary file, either Parquet or the Arrow IPC file format (Feather version 2).
+    Unlike CSV, the values are written without formatting and keep their data types. The dimensions and metrics are
+    written as columns named by their aliases, and their labels are recorded as metadata. The values of dimensions are
+    null in rows with totals, the same as in the result set of a SQL query with `ROLLUP`.
+
+    Requires the optional dependency pyarrow.
+    """
+
+    def __init__(self, metric: Field, *metrics: Iterable[Field], file_format=PARQUET):
+        super(Arrow, self).__init__(metric, *metrics)
+
+        if file_format not in FILE_FORMATS:
+            raise ValueError(
+                "Unknown file format '{}', must be one of: {}.".format(
+                    file_format, ", ".join(sorted(FILE_FORMATS))
+                )
+            )
+        self.file_format = file_format
+
+    def transform(self, data_frame, dataset, dimensions, references):
+        """
+        Transforms the result set into a Parquet or Arrow IPC file.
+
+        :param data_frame:
+            The result set data frame
+        :param dataset:
+            The dataset that is in use.
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :return:
+            The contents of the file in bytes.
+        """
+        return b"".join(self.transform_batches([data_frame], dataset, dimensions, references))
+
+    def transform_stream(self, data_frame, dataset, dimensions, references, batch_size=100000):
+        """
+        Transforms the result set like `transform`, but yields the contents of the file in chunks of bytes, one for
+        each Parquet row group or Arrow record batch of `batch_size` rows.
+        """
+        batches = (
+            data_frame.iloc[start : start + batch_size]
+            for start in range(0, max(len(data_frame), 1), batch_size)
+        )
+        yield from self.transform_batches(batches, dataset, dimensions, references)
+
+    def transform_batches(self, batches, dataset, dimensions, references):
+        """
+        Transforms a result set that is fetched in batches of rows, writing each batch as a Parquet row group or Arrow
+        record batch as soon as it is fetched.
+
+        :param batches:
+            An iterable of data frames containing the rows of the result set.
+        :param dataset:
+            The dataset that is in use.
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :return:
+            A generator of bytes, which joined together are the contents of the file.
+        """
+        pa = _import_pyarrow()
+
+        items = [
+            item if reference is None else ReferenceItem(item, reference)
+            for item in self.items
+            for reference in [None] + list(references)
+        ]
+
+        sink = _ChunkSink()
+        writer, schema = None, None
+        for batch_df in batches:
+            table = self._make_table(pa, batch_df, dimensions, items)
+
+            if writer is None:
+                schema = table.schema
+                writer = self._make_writer(sink, schema)
+            else:
+                # The types of columns with nulls can differ between batches, for example integers become floats
+                table = table.cast(schema)
+
+            writer.write_table(table)
+            yield sink.read_chunk()
+
+        if writer is None:
+            schema = self._make_table(pa, pd.DataFrame(), dimensions, items).schema
+            writer = self._make_writer(sink, schema)
+        writer.close()
+        yield sink.read_chunk()
+
+    def _make_writer(self, sink, schema):
+        if FILE_FORMATS[self.file_format] == PARQUET:
+            import pyarrow.parquet as pq
+
+            return pq.ParquetWriter(sink, schema)
+
+        import pyarrow.ipc
+
+        return pyarrow.ipc.new_file(sink, schema)
+
+    @staticmethod
+    def _make_table(pa, data_frame, dimensions, items):
+        """
+        Converts a data frame of the result set into an Arrow table, with a column for each dimension followed by a
+        column for each metric and reference.
+        """
+        is_empty = data_frame.empty and not len(data_frame.columns)
+
+        fields, arrays = [], []
+        for dimension in dimensions:
+            key = alias_selector(dimension.alias)
+            values = (
+                pd.Index([], dtype=_get_empty_dtype(dimension))
+                if is_empty
+                else data_frame.index.get_level_values(key)
+            )
+            arrays.append(_make_array(pa, values, dimension))
+            fields.append(_make_field(pa, dimension, arrays[-1].type))
+
+        for item in items:
+            values = (
+                pd.Series([], dtype=_get_empty_dtype(item))
+                if is_empty
+                else data_frame[alias_selector(item.alias)]
+            )
+            arrays.append(_make_array(pa, values, item, is_dimension=False))
+            fields.append(_make_field(pa, item, arrays[-1].type))
+
+        metadata = {
+            METADATA_KEY: json.dumps(
+                {
+                    "dimensions": [_describe(dimension) for dimension in dimensions],
+                    "metrics": [_describe(item) for item in items],
+                }
+            ).encode("utf-8")
+        }
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata=metadata))
+
+
+class _ChunkSink:
+    """
+    A file-like object for pyarrow writers, which keeps the bytes written since they were last read.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        self.position += len(chunk)
+        return len(chunk)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def read_chunk(self):
+        chunk = b"".join(self.chunks)
+        self.chunks = []
+        return chunk
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(
+            "Optional dependency pyarrow missing. Please install fireant[arrow] to use the Arrow widget."
+        )
+    return pyarrow
+
+
+def _get_empty_dtype(field):
+    return {
+        DataType.date: "datetime64[ns]",
+        DataType.number: "float64",
+        DataType.boolean: "bool",
+    }.get(field.data_type, "object")
+
+
+def _make_array(pa, values, field, is_dimension=True):
+    """
+    Converts the values of a dimension or metric into an Arrow array, with nulls for NaN values and, for dimensions,
+    totals markers.
+    """
+    values = pd.Series(values)
+    is_null = values.isnull().values
+    if is_dimension:
+        is_null |= _is_totals_marker(values)
+
+    if values.dtype.kind in "Mifub":
+        tz = values.dt.tz if values.dtype.kind == "M" else None
+        # The values of dates with a time zone are in UTC
+        arrow_type = pa.timestamp("ns", tz=str(tz)) if tz is not None else None
+        return pa.array(
+            values.values, mask=is_null if is_null.any() else None, type=arrow_type
+        )
+
+    objects = values.tolist()
+    for i in np.flatnonzero(is_null):
+        objects[i] = None
+
+    arrow_type = pa.string() if field.data_type == DataType.text else None
+    return pa.array(objects, type=arrow_type)
+
+
+def _is_totals_marker(values):
+    if values.dtype.kind == "M":
+        return values.values.view("int64") == DATE_TOTALS.value
+    if values.dtype.kind in "if":
+        return values.values == NUMBER_TOTALS
+    if values.dtype.kind == "O":
+        return values.isin(TOTALS_MARKERS).values
+    return np.zeros(len(values), dtype=bool)
+
+
+def _make_field(pa, field, arrow_type):
+    return pa.field(
+        field.alias,
+        arrow_type,
+        metadata={b"label": str(field.label or field.alias).encode("utf-8")},
+    )
+
+
+def _describe(field):
+    return {"alias": field.alias, "label": field.label or field.alias}
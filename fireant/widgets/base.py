@@ -1,9 +1,12 @@
 from typing import Union
 
+import pandas as pd
+
 from fireant.dataset.fields import Field
 from fireant.dataset.operations import Operation
 from fireant.dataset.references import Reference
 from fireant.exceptions import DataSetException
+from fireant.formats import encode_json
 from fireant.reference_helpers import (
     reference_alias,
     reference_label,
@@ -62,6 +65,15 @@ class TransformableWidget(Widget):
     # should be applied to the number of series rather than the number of data points.
     group_pagination = False
 
+    # Widgets are transformed at the same time in a thread pool when `fetch` is called with `max_processes`. Widgets
+    # must not modify the data frame they transform, since it is shared. This attribute can be overridden for widgets
+    # that can not be transformed in another thread.
+    thread_safe = True
+
+    # Widgets that pivot the result set can share the pivoted data frames of the other widgets transformed by the same
+    # `fetch`. This attribute is overridden for widgets whose transform methods accept a `pivot_cache` dict.
+    shares_pivots = False
+
     def transform(self, data_frame, dataset, dimensions, references):
         """
         - Main entry point -
@@ -82,6 +94,44 @@ class TransformableWidget(Widget):
         """
         raise NotImplementedError()
 
+    def transform_stream(self, data_frame, dataset, dimensions, references):
+        """
+        Transforms the result set like `transform`, but yields the output encoded as JSON in chunks of bytes. Widgets
+        with large outputs encode them part by part, so the whole output is never held in memory at once.
+
+        :param data_frame:
+            The data frame containing the data. Index must match the dimensions parameter.
+        :param dataset:
+            The dataset that is in use.
+        :param dimensions:
+            A list of dimensions that are being rendered.
+        :param references:
+            A list of references that are being rendered.
+        :return:
+            A generator of bytes, which joined together are the JSON encoding of the output of `transform`.
+        """
+        yield encode_json(self.transform(data_frame, dataset, dimensions, references))
+
+    def transform_batches(self, batches, dataset, dimensions, references):
+        """
+        Transforms a result set that is fetched in batches of rows, yielding the output in chunks of bytes like
+        `transform_stream`. Widgets that can transform each batch on its own do so as the batches are fetched, otherwise
+        the batches are concatenated and transformed all together.
+
+        :param batches:
+            An iterable of data frames containing the rows of the result set.
+        :param dataset:
+            The dataset that is in use.
+        :param dimensions:
+            A list of dimensions that are being rendered.
+        :param references:
+            A list of references that are being rendered.
+        :return:
+            A generator of bytes, which joined together are the output of `transform_stream` for the whole result set.
+        """
+        data_frame = pd.concat(list(batches))
+        yield from self.transform_stream(data_frame, dataset, dimensions, references)
+
 
 class ReferenceItem:
     def __init__(self, item, reference):
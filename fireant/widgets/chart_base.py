@@ -18,9 +18,12 @@ class Series:
     needs_marker = False
     stacking = None
 
-    def __init__(self, metric: Union[Field, Operation], stacking=None):
+    def __init__(
+        self, metric: Union[Field, Operation], stacking=None, max_points=None
+    ):
         self.metric = metric
         self.stacking = self.stacking or stacking
+        self.max_points = max_points
 
     def __repr__(self):
         return "{}({})".format(self.__class__.__name__, repr(self.metric))
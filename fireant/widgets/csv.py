@@ -1,18 +1,152 @@
 from _csv import QUOTE_MINIMAL
 from typing import Iterable
 
-from fireant.dataset.fields import Field
+import pandas as pd
+
+from fireant import formats
+from fireant.dataset.fields import (
+    DataType,
+    Field,
+)
 
 from .pandas import Pandas
 
+# The intervals of date dimensions which only have dates without a time
+DATE_INTERVAL_KEYS = {"day", "week", "month", "quarter", "year"}
+NANOSECONDS_PER_SECOND = 10 ** 9
+NANOSECONDS_PER_DAY = 24 * 60 * 60 * NANOSECONDS_PER_SECOND
+
 
 class CSV(Pandas):
     def __init__(self, metric: Field, *metrics: Iterable[Field], group_pagination=False, **kwargs):
         super().__init__(metric, *metrics, **kwargs)
         self.group_pagination = group_pagination
+        # Exports are written in full, so pivoted columns are never dropped
+        self.column_limit = None
+
+    def transform(self, data_frame, slicer, dimensions, references, pivot_cache=None):
+        result_df = super(CSV, self).transform(
+            data_frame, slicer, dimensions, references, True, pivot_cache
+        )
+        return self._to_csv(result_df)
+
+    def transform_stream(
+        self, data_frame, slicer, dimensions, references, batch_size=10000, pivot_cache=None
+    ):
+        """
+        Transforms a data frame into CSV like `transform`, but yields the output encoded as UTF-8 in chunks of bytes.
+        Unless dimensions are pivoted or the data frame is transposed, the rows are formatted and written in batches
+        from the result set, so that only one batch of formatted rows is held in memory at a time.
+
+        :param data_frame:
+            The result set data frame
+        :param slicer:
+            The slicer that is in use.
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :param batch_size:
+            The number of rows to write in each chunk.
+        :param pivot_cache:
+            A dict of the pivoted data frames shared with other widgets. See `pivot_result_set`.
+        :return:
+            A generator of bytes, which joined together are the output of `transform` encoded as UTF-8.
+        """
+        if self.pivot or self.transpose:
+            yield self.transform(data_frame, slicer, dimensions, references, pivot_cache).encode("utf-8")
+            return
+
+        result_df, items = self._select_metrics(data_frame, dimensions, references)
+        result_df = self.sort_data_frame(result_df)
+
+        # A date index is written with the format that fits all of its dates, so the format is chosen up front for all
+        # batches. When the format can not be chosen up front, the rows are written in a single batch.
+        date_format = None
+        if isinstance(result_df.index, pd.DatetimeIndex):
+            date_format = _get_date_format(result_df.index)
+            if date_format is None:
+                batch_size = max(len(result_df), 1)
+
+        for start in range(0, max(len(result_df), 1), batch_size):
+            yield self._transform_batch(
+                result_df.iloc[start : start + batch_size],
+                dimensions,
+                items,
+                header=start == 0,
+                date_format=date_format,
+            )
+
+    def transform_batches(self, batches, slicer, dimensions, references):
+        """
+        Transforms a result set that is fetched in batches of rows into CSV, yielding the output encoded as UTF-8 in
+        chunks of bytes. Unless dimensions are pivoted, the data frame is transposed or sorted, each batch is formatted
+        and written as soon as it is fetched.
+
+        Since the dates in later batches are not known when the first batch is written, dates are written with their
+        time unless every date dimension has an interval of a day or longer.
 
-    def transform(self, data_frame, slicer, dimensions, references):
-        result_df = super(CSV, self).transform(data_frame, slicer, dimensions, references, True)
+        :param batches:
+            An iterable of data frames containing the rows of the result set.
+        :param slicer:
+            The slicer that is in use.
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :return:
+            A generator of bytes, one chunk for each batch.
+        """
+        if self.pivot or self.transpose or self.sort:
+            yield from super(CSV, self).transform_batches(batches, slicer, dimensions, references)
+            return
+
+        date_format = _get_date_format_for_dimensions(dimensions)
+        for i, batch_df in enumerate(batches):
+            result_df, items = self._select_metrics(batch_df, dimensions, references)
+            yield self._transform_batch(result_df, dimensions, items, header=i == 0, date_format=date_format)
+
+    def _transform_batch(self, result_df, dimensions, items, **kwargs):
+        formatted_df = self.add_formatting(dimensions, items, result_df, True).fillna(value=formats.BLANK_VALUE)
+        return self._to_csv(formatted_df, **kwargs).encode("utf-8")
+
+    @staticmethod
+    def _to_csv(result_df, **kwargs):
         # Unset the column level names because they're a bit confusing in a csv file
         result_df.columns.names = [None] * len(result_df.columns.names)
-        return result_df.to_csv(na_rep='', quoting=QUOTE_MINIMAL)
+        return result_df.to_csv(na_rep='', quoting=QUOTE_MINIMAL, **kwargs)
+
+
+def _get_date_format(index):
+    """
+    Returns the date format that `to_csv` uses for a whole date index. Only the date is written when none of the dates
+    has a time, otherwise the date and time are written.
+
+    :param index:
+        A pandas DatetimeIndex.
+    :return:
+        The date format, or None for dates with a time zone or fractions of seconds, which are written in formats that
+        can not be given as a date format.
+    """
+    nanoseconds = index.asi8[~index.isna()]
+
+    if index.tz is not None or (nanoseconds % NANOSECONDS_PER_SECOND).any():
+        return None
+    if (nanoseconds % NANOSECONDS_PER_DAY).any():
+        return "%Y-%m-%d %H:%M:%S"
+    return "%Y-%m-%d"
+
+
+def _get_date_format_for_dimensions(dimensions):
+    """
+    Returns a date format for the date dimensions of a result set, which only writes the date when every date dimension
+    has an interval of a day or longer.
+    """
+    interval_keys = [
+        getattr(dimension, "interval_key", None)
+        for dimension in dimensions
+        if dimension.data_type == DataType.date
+    ]
+    if interval_keys and all(key in DATE_INTERVAL_KEYS for key in interval_keys):
+        return "%Y-%m-%d"
+    return "%Y-%m-%d %H:%M:%S"
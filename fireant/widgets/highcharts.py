@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 import itertools
+import numpy as np
 import pandas as pd
 
 from fireant import (
@@ -8,7 +9,11 @@ from fireant import (
     utils,
 )
 from fireant.dataset.fields import DataType
-from fireant.dataset.totals import TOTALS_MARKERS
+from fireant.dataset.totals import (
+    DATE_TOTALS,
+    TOTALS_MARKERS,
+)
+from fireant.formats import encode_json
 from fireant.reference_helpers import (
     reference_alias,
     reference_label,
@@ -65,13 +70,19 @@ class HighCharts(ChartWidget, TransformableWidget):
     group_pagination = True
 
     def __init__(
-        self, title=None, colors=None, x_axis_visible=True, tooltip_visible=True
+        self,
+        title=None,
+        colors=None,
+        x_axis_visible=True,
+        tooltip_visible=True,
+        max_points=None,
     ):
         super(HighCharts, self).__init__()
         self.title = title
         self.colors = colors or DEFAULT_COLORS
         self.x_axis_visible = x_axis_visible
         self.tooltip_visible = tooltip_visible
+        self.max_points = max_points
 
     def __repr__(self):
         return ".".join(["HighCharts()"] + [repr(axis) for axis in self.items])
@@ -95,8 +106,75 @@ class HighCharts(ChartWidget, TransformableWidget):
         :return:
             A dict meant to be dumped as JSON.
         """
-        colors = itertools.cycle(self.colors)
+        data_frame, dimension_fields, is_timeseries = self._prepare(
+            data_frame, dimensions
+        )
+
+        y_axes = []
+        series = list(
+            self._render_axes_series(
+                data_frame, dimension_fields, references, is_timeseries, y_axes
+            )
+        )
+
+        return {
+            "title": {"text": self.title},
+            "xAxis": self._render_x_axis(data_frame, dimensions, slicer.fields),
+            "yAxis": y_axes,
+            "colors": self.colors,
+            "series": series,
+            "tooltip": self._render_chart_tooltip(),
+            "legend": {"useHTML": True},
+        }
+
+    def transform_stream(self, data_frame, slicer, dimensions, references):
+        """
+        Transforms a data frame into HighCharts JSON format like `transform`, but yields the output encoded as JSON in
+        chunks of bytes. Each series is rendered and encoded on its own, so that only one series is held in memory at a
+        time. The y-axes are encoded after the series, since their colors depend on the series that were rendered.
+
+        :param data_frame:
+            The data frame containing the data. Index must match the dimensions parameter.
+        :param slicer:
+            The slicer that is in use.
+        :param dimensions:
+            A list of dimensions that are being rendered.
+        :param references:
+            A list of references that are being rendered.
+        :return:
+            A generator of bytes, which joined together are the JSON encoding of the output of `transform`.
+        """
+        data_frame, dimension_fields, is_timeseries = self._prepare(
+            data_frame, dimensions
+        )
+
+        header = {
+            "title": {"text": self.title},
+            "xAxis": self._render_x_axis(data_frame, dimensions, slicer.fields),
+            "colors": self.colors,
+            "tooltip": self._render_chart_tooltip(),
+            "legend": {"useHTML": True},
+        }
+        # Strip the closing brace of the encoded header, since the series and y-axes follow in the same object
+        yield encode_json(header)[:-1] + b',"series":['
+
+        y_axes = []
+        for i, series in enumerate(
+            self._render_axes_series(
+                data_frame, dimension_fields, references, is_timeseries, y_axes
+            )
+        ):
+            yield (b"," if i else b"") + encode_json(series)
 
+        yield b'],"yAxis":' + encode_json(y_axes) + b"}"
+
+    def _prepare(self, data_frame, dimensions):
+        """
+        Prepares the data frame for rendering and finds the fields of its dimensions.
+
+        :return:
+            A tuple of the data frame, the dimension fields and whether the chart is a time series.
+        """
         is_timeseries = dimensions and dimensions[0].data_type == DataType.date
 
         dimension_map = {
@@ -114,14 +192,31 @@ class HighCharts(ChartWidget, TransformableWidget):
         if is_timeseries and len(data_frame) > 0:
             data_frame = self._remove_date_totals(data_frame)
 
-        # Group the results by index levels after the 0th, one for each series
-        # This will result in a series for every combination of dimension values and each series will contain a data set
-        # across the 0th dimension (used for the x-axis)
-        series_data_frames = self._group_by_series(data_frame)
+        return data_frame, dimension_fields, is_timeseries
+
+    def _render_axes_series(
+        self, data_frame, dimension_fields, references, is_timeseries, y_axes
+    ):
+        """
+        Renders the series of every axis, one at a time. The y-axes configurations are added to the `y_axes` list as
+        the series of each axis are rendered.
+
+        :param data_frame:
+        :param dimension_fields:
+        :param references:
+        :param is_timeseries:
+        :param y_axes:
+            A list which the y-axes configurations are inserted into.
+        :return:
+            A generator of series configurations.
+        """
+        colors = itertools.cycle(self.colors)
+
+        # The x and y values are converted once for the whole data frame and sliced for each series
+        series_data = SeriesData(data_frame, is_timeseries)
 
         total_num_series = sum([len(axis) for axis in self.items])
 
-        y_axes, series = [], []
         for axis_idx, axis in enumerate(self.items):
             # Tee the colors iterator so we can peek at the next color. The next color in the iterator becomes the
             # axis color. The first series on each axis should match the axis color, and will progress the colors
@@ -135,32 +230,22 @@ class HighCharts(ChartWidget, TransformableWidget):
                 axis_idx, axis_color if 1 < total_num_series else None, references
             )
 
-            series += self._render_series(
+            yield from self._render_series(
                 axis,
                 axis_idx,
                 axis_color,
                 colors,
                 data_frame,
-                series_data_frames,
+                series_data,
                 dimension_fields,
                 references,
-                is_timeseries,
             )
 
-        x_axis = self._render_x_axis(data_frame, dimensions, slicer.fields)
-
+    def _render_chart_tooltip(self):
         return {
-            "title": {"text": self.title},
-            "xAxis": x_axis,
-            "yAxis": y_axes,
-            "colors": self.colors,
-            "series": series,
-            "tooltip": {
-                "shared": True,
-                "useHTML": True,
-                "enabled": self.tooltip_visible,
-            },
-            "legend": {"useHTML": True},
+            "shared": True,
+            "useHTML": True,
+            "enabled": self.tooltip_visible,
         }
 
     def _render_x_axis(self, data_frame, dimensions, fields):
@@ -241,10 +326,9 @@ class HighCharts(ChartWidget, TransformableWidget):
         axis_color,
         colors,
         data_frame,
-        series_data_frames,
+        series_data,
         dimension_fields,
         references,
-        is_timeseries=False,
     ):
         """
         Renders the series configuration.
@@ -255,58 +339,67 @@ class HighCharts(ChartWidget, TransformableWidget):
         :param axis_idx:
         :param axis_color:
         :param colors:
-        :param series_data_frames:
+        :param series_data:
         :param dimension_fields:
         :param references:
-        :param is_timeseries:
         :return:
+            A generator of series configurations.
         """
 
-        hc_series = []
         for series in axis:
             # Pie Charts, do not break data out into groups, render all data in one pie chart series
             if isinstance(series, self.PieSeries):
                 # Pie charts do not group the data up by series so render them separately and then go to the next series
                 for reference in [None] + references:
-                    hc_series.append(
-                        self._render_pie_series(
-                            series.metric, reference, data_frame, dimension_fields
-                        )
+                    yield self._render_pie_series(
+                        series.metric,
+                        reference,
+                        data_frame,
+                        series_data,
+                        dimension_fields,
                     )
                 continue
 
             # For other series types, create a highcharts series for each group (combination of dimension values)
 
+            # Time series with more points than the maximum are downsampled, keeping the same points for the references
+            max_points = series.max_points or self.max_points
+            groups = (
+                series_data.downsample(
+                    utils.alias_selector(series.metric.alias),
+                    series.metric,
+                    max_points,
+                )
+                if max_points and series_data.is_timeseries
+                else series_data.groups
+            )
+
             symbols = itertools.cycle(MARKER_SYMBOLS)
-            for (dimension_values, group_df), symbol in zip(
-                series_data_frames, symbols
-            ):
+            for (dimension_values, positions), symbol in zip(groups, symbols):
                 dimension_values = utils.wrap_list(dimension_values)
                 dimension_label = self._format_dimension_values(
                     dimension_fields[1:], dimension_values
                 )
 
-                hc_series += self._render_highcharts_series(
+                yield from self._render_highcharts_series(
                     series,
-                    group_df,
+                    series_data,
+                    positions,
                     references,
                     dimension_label,
-                    is_timeseries,
                     symbol,
                     axis_idx,
                     axis_color,
                     next(colors),
                 )
 
-        return hc_series
-
     def _render_highcharts_series(
         self,
         series,
-        series_df,
+        series_data,
+        positions,
         references,
         dimension_label,
-        is_timeseries,
         symbol,
         axis_idx,
         axis_color,
@@ -319,19 +412,17 @@ class HighCharts(ChartWidget, TransformableWidget):
         - With multiple axes, use the same color for the entire axis and only change the dash style
 
         :param series:
-        :param series_df:
+        :param series_data:
+        :param positions:
+            The positions of the rows of the series in the data frame.
         :param references:
         :param dimension_label:
-        :param is_timeseries:
         :param symbol:
         :param axis_idx:
         :param axis_color:
         :param series_color:
         :return:
         """
-        if is_timeseries:
-            series_df = series_df.sort_index(level=0)
-
         results = []
         for reference, dash_style in zip(
             [None] + references, itertools.cycle(DASH_STYLES)
@@ -346,13 +437,7 @@ class HighCharts(ChartWidget, TransformableWidget):
                 "name": "{} ({})".format(metric_label, dimension_label)
                 if dimension_label
                 else metric_label,
-                "data": (
-                    self._render_timeseries_data(series_df, field_alias, series.metric)
-                    if is_timeseries
-                    else self._render_category_data(
-                        series_df, field_alias, series.metric
-                    )
-                ),
+                "data": series_data.render(positions, field_alias, series.metric),
                 "tooltip": self._render_tooltip(series.metric, reference),
                 "yAxis": (
                     "{}_{}".format(axis_idx, reference.alias)
@@ -376,49 +461,6 @@ class HighCharts(ChartWidget, TransformableWidget):
 
         return results
 
-    @staticmethod
-    def _render_category_data(group_df, field_alias, metric):
-        categories = (
-            list(group_df.index.levels[0])
-            if isinstance(group_df.index, pd.MultiIndex)
-            else list(group_df.index)
-        )
-
-        series = []
-        for labels, y in group_df[field_alias].iteritems():
-            label = labels[0] if isinstance(labels, tuple) else labels
-            if pd.isnull(label):
-                # ignore nans in index
-                continue
-
-            series.append(
-                {"x": categories.index(label), "y": formats.raw_value(y, metric)}
-            )
-
-        return series
-
-    @staticmethod
-    def _render_timeseries_data(group_df, metric_alias, metric):
-        series = []
-        for dimension_values, y in group_df[metric_alias].iteritems():
-            first_dimension_value = utils.wrap_list(dimension_values)[0]
-
-            # Ignore empty result sets where the only row is totals
-            if first_dimension_value in TOTALS_MARKERS:
-                continue
-
-            if pd.isnull(first_dimension_value):
-                # Ignore totals on the x-axis.
-                continue
-
-            series.append(
-                (
-                    formats.date_as_millis(first_dimension_value),
-                    formats.raw_value(y, metric),
-                )
-            )
-        return series
-
     def _render_tooltip(self, metric, reference):
         return {
             "valuePrefix": reference_prefix(metric, reference),
@@ -426,17 +468,18 @@ class HighCharts(ChartWidget, TransformableWidget):
             "valueDecimals": metric.precision,
         }
 
-    def _render_pie_series(self, metric, reference, data_frame, dimension_fields):
+    def _render_pie_series(
+        self, metric, reference, data_frame, series_data, dimension_fields
+    ):
         metric_alias = utils.alias_selector(metric.alias)
+        names = self._format_dimension_values_for_rows(
+            dimension_fields, data_frame.index
+        )
 
-        data = []
-        for dimension_values, y in data_frame[metric_alias].iteritems():
-            dimension_values = utils.wrap_list(dimension_values)
-            name = self._format_dimension_values(dimension_fields, dimension_values)
-
-            data.append(
-                {"name": name or metric.label, "y": formats.raw_value(y, metric),}
-            )
+        data = [
+            {"name": name or metric.label, "y": y}
+            for name, y in zip(names, series_data.y_values(metric_alias, metric))
+        ]
 
         return {
             "name": reference_label(metric, reference),
@@ -471,17 +514,278 @@ class HighCharts(ChartWidget, TransformableWidget):
 
         return data_frame
 
-    @staticmethod
-    def _group_by_series(data_frame):
-        if len(data_frame) == 0 or not isinstance(data_frame.index, pd.MultiIndex):
-            return [([], data_frame)]
-
-        levels = data_frame.index.names[1:]
-        return data_frame.groupby(level=levels, sort=False)
-
     @staticmethod
     def _format_dimension_values(dimension_fields, dimension_values):
         return ", ".join(
             str.strip(formats.display_value(value, dimension_field) or str(value))
             for value, dimension_field in zip(dimension_values, dimension_fields)
         )
+
+    @staticmethod
+    def _format_dimension_values_for_rows(dimension_fields, index):
+        """
+        Formats the dimension values of each row of an index, like `_format_dimension_values`. Each distinct value of a
+        dimension is only formatted once.
+        """
+        formatted = [{} for _ in dimension_fields]
+
+        def format_value(level, value):
+            if value not in formatted[level]:
+                formatted[level][value] = str.strip(
+                    formats.display_value(value, dimension_fields[level]) or str(value)
+                )
+            return formatted[level][value]
+
+        return [
+            ", ".join(
+                format_value(level, value)
+                for level, value in zip(
+                    range(len(dimension_fields)), utils.wrap_list(dimension_values)
+                )
+            )
+            for dimension_values in index
+        ]
+
+
+class SeriesData:
+    """
+    The data points of a chart, converted once for the whole result set and then sliced for each series. A series is
+    a combination of the values of the dimensions after the first one, which is used for the x-axis.
+    """
+
+    def __init__(self, data_frame, is_timeseries):
+        self.data_frame = data_frame
+        self.is_timeseries = is_timeseries
+        self.x_values, self.is_point = self._make_x_values()
+        self.groups = self._group_by_series()
+        self._y_values = {}
+        self._downsampled_groups = {}
+
+    def _make_x_values(self):
+        """
+        Converts the first dimension into the x values of the data points. Dates are converted into epoch milliseconds
+        and categories into their position in the x-axis categories.
+
+        :return:
+            A tuple of the array of x values and a boolean array of which rows are drawn as data points.
+        """
+        index = self.data_frame.index
+        is_mi = isinstance(index, pd.MultiIndex)
+        first_level = index.get_level_values(0) if is_mi else index
+
+        # Ignore nans in the index
+        is_point = ~pd.isnull(first_level)
+
+        if not self.is_timeseries:
+            categories = index.levels[0] if is_mi else index
+            if not categories.is_unique:
+                # Categories are numbered by their first position
+                categories = categories[~categories.duplicated()]
+            return categories.get_indexer(first_level), is_point
+
+        # Ignore empty result sets where the only row is totals
+        if isinstance(first_level, pd.DatetimeIndex):
+            is_point &= first_level != DATE_TOTALS
+            millis = first_level.values.astype("datetime64[ms]").astype(np.int64)
+            return millis, is_point
+
+        is_point &= ~first_level.isin(TOTALS_MARKERS)
+        millis = np.array(
+            [
+                formats.date_as_millis(value) if point else 0
+                for value, point in zip(first_level, is_point)
+            ],
+            dtype=np.int64,
+        )
+        return millis, is_point
+
+    def _group_by_series(self):
+        """
+        Finds the rows of each series.
+
+        :return:
+            A list of tuples of the dimension values of the series and an array of the positions of its data points in
+            the data frame, in the order they appear in the data frame. The data points of a time series are sorted by
+            date.
+        """
+        data_frame = self.data_frame
+        if len(data_frame) == 0 or not isinstance(data_frame.index, pd.MultiIndex):
+            groups = [([], np.arange(len(data_frame)))]
+        else:
+            levels = data_frame.index.names[1:]
+            indices = data_frame.groupby(level=levels, sort=False).indices
+            groups = sorted(indices.items(), key=lambda group: group[1][0])
+
+        if self.is_timeseries:
+            groups = [
+                (
+                    dimension_values,
+                    positions[np.argsort(self.x_values[positions], kind="mergesort")],
+                )
+                for dimension_values, positions in groups
+            ]
+
+        return [
+            (dimension_values, positions[self.is_point[positions]])
+            for dimension_values, positions in groups
+        ]
+
+    def y_values(self, metric_alias, metric):
+        """
+        Returns an array of the raw values of a metric for every row of the data frame.
+        """
+        if metric_alias not in self._y_values:
+            values = np.empty(len(self.data_frame), dtype=object)
+            values[:] = formats.raw_values(self.data_frame[metric_alias], metric)
+            self._y_values[metric_alias] = values
+
+        return self._y_values[metric_alias]
+
+    def downsample(self, metric_alias, metric, max_points):
+        """
+        Downsamples every series to at most a maximum number of points with the Largest-Triangle-Three-Buckets
+        algorithm, which keeps the points that contribute most to the shape of the series. The points are selected
+        based on the values of a metric. The first and last point of each series are always kept.
+
+        :param metric_alias:
+            The alias selector of the metric column used to select the points.
+        :param metric:
+            The metric field.
+        :param max_points:
+            The maximum number of points in each series. At least 3 points are kept.
+        :return:
+            A list of tuples of the dimension values and the positions of the selected data points of each series, like
+            `groups`.
+        """
+        key = (metric_alias, max_points)
+        if key in self._downsampled_groups:
+            return self._downsampled_groups[key]
+
+        n_out = max(max_points, 3)
+        y_values = self.data_frame[metric_alias].values
+        if y_values.dtype.kind not in "biuf":
+            # Points are selected evenly when the values are not numbers
+            y_values = np.zeros(len(y_values))
+
+        series_positions = [
+            positions for _, positions in self.groups if len(positions) > n_out
+        ]
+        selected = iter(
+            _largest_triangle_three_buckets(
+                self.x_values, y_values.astype(float), series_positions, n_out
+            )
+        )
+
+        groups = [
+            (
+                dimension_values,
+                next(selected) if len(positions) > n_out else positions,
+            )
+            for dimension_values, positions in self.groups
+        ]
+        self._downsampled_groups[key] = groups
+        return groups
+
+    def render(self, positions, metric_alias, metric):
+        """
+        Renders the data points of a series.
+
+        :param positions:
+            The positions of the data points of the series in the data frame.
+        :param metric_alias:
+            The alias selector of the metric column.
+        :param metric:
+            The metric field.
+        :return:
+            A list of tuples of epoch milliseconds and values for a time series, otherwise a list of dicts of the
+            category position and value.
+        """
+        x_values = self.x_values[positions].tolist()
+        y_values = self.y_values(metric_alias, metric)[positions].tolist()
+
+        if self.is_timeseries:
+            return list(zip(x_values, y_values))
+        return [{"x": x, "y": y} for x, y in zip(x_values, y_values)]
+
+
+def _largest_triangle_three_buckets(x_values, y_values, series_positions, n_out):
+    """
+    Selects the points of several series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The points of each series, other than the first and last, are divided into `n_out - 2` buckets of equal size. From
+    each bucket, the point which forms the largest triangle with the point selected from the previous bucket and the
+    average of the next bucket is selected. The buckets are processed one at a time, but for all series at once.
+
+    :param x_values:
+        An array of the x values of all rows.
+    :param y_values:
+        An array of the y values of all rows, as floats.
+    :param series_positions:
+        A list of arrays of the positions of the points of each series, sorted by x. Each series must have more than
+        `n_out` points.
+    :param n_out:
+        The number of points to select from each series.
+    :return:
+        A list of arrays of the positions of the selected points of each series.
+    """
+    if not series_positions:
+        return []
+
+    lengths = np.array([len(positions) for positions in series_positions])
+    n_series, max_length = len(lengths), lengths.max()
+    rows = np.arange(n_series)
+
+    # Pad the series to the same length so that the buckets of every series are processed together
+    padded = np.zeros((n_series, max_length), dtype=int)
+    is_point = np.arange(max_length) < lengths[:, None]
+    padded[is_point] = np.concatenate(series_positions)
+
+    x = x_values[padded].astype(float)
+    x -= x[:, :1]
+    y = y_values[padded]
+    is_value = is_point & ~np.isnan(y)
+    y = np.where(is_value, y, 0.0)
+
+    # Cumulative sums for the averages of the next buckets, with a leading zero
+    zeros = np.zeros((n_series, 1))
+    x_sums = np.hstack([zeros, np.cumsum(np.where(is_value, x, 0.0), axis=1)])
+    y_sums = np.hstack([zeros, np.cumsum(y, axis=1)])
+    counts = np.hstack([zeros, np.cumsum(is_value, axis=1)])
+
+    # The bounds of the buckets of each series, the first and last point are buckets of their own
+    bounds = np.arange(n_out - 1)[None, :] * (lengths[:, None] - 2) // (n_out - 2) + 1
+
+    selected = np.zeros((n_series, n_out), dtype=int)
+    selected[:, -1] = lengths - 1
+    for bucket in range(n_out - 2):
+        start, end = bounds[:, bucket], bounds[:, bucket + 1]
+        next_end = bounds[:, bucket + 2] if bucket + 2 < n_out - 1 else lengths
+
+        # The average of the next bucket, or the last point for the last bucket
+        next_counts = counts[rows, next_end] - counts[rows, end]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average_x = (x_sums[rows, next_end] - x_sums[rows, end]) / next_counts
+            average_y = (y_sums[rows, next_end] - y_sums[rows, end]) / next_counts
+        average_x = np.where(next_counts > 0, average_x, x[rows, next_end - 1])
+        average_y = np.where(next_counts > 0, average_y, 0.0)
+
+        previous = selected[:, bucket]
+        previous_x, previous_y = x[rows, previous], y[rows, previous]
+
+        columns = start[:, None] + np.arange((end - start).max())
+        in_bucket = columns < end[:, None]
+        columns = np.minimum(columns, max_length - 1)
+        bucket_x, bucket_y = x[rows[:, None], columns], y[rows[:, None], columns]
+
+        areas = np.abs(
+            (previous_x - average_x)[:, None] * (bucket_y - previous_y[:, None])
+            - (previous_x[:, None] - bucket_x) * (average_y - previous_y)[:, None]
+        )
+        # Prefer points with values over missing values, which are only selected when a bucket has no values
+        areas[~is_value[rows[:, None], columns]] = -1
+        areas[~in_bucket] = -2
+        selected[:, bucket + 1] = start + np.argmax(areas, axis=1)
+
+    return [
+        positions[points] for positions, points in zip(series_positions, selected)
+    ]
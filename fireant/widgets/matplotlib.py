@@ -22,13 +22,15 @@ MAP_SERIES_TO_PLOT_FUNC = {
 
 
 class Matplotlib(ChartWidget, TransformableWidget):
+    # pyplot keeps the current figure in global state, so charts can not be plotted at the same time
+    thread_safe = False
+
     def __init__(self, title=None):
         super(Matplotlib, self).__init__()
         self.title = title
 
     def transform(self, data_frame, slicer, dimensions, references):
         import matplotlib.pyplot as plt
-        data_frame = data_frame.copy()
 
         n_axes = len(self.items)
         figsize = (14, 5 * n_axes)
@@ -62,10 +64,12 @@ class Matplotlib(ChartWidget, TransformableWidget):
 
         return plt_axes
 
+    def transform_stream(self, data_frame, slicer, dimensions, references):
+        raise NotImplementedError("Matplotlib charts can not be encoded as JSON. Use `transform` instead.")
+
     @staticmethod
     def get_plot_func_for_series_type(pd_series, label, chart_series):
-        pd_series.name = label
-        plot = pd_series.plot
+        plot = pd_series.rename(label).plot
         plot_func_name = MAP_SERIES_TO_PLOT_FUNC[type(chart_series)]
         plot_func = getattr(plot, plot_func_name)
         return plot_func
@@ -1,7 +1,8 @@
-import pandas as pd
 from functools import partial
 from typing import Iterable
 
+import pandas as pd
+
 from fireant import formats
 from fireant.dataset.fields import Field
 from fireant.utils import (
@@ -15,8 +16,15 @@ from .base import (
 
 HARD_MAX_COLUMNS = 24
 
+# The pivoted value of the column added for each metric when pivoted values are dropped to fit in `max_columns`
+TRUNCATED_COLUMNS_VALUE = "..."
+
 
 class Pandas(TransformableWidget):
+    # The transform methods accept a `pivot_cache` dict, which is shared by the widgets transformed by the same `fetch`.
+    # See `pivot_result_set`.
+    shares_pivots = True
+
     def __init__(
         self,
         metric: Field,
@@ -37,8 +45,12 @@ class Pandas(TransformableWidget):
             if max_columns is not None
             else HARD_MAX_COLUMNS
         )
+        # Pivoted columns are only dropped when a maximum number of columns is given
+        self.column_limit = self.max_columns if max_columns is not None else None
 
-    def transform(self, data_frame, slicer, dimensions, references, use_raw_values=False):
+    def transform(
+        self, data_frame, slicer, dimensions, references, use_raw_values=False, pivot_cache=None
+    ):
         """
         WRITEME
 
@@ -47,38 +59,116 @@ class Pandas(TransformableWidget):
         :param dimensions:
         :param references:
         :param use_raw_values: Don't add prefix or postfix to values
+        :param pivot_cache: A dict of the pivoted data frames shared with other widgets. See `pivot_result_set`.
         :return:
         """
-        result = data_frame.copy()
+        result, items = self._select_metrics(data_frame, dimensions, references)
+
+        pivot_dimensions = [
+            dimension.label or dimension.alias for dimension in self.pivot
+        ]
+        pivot_df = self.pivot_result_set(result, pivot_dimensions, pivot_cache)
+
+        return self.add_formatting(dimensions, items, pivot_df, use_raw_values).fillna(
+            value=formats.BLANK_VALUE
+        )
+
+    def transform_stream(self, data_frame, slicer, dimensions, references, pivot_cache=None):
+        """
+        Transforms the result set like `transform`, but yields the data frame encoded as JSON, split into its columns,
+        index and data, such as `{"columns":[...],"index":[...],"data":[[...],...]}`.
+        """
+        pivot_df = self.transform(
+            data_frame, slicer, dimensions, references, pivot_cache=pivot_cache
+        )
+        yield pivot_df.to_json(orient="split", date_format="iso").encode("utf-8")
+
+    def _select_metrics(self, data_frame, dimensions, references):
+        """
+        Selects the columns of the metrics and references of the widget from the result set and labels its index and
+        columns.
 
+        :param data_frame:
+            The result set data frame
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :return:
+            A tuple of the selected data frame and the list of items, one for each metric and reference.
+        """
         items = [
             item if reference is None else ReferenceItem(item, reference)
             for item in self.items
             for reference in [None] + references
         ]
 
+        result = data_frame[[alias_selector(item.alias) for item in items]]
+
+        # Dimensions pivoted in the database query are levels of the columns instead of the index
+        index_dimensions = [
+            dimension
+            for dimension in dimensions
+            if alias_selector(dimension.alias) not in data_frame.columns.names
+        ]
+
         if isinstance(data_frame.index, pd.MultiIndex):
-            index_levels = [alias_selector(dimension.alias) for dimension in dimensions]
-            result = result.reorder_levels(index_levels)
+            index_levels = [alias_selector(dimension.alias) for dimension in index_dimensions]
+            result.index = result.index.reorder_levels(index_levels)
 
-        result = result[[alias_selector(item.alias) for item in items]]
+        if index_dimensions:
+            result.index = result.index.set_names(
+                [dimension.label or dimension.alias for dimension in index_dimensions]
+            )
 
-        if dimensions:
-            result.index.names = [
-                dimension.label or dimension.alias for dimension in dimensions
-            ]
+        if isinstance(result.columns, pd.MultiIndex):
+            item_labels = {alias_selector(item.alias): item.label for item in items}
+            dimension_labels = {
+                alias_selector(dimension.alias): dimension.label or dimension.alias
+                for dimension in dimensions
+            }
+            result.columns = pd.MultiIndex.from_tuples(
+                [(item_labels[column[0]],) + column[1:] for column in result.columns],
+                names=["Metrics"] + [dimension_labels[name] for name in result.columns.names[1:]],
+            )
+        else:
+            result.columns = pd.Index([item.label for item in items], name="Metrics")
 
-        result.columns = pd.Index([item.label for item in items], name="Metrics")
+        return result, items
 
-        pivot_dimensions = [
-            dimension.label or dimension.alias for dimension in self.pivot
-        ]
-        pivot_df = self.pivot_data_frame(result, pivot_dimensions, self.transpose)
+    def pivot_result_set(self, data_frame, pivot=(), pivot_cache=None):
+        """
+        Pivots and transposes a data frame selected from the result set like `pivot_data_frame`. When a pivot cache is
+        given, the pivoted data frame is computed once and shared by all widgets that select the same columns from the
+        result set and pivot, transpose and sort them the same way, so it must not be modified.
 
-        return self.add_formatting(dimensions, items, pivot_df, use_raw_values).fillna(
-            value=formats.BLANK_VALUE
+        :param data_frame:
+            The data frame to pivot.
+        :param pivot:
+            A list of index aliases for `data_frame` of levels to shift
+        :param pivot_cache:
+            A dict of the pivoted data frames, created by `fetch` for the widgets that transform the same result set.
+        :return:
+            The shifted/transposed data frame
+        """
+        if pivot_cache is None:
+            return self.pivot_data_frame(data_frame, pivot, self.transpose)
+
+        key = (
+            tuple(data_frame.columns),
+            data_frame.columns.name,
+            tuple(data_frame.index.names),
+            tuple(pivot),
+            self.transpose,
+            repr(self.sort),
+            repr(self.ascending),
+            self.column_limit,
         )
 
+        if key not in pivot_cache:
+            pivot_cache[key] = self.pivot_data_frame(data_frame, pivot, self.transpose)
+        return pivot_cache[key]
+
     def pivot_data_frame(self, data_frame, pivot=(), transpose=False):
         """
         Pivot and transpose the data frame. Dimensions including in the `pivot` arg will be unshifted to columns. If
@@ -96,28 +186,36 @@ class Pandas(TransformableWidget):
         :return:
             The shifted/transposed data frame
         """
+        # Dimensions pivoted in the database query are already levels of the columns
+        pivoted_in_query = [name for name in pivot if name in data_frame.columns.names]
+        n_dimensions = len(data_frame.index.names) + len(pivoted_in_query)
+
         not_transforming_df = not (pivot or transpose)
-        pivot_and_transpose_cancel_out = transpose and len(pivot) == len(
-            data_frame.index.names
-        )
+        pivot_and_transpose_cancel_out = transpose and len(pivot) == n_dimensions
         if not_transforming_df or pivot_and_transpose_cancel_out:
             return self.sort_data_frame(data_frame)
 
         # NOTE: Don't pivot a single dimension data frame. This turns the data frame into a series and pivots the
         # metrics anyway. Instead, transpose the data frame.
-        should_transpose_instead_of_pivot = len(pivot) == len(data_frame.index.names)
+        should_transpose_instead_of_pivot = len(pivot) == n_dimensions
+
+        if should_transpose_instead_of_pivot and not transpose:
+            # Each row becomes a column
+            data_frame = self._head_max_columns(data_frame)
 
+        pivot = [name for name in pivot if name not in pivoted_in_query]
         if pivot and not should_transpose_instead_of_pivot:
-            data_frame = data_frame.unstack(level=pivot)
+            data_frame = self._unstack_max_columns(data_frame, pivot)
 
         if transpose or should_transpose_instead_of_pivot:
             data_frame = data_frame.transpose()
 
-        # If there are more than one column levels and the last level is a single metric, drop the level
-        if isinstance(data_frame.columns, pd.MultiIndex) and 1 == len(
-            data_frame.columns.levels[0]
+        # If there are more than one column levels and the last level is a single metric, drop the level. The values
+        # are counted instead of the levels, since selecting columns keeps the unused values in the levels.
+        if isinstance(data_frame.columns, pd.MultiIndex) and 1 == (
+            data_frame.columns.get_level_values(0).nunique()
         ):
-            data_frame.name = data_frame.columns.levels[0][
+            data_frame.name = data_frame.columns.get_level_values(0)[
                 0
             ]  # capture the name of the metrics column
             data_frame.columns = data_frame.columns.droplevel(
@@ -126,6 +224,70 @@ class Pandas(TransformableWidget):
 
         return self.sort_data_frame(data_frame)
 
+    def _head_max_columns(self, data_frame):
+        """
+        Keeps the rows of a data frame that become columns when it is transposed, as many as fit in `max_columns` if
+        it is given. When rows are dropped, a row without values is added with the index `TRUNCATED_COLUMNS_VALUE`.
+        """
+        if self.column_limit is None or len(data_frame) <= self.column_limit:
+            return data_frame
+
+        head_df = data_frame.iloc[: self.column_limit]
+        return head_df.reindex(head_df.index.append(pd.Index([TRUNCATED_COLUMNS_VALUE])))
+
+    def _unstack_max_columns(self, data_frame, pivot):
+        """
+        Unstacks the pivoted index levels of the data frame into columns, keeping only as many of the pivoted values as
+        fit in `max_columns` for every metric if it is given. The other values are dropped before unstacking, so that
+        their columns are never created, and a column without values is added after the columns of each metric, with
+        `TRUNCATED_COLUMNS_VALUE` as its pivoted values. The rows are the same as when all of the values are unstacked.
+        """
+        if self.column_limit is None:
+            return data_frame.unstack(level=pivot)
+
+        max_pivot_values = max(self.column_limit // max(len(data_frame.columns), 1), 1)
+
+        pivot_index = data_frame.index.droplevel(
+            [name for name in data_frame.index.names if name not in pivot]
+        )
+        pivot_values = pivot_index.unique()
+        if len(pivot_values) <= max_pivot_values:
+            return data_frame.unstack(level=pivot)
+
+        metrics = list(data_frame.columns)
+        kept_values = list(pivot_values.sort_values()[:max_pivot_values])
+        row_index = data_frame.index.droplevel(pivot).unique().sort_values()
+
+        data_frame = data_frame[pivot_index.isin(kept_values)].unstack(level=pivot)
+
+        # Unused index levels are removed when unstacking, which orders the pivoted values by their first row, so the
+        # columns are put back in order of the metrics and the pivoted values.
+        def column_position(column):
+            # The pivoted values are in the order of the index levels, which can differ from the order of `pivot`
+            values = dict(zip(data_frame.columns.names[1:], column[1:]))
+            pivot_value = tuple(values[name] for name in pivot_index.names)
+            return metrics.index(column[0]), kept_values.index(
+                pivot_value if len(pivot_value) > 1 else pivot_value[0]
+            )
+
+        sorted_columns = sorted(data_frame.columns, key=column_position)
+
+        # The columns of the dropped values are marked by a column without values after the columns of each metric
+        columns = []
+        for metric in metrics:
+            columns += [column for column in sorted_columns if column[0] == metric]
+            columns.append((metric,) + (TRUNCATED_COLUMNS_VALUE,) * len(pivot))
+
+        data_frame = data_frame.reindex(
+            columns=pd.MultiIndex.from_tuples(columns, names=data_frame.columns.names)
+        )
+
+        # Rows with values only for dropped columns are kept without values
+        if len(data_frame) < len(row_index):
+            data_frame = data_frame.reindex(row_index)
+
+        return data_frame
+
     def sort_data_frame(self, data_frame):
         if not self.sort or len(data_frame) == 1:
             # If there are no sort arguments or the data frame is a single row, then no need to sort
@@ -165,10 +327,18 @@ class Pandas(TransformableWidget):
         format_df = pivot_df.copy()
 
         def _get_f_display(item):
-            return partial(
-                formats.display_value, field=item, nan_value="", null_value="", use_raw_value=use_raw_values
+            # Values are formatted a column at a time
+            f_display = partial(
+                formats.format_series, field=item, nan_value="", null_value="", use_raw_value=use_raw_values
             )
 
+            def f_display_columns(values):
+                if isinstance(values, pd.DataFrame):
+                    return values.apply(f_display) if len(values.columns) else values
+                return f_display(values)
+
+            return f_display_columns
+
         if (
             self.transpose
             or not self.transpose
@@ -176,24 +346,20 @@ class Pandas(TransformableWidget):
         ):
             for item in items:
                 f_display = _get_f_display(item)
-                format_df.loc[items[0].label] = format_df.loc[items[0].label].apply(
-                    f_display
-                )
+                format_df.loc[items[0].label] = f_display(
+                    format_df.loc[items[0].label]
+                ).values
 
             return format_df
 
         if self.pivot and len(items) == 1:
             f_display = _get_f_display(items[0])
-            format_df = format_df.applymap(f_display)
+            format_df = f_display(format_df)
             return format_df
 
         for item in items:
             key = item.label
             f_display = _get_f_display(item)
-            format_df[key] = (
-                format_df[key].apply(f_display)
-                if isinstance(format_df[key], pd.Series)
-                else format_df[key].applymap(f_display)
-            )
+            format_df[key] = f_display(format_df[key])
 
         return format_df
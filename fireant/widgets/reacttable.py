@@ -2,6 +2,7 @@ import re
 from collections import OrderedDict
 from functools import partial
 
+import numpy as np
 import pandas as pd
 
 from fireant.dataset.fields import (
@@ -18,8 +19,11 @@ from fireant.formats import (
     RAW_VALUE,
     TOTALS_VALUE,
     display_value,
+    display_values,
+    encode_json,
     json_value,
     raw_value,
+    raw_values,
     return_none,
     safe_value,
 )
@@ -27,16 +31,23 @@ from fireant.reference_helpers import reference_alias
 from fireant.utils import (
     alias_for_alias_selector,
     alias_selector,
-    setdeepattr,
     wrap_list,
 )
 from .base import ReferenceItem
-from .pandas import Pandas
+from .pandas import (
+    Pandas,
+    TRUNCATED_COLUMNS_VALUE,
+)
 
 TOTALS_LABEL = "Totals"
 METRICS_DIMENSION_ALIAS = "metrics"
 F_METRICS_DIMENSION_ALIAS = alias_selector(METRICS_DIMENSION_ALIAS)
 _display_value = partial(display_value, nan_value="", null_value="")
+_display_values = partial(display_values, nan_value="", null_value="")
+
+
+def _is_truncated_columns_value(value):
+    return isinstance(value, str) and value == TRUNCATED_COLUMNS_VALUE
 
 
 def map_index_level(index, level, func):
@@ -97,7 +108,8 @@ class ReactTable(Pandas):
         transpose=False,
         sort=None,
         ascending=None,
-        max_columns=None
+        max_columns=None,
+        sparse=False
     ):
         super(ReactTable, self).__init__(
             metric,
@@ -108,6 +120,7 @@ class ReactTable(Pandas):
             ascending=ascending,
             max_columns=max_columns
         )
+        self.sparse = sparse
 
     def __repr__(self):
         return "{}({})".format(
@@ -180,9 +193,18 @@ class ReactTable(Pandas):
         :param dimensions:
         :return:
         """
-        data_frame = data_frame.copy()
-        data_frame.columns.name = F_METRICS_DIMENSION_ALIAS
-        return data_frame
+        # The data frame is shared with the other widgets, so the columns are renamed on a shallow copy of it. The
+        # columns index is replaced rather than renamed in place, since it is also shared.
+        prepared_df = data_frame.copy(deep=False)
+        if isinstance(data_frame.columns, pd.MultiIndex):
+            # The columns of a result set pivoted in the database query also have a level for the pivoted dimension
+            prepared_df.columns = data_frame.columns.rename(
+                [F_METRICS_DIMENSION_ALIAS] + data_frame.columns.names[1:]
+            )
+        else:
+            prepared_df.columns = data_frame.columns.rename(F_METRICS_DIMENSION_ALIAS)
+
+        return prepared_df
 
     @staticmethod
     def transform_index_column_headers(data_frame, field_map):
@@ -263,6 +285,9 @@ class ReactTable(Pandas):
                 item = field_map[column_value]
                 return getattr(item, "label", item.alias)
 
+            if _is_truncated_columns_value(column_value):
+                return column_value
+
             if f_dimension_alias in field_map:
                 field = field_map[f_dimension_alias]
                 return _display_value(column_value, field) or safe_value(column_value)
@@ -272,27 +297,45 @@ class ReactTable(Pandas):
 
             return safe_value(column_value)
 
-        def _make_columns(columns_frame, previous_level_values=()):
+        columns = data_frame.columns
+        names = columns.names
+
+        # The values of each index level of the columns, which are grouped to build the tree of column definitions
+        level_values = (
+            [columns.get_level_values(i) for i in range(columns.nlevels)]
+            if isinstance(columns, pd.MultiIndex)
+            else [columns]
+        )
+
+        def _make_columns(positions, depth, previous_level_values):
             """
             This function recursively creates the individual column definitions for React Table with the above tree
             structure depending on how many index levels there are in the columns.
 
-            :param columns_frame:
-                A data frame representing the columns of the result set data frame.
+            :param positions:
+                The positions of the columns of the data frame that are below the higher index level values.
+            :param depth:
+                The index level of the columns to create definitions for.
             :param previous_level_values:
                 A tuple containing the higher level index level values used for building the data accessor path
             """
-            f_dimension_alias = columns_frame.index.names[0]
-
-            # Group the columns if they are multi-index so we can get the proper sub-column values. This will yield
-            # one group per dimension value with the group data frame containing only the relevant sub-columns
-            groups = (
-                columns_frame.groupby(level=0)
-                if isinstance(columns_frame.index, pd.MultiIndex)
-                else [(level, None) for level in columns_frame.index]
-            )
-
-            columns = []
+            f_dimension_alias = names[depth]
+            is_leaf = depth == len(names) - 1
+
+            values = level_values[depth][positions]
+
+            if is_leaf:
+                groups = [(value, None) for value in values]
+            else:
+                # Group the columns by their value in this level, the same way as grouping by the index level, yielding
+                # one group per dimension value with the positions of the relevant sub-columns
+                codes, uniques = pd.factorize(values, sort=True)
+                groups = [
+                    (value, positions[codes == code])
+                    for code, value in enumerate(uniques)
+                ]
+
+            result = []
             for column_value, group in groups:
                 is_totals = column_value in TOTALS_MARKERS | {TOTALS_LABEL}
 
@@ -301,107 +344,111 @@ class ReactTable(Pandas):
                     "Header": get_header(column_value, f_dimension_alias, is_totals)
                 }
 
-                level_values = previous_level_values + (column_value,)
+                level_values_path = previous_level_values + (column_value,)
                 if group is not None:
-                    # If there is a group, then drop this index level from the group data frame and recurse to build
-                    # sub column definitions
-                    next_level_df = group.reset_index(level=0, drop=True)
-                    column["columns"] = _make_columns(next_level_df, level_values)
+                    # If there is a group, then recurse to build sub column definitions from the next index level
+                    column["columns"] = _make_columns(
+                        group, depth + 1, level_values_path
+                    )
 
                 else:
                     column["accessor"] = ".".join(
-                        safe_value(value) for value in level_values
+                        safe_value(value) for value in level_values_path
                     )
 
                 if is_totals:
                     column["className"] = "fireant-totals"
 
-                columns.append(column)
+                result.append(column)
 
-            return columns
+            return result
 
         # If the query only has a single metric, that level will be dropped, and set as data_frame.name
         dropped_metric_level_name = (
             (data_frame.name,) if hasattr(data_frame, "name") else ()
         )
 
-        return _make_columns(data_frame.columns.to_frame(), dropped_metric_level_name)
+        return _make_columns(
+            np.arange(len(columns)), 0, dropped_metric_level_name
+        )
 
     @staticmethod
-    def transform_row_index(index_values, field_map, dimension_hyperlink_templates):
-        # Add the index to the row
-        row = {}
-        for key, value in index_values.items():
-            if key is None:
-                continue
-
-            field_alias = key
-            field = field_map[field_alias]
-
-            data = {RAW_VALUE: raw_value(value, field)}
-            display = _display_value(value, field)
-            if display is not None:
-                data["display"] = display
+    def transform_index_values(values, field):
+        """
+        Converts the values of a dimension into ReactTable cells. Each distinct value is only formatted once.
 
-            # If the dimension has a hyperlink template, then apply the template by formatting it with the dimension
-            # values for this row. The values contained in `index_values` will always contain all of the required values
-            # at this point, otherwise the hyperlink template will not be included.
-            if key in dimension_hyperlink_templates:
-                data["hyperlink"] = dimension_hyperlink_templates[key].format(
-                    **index_values
-                )
+        :param values:
+            A list of values of a dimension, one for each row.
+        :param field:
+            The dimension field.
+        :return:
+            A list of dicts containing the raw and display value of each cell.
+        """
+        formatted = {}
+        cells = []
+        for value in values:
+            if value not in formatted:
+                if _is_truncated_columns_value(value):
+                    # The row that marks the dropped rows of a transposed table
+                    data = {RAW_VALUE: value, "display": value}
+                else:
+                    data = {RAW_VALUE: raw_value(value, field)}
+                    display = _display_value(value, field)
+                    if display is not None:
+                        data["display"] = display
+                formatted[value] = data
 
-            safe_key = safe_value(key)
-            row[safe_key] = data
+            cells.append(dict(formatted[value]))
 
-        return row
+        return cells
 
     @staticmethod
-    def transform_row_values(series, fields, is_transposed):
-        # Add the values to the row
-        index_names = series.index.names or []
-
-        row = {}
-        for key, value in series.iteritems():
-            key = wrap_list(key)
-
-            # Get the field for the metric
-            metric_alias = wrap_list(series.name)[0] if is_transposed else key[0]
-            field = fields[metric_alias]
-
-            data = {RAW_VALUE: raw_value(value, field)}
-            display = _display_value(value, field, date_as=return_none)
-            if display is not None:
-                data["display"] = display
-
-            accessor_fields = [
-                fields[field_alias]
-                for field_alias in index_names
-                if field_alias is not None
-            ]
-
-            accessor = [
-                safe_value(value) for value, field in zip(key, accessor_fields)
-            ] or key
-
-            setdeepattr(row, accessor, data)
-
-        return row
+    def transform_metric_values(values, field):
+        """
+        Converts the values of a metric into ReactTable cells. This gives the same result as calling `raw_value` and
+        `display_value` for each value, but the values are converted a column at a time with `raw_values` and
+        `display_values`.
+
+        :param values:
+            A numpy array of values of a metric.
+        :param field:
+            The metric field.
+        :return:
+            A list of dicts containing the raw and display value of each cell.
+        """
+        raws = raw_values(values, field)
+        displays = _display_values(values, field, date_as=return_none)
+
+        return [
+            {RAW_VALUE: raw}
+            if display is None
+            else {RAW_VALUE: raw, "display": display}
+            for raw, display in zip(raws, displays)
+        ]
 
     @staticmethod
     def transform_data(
-        data_frame, field_map, dimension_hyperlink_templates, is_transposed
+        data_frame,
+        field_map,
+        dimension_hyperlink_templates,
+        is_transposed,
+        sparse=False,
     ):
         """
         Builds a list of dicts containing the data for ReactTable. This aligns with the accessors set by
         #transform_dimension_column_headers and #transform_metric_column_headers
 
+        The cells are formatted one column at a time and the accessor of each column is built once, so that assembling
+        the rows only takes a dict insert for each cell.
+
         :param data_frame:
             The result set data frame
         :param field_map:
             A mapping to all the fields in the dataset used for this query.
         :param dimension_hyperlink_templates:
         :param is_transposed:
+        :param sparse:
+            When true, cells with null values are left out of the rows instead of being added with a null raw value.
         """
         index_names = data_frame.index.names
 
@@ -423,44 +470,105 @@ class ReactTable(Pandas):
                 axis=1,
             )
 
-        rows = []
-        for index, series in data_frame.iterrows():
-            index = wrap_list(index)
+        # Get a list of values from the index for each row. These can be metrics or dimensions so it checks in the
+        # item map if there is a display value for the value
+        index_rows = [wrap_list(index) for index in data_frame.index]
+        index_values = (
+            [[_get_field_label(value) for value in index] for index in index_rows]
+            if is_transposed
+            else index_rows
+        )
 
-            # Get a list of values from the index. These can be metrics or dimensions so it checks in the item map if
-            # there is a display value for the value
-            index_values = (
-                [_get_field_label(value) for value in index] if is_transposed else index
+        index_cells = [{} for _ in index_rows]
+        value_cells = [{} for _ in index_rows]
+
+        # Add the index to the rows
+        for level, key in enumerate(index_names):
+            if key is None:
+                continue
+
+            safe_key = safe_value(key)
+            cells = ReactTable.transform_index_values(
+                [index[level] for index in index_values], field_map[key]
             )
-            index_display_values = OrderedDict(zip(index_names, index_values))
 
-            rows.append(
-                {
-                    **ReactTable.transform_row_index(
-                        index_display_values, field_map, dimension_hyperlink_templates
-                    ),
-                    **ReactTable.transform_row_values(series, field_map, is_transposed),
-                }
+            # If the dimension has a hyperlink template, then apply the template by formatting it with the dimension
+            # values for each row. The index will always contain all of the required values at this point, otherwise
+            # the hyperlink template will not be included.
+            if key in dimension_hyperlink_templates:
+                hyperlink_template = dimension_hyperlink_templates[key]
+                for data, index in zip(cells, index_values):
+                    if _is_truncated_columns_value(index[level]):
+                        continue
+                    data["hyperlink"] = hyperlink_template.format(
+                        **OrderedDict(zip(index_names, index))
+                    )
+
+            for row, data in zip(index_cells, cells):
+                row[safe_key] = data
+
+        # Add the values to the rows. When transposed, the metric of each value is determined by its row.
+        if is_transposed:
+            field_rows = OrderedDict()
+            for i, index in enumerate(index_rows):
+                field_rows.setdefault(index[0], []).append(i)
+
+        accessor_fields = [
+            field_map[field_alias]
+            for field_alias in data_frame.columns.names
+            if field_alias is not None
+        ]
+        values = data_frame.values
+
+        for j, column in enumerate(data_frame.columns):
+            key = wrap_list(column)
+            accessor = [
+                safe_value(value) for value, field in zip(key, accessor_fields)
+            ] or key
+            *path, last_key = accessor
+
+            # The positions of the rows that have a cell in this column
+            rows = (
+                np.flatnonzero(pd.notnull(values[:, j]))
+                if sparse
+                else np.arange(len(index_rows))
             )
 
-        return rows
+            if is_transposed:
+                cells = [None] * len(index_rows)
+                for metric_alias, positions in field_rows.items():
+                    if sparse:
+                        positions = np.intersect1d(positions, rows)
+                    metric_cells = ReactTable.transform_metric_values(
+                        values[positions, j], field_map[metric_alias]
+                    )
+                    for i, data in zip(positions, metric_cells):
+                        cells[i] = data
+                cells = [cells[i] for i in rows]
+            else:
+                cells = ReactTable.transform_metric_values(
+                    values[rows, j], field_map[key[0]]
+                )
+
+            for i, data in zip(rows, cells):
+                row = value_cells[i]
+                for path_key in path:
+                    row = row.setdefault(path_key, {})
+                row[last_key] = data
+
+        return [
+            {**index_row, **value_row}
+            for index_row, value_row in zip(index_cells, value_cells)
+        ]
 
-    def transform(self, data_frame, dataset, dimensions, references):
+    def _prepare(self, data_frame, dimensions, references, pivot_cache=None):
         """
-        Transforms a data frame into a format for ReactTable. This is an object containing attributes `columns` and
-        `data` which align with the props in ReactTable with the same name.
+        Pivots the data frame and builds the column definitions and the arguments for `transform_data`. The pivoted
+        data frame is shared with other widgets through the pivot cache. See `pivot_result_set`.
 
-        :param data_frame:
-            The result set data frame
-        :param dataset:
-            The dataset that generated the data query
-        :param dimensions:
-            A list of dimensions that were selected in the data query
-        :param references:
-            A list of references that were selected in the data query
         :return:
-            An dict containing attributes `columns` and `data` which align with the props in ReactTable with the same
-            names.
+            A tuple of the pivoted data frame, the column definitions and a dict of the keyword arguments for
+            `transform_data`.
         """
         metric_map = OrderedDict(
             [
@@ -497,18 +605,82 @@ class ReactTable(Pandas):
         ]
 
         df = self.format_data_frame(data_frame[metric_aliases])
-        df = self.pivot_data_frame(df, dimension_aliases, self.transpose)
+        df = self.pivot_result_set(df, dimension_aliases, pivot_cache)
 
         dimension_columns = self.transform_index_column_headers(df, field_map)
         metric_columns = self.transform_data_column_headers(df, field_map)
-        data = self.transform_data(
-            df,
-            field_map,
+        data_kwargs = dict(
+            field_map=field_map,
             is_transposed=self.transpose ^ all_dimensions_pivoted,
             dimension_hyperlink_templates=self.map_hyperlink_templates(df, dimensions),
+            sparse=self.sparse,
+        )
+
+        return df, dimension_columns + metric_columns, data_kwargs
+
+    def transform(self, data_frame, dataset, dimensions, references, pivot_cache=None):
+        """
+        Transforms a data frame into a format for ReactTable. This is an object containing attributes `columns` and
+        `data` which align with the props in ReactTable with the same name.
+
+        :param data_frame:
+            The result set data frame
+        :param dataset:
+            The dataset that generated the data query
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :param pivot_cache:
+            A dict of the pivoted data frames shared with other widgets. See `pivot_result_set`.
+        :return:
+            An dict containing attributes `columns` and `data` which align with the props in ReactTable with the same
+            names.
+        """
+        df, columns, data_kwargs = self._prepare(
+            data_frame, dimensions, references, pivot_cache
         )
 
         return {
-            "columns": dimension_columns + metric_columns,
-            "data": data,
+            "columns": columns,
+            "data": self.transform_data(df, **data_kwargs),
         }
+
+    def transform_stream(
+        self, data_frame, dataset, dimensions, references, batch_size=1000, pivot_cache=None
+    ):
+        """
+        Transforms a data frame into a format for ReactTable like `transform`, but yields the output encoded as JSON in
+        chunks of bytes. The columns are encoded first, followed by the rows in batches, so that only one batch of rows
+        is held in memory at a time.
+
+        :param data_frame:
+            The result set data frame
+        :param dataset:
+            The dataset that generated the data query
+        :param dimensions:
+            A list of dimensions that were selected in the data query
+        :param references:
+            A list of references that were selected in the data query
+        :param batch_size:
+            The number of rows to encode in each chunk.
+        :param pivot_cache:
+            A dict of the pivoted data frames shared with other widgets. See `pivot_result_set`.
+        :return:
+            A generator of bytes, which joined together are the JSON encoding of the output of `transform`.
+        """
+        df, columns, data_kwargs = self._prepare(
+            data_frame, dimensions, references, pivot_cache
+        )
+
+        yield b'{"columns":' + encode_json(columns) + b',"data":['
+        for start in range(0, len(df), batch_size):
+            batch_df = df.iloc[start : start + batch_size]
+            if hasattr(df, "name"):
+                # Keep the name of the dropped metrics level, which is not copied when slicing the data frame
+                batch_df.name = df.name
+
+            rows = self.transform_data(batch_df, **data_kwargs)
+            # Strip the brackets of the encoded list of rows, since the rows are part of the data list
+            yield (b"," if start else b"") + encode_json(rows)[1:-1]
+        yield b"]}"
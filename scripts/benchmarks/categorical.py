@@ -0,0 +1,94 @@
+"""
+Benchmarks reducing a result set with text dimensions with and without `categorical_dimensions`, on a result set with
+60 days, 20 states and 50 candidates with a reference and totals for the candidates. Prints the time and the peak
+memory allocated while reducing the result sets.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/categorical.py
+"""
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fireant import Rollup
+from fireant.dataset.references import DayOverDay
+from fireant.queries.execution import reduce_result_set
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_DAYS = 60
+N_STATES = 20
+N_CANDIDATES = 50
+REPEAT = 3
+
+
+def make_result(dimension_values, metric):
+    index = pd.MultiIndex.from_product(
+        dimension_values, names=["$timestamp", "$state", "$candidate-name"]
+    )
+    data_frame = index.to_frame(index=False)
+    data_frame[metric] = np.random.randint(0, 1000, len(data_frame)).astype(float)
+    return data_frame
+
+
+def make_results():
+    timestamps = pd.date_range("2019-01-01", periods=N_DAYS)
+    states = np.array(["state {}".format(i) for i in range(N_STATES)], dtype=object)
+    candidates = np.array(
+        ["candidate {}".format(i) for i in range(N_CANDIDATES)], dtype=object
+    )
+    dimension_values = [timestamps, states, candidates]
+    totals_values = [timestamps, states, np.array([None], dtype=object)]
+
+    return [
+        make_result(dimension_values, "$votes"),
+        make_result(dimension_values, "$votes_dod"),
+        make_result(totals_values, "$votes"),
+        make_result(totals_values, "$votes_dod"),
+    ]
+
+
+def measure_peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    results = make_results()
+    timestamp = mock_dataset.fields.timestamp
+    dimensions = [
+        timestamp,
+        mock_dataset.fields.state,
+        Rollup(mock_dataset.fields["candidate-name"]),
+    ]
+    reference_groups = [[DayOverDay(timestamp, delta=True)]]
+
+    print("{} rows".format(len(results[0])))
+    for categorical_dimensions in (False, True):
+
+        def benchmark():
+            return reduce_result_set(
+                results,
+                reference_groups,
+                dimensions,
+                (),
+                categorical_dimensions=categorical_dimensions,
+            )
+
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        peak = measure_peak_memory(benchmark)
+        print(
+            "{:<45}{:>8.3f}s{:>10.1f}MB".format(
+                "categorical_dimensions={}".format(categorical_dimensions),
+                seconds,
+                peak / 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmarks fetching a result set and applying an operation with and without `downcast_metrics`, on a result set with
+365 days and 1000 candidates with a reference. Prints the time, the peak memory allocated and the memory used by the
+metrics of the result data frame.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/downcast.py
+"""
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from pypika import Query
+
+from fireant import CumSum
+from fireant.database import Database
+from fireant.dataset.operations import apply_operations
+from fireant.dataset.references import DayOverDay
+from fireant.queries.execution import fetch_data
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_DAYS = 365
+N_CANDIDATES = 1000
+REPEAT = 3
+
+
+class BenchmarkDatabase(Database):
+    def __init__(self, results, **kwargs):
+        super(BenchmarkDatabase, self).__init__(**kwargs)
+        self.results = results
+
+    def fetch_dataframes(self, *queries, **kwargs):
+        return list(self.results)
+
+
+def make_result(timestamps, candidates, suffix=""):
+    n_rows = len(timestamps) * len(candidates)
+    return pd.DataFrame(
+        {
+            "$timestamp": timestamps.repeat(len(candidates)),
+            "$candidate-name": np.tile(candidates, len(timestamps)),
+            "$votes" + suffix: np.random.randint(0, 100000, n_rows),
+            "$wins" + suffix: np.random.randint(0, 2, n_rows),
+            "$turnout" + suffix: np.round(np.random.uniform(0, 100, n_rows), 2),
+        }
+    )
+
+
+def main():
+    timestamps = pd.date_range("2019-01-01", periods=N_DAYS)
+    candidates = np.array(
+        ["candidate {}".format(i) for i in range(N_CANDIDATES)], dtype=object
+    )
+    results = [
+        make_result(timestamps, candidates),
+        make_result(timestamps, candidates, suffix="_dod"),
+    ]
+
+    timestamp = mock_dataset.fields.timestamp
+    dimensions = [timestamp, mock_dataset.fields["candidate-name"]]
+    metrics = [
+        mock_dataset.fields.votes,
+        mock_dataset.fields.wins,
+        mock_dataset.fields.turnout,
+    ]
+    references = [DayOverDay(timestamp)]
+    operations = [CumSum(mock_dataset.fields.turnout)]
+    queries = [Query.from_("politician").select("*")] * len(results)
+
+    print("{} rows".format(len(results[0])))
+    for downcast_metrics in (False, True):
+        database = BenchmarkDatabase(results, downcast_metrics=downcast_metrics)
+
+        def benchmark():
+            data_frame = fetch_data(
+                database,
+                queries,
+                dimensions,
+                reference_groups=[references],
+                metrics=metrics,
+            )
+            return apply_operations(data_frame, operations, references)
+
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+
+        tracemalloc.start()
+        data_frame = benchmark()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        metric_keys = [
+            key for key in data_frame.columns if not key.startswith("$cumsum")
+        ]
+        print(
+            "{:<45}{:>8.3f}s{:>10.1f}MB peak{:>10.1f}MB metrics".format(
+                "downcast_metrics={}".format(downcast_metrics),
+                seconds,
+                peak / 1e6,
+                data_frame[metric_keys].memory_usage(index=False).sum() / 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
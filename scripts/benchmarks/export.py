@@ -0,0 +1,61 @@
+"""
+Benchmarks the export of a data frame with 1000000 rows and 5 metrics into CSV and columnar files.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/export.py
+"""
+import timeit
+
+from fireant import (
+    Arrow,
+    CSV,
+    DataType,
+    Field,
+)
+from fireant.tests.dataset.mocks import mock_dataset
+
+from reacttable import (
+    make_data_frame,
+    make_metrics,
+)
+
+N_DAYS = 5000
+N_CANDIDATES = 200
+N_METRICS = 5
+REPEAT = 1
+
+
+def main():
+    metrics = make_metrics(N_METRICS)
+    data_frame = make_data_frame(metrics, N_DAYS, N_CANDIDATES)
+    dimensions = [
+        mock_dataset.fields.timestamp,
+        Field("candidate", None, label="Candidate", data_type=DataType.text),
+    ]
+
+    benchmarks = [
+        ("CSV", CSV(*metrics)),
+        ("Arrow(parquet)", Arrow(*metrics)),
+        ("Arrow(arrow)", Arrow(*metrics, file_format="arrow")),
+    ]
+
+    print(
+        "{} rows x {} metrics ({} cells)".format(
+            len(data_frame), len(metrics), data_frame.size
+        )
+    )
+    for name, widget in benchmarks:
+        def benchmark():
+            return sum(
+                len(chunk)
+                for chunk in widget.transform_stream(
+                    data_frame, mock_dataset, dimensions, []
+                )
+            )
+
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s{:>12.1f}MB".format(name, seconds, benchmark() / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmarks the transformation of a data frame with 200 series of 365 days and 3 metrics into HighCharts.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/highcharts.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fireant import (
+    DataType,
+    Field,
+    HighCharts,
+)
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_DAYS = 365
+N_CANDIDATES = 200
+N_METRICS = 3
+REPEAT = 3
+
+
+def make_metrics(n_metrics=N_METRICS):
+    return [
+        Field(
+            "metric{}".format(i),
+            None,
+            label="Metric {}".format(i),
+            data_type=DataType.number,
+        )
+        for i in range(n_metrics)
+    ]
+
+
+def make_data_frame(metrics, n_days=N_DAYS, n_candidates=N_CANDIDATES):
+    index = pd.MultiIndex.from_product(
+        [
+            pd.date_range("2016-01-01", periods=n_days),
+            ["Candidate {}".format(i) for i in range(n_candidates)],
+        ],
+        names=["$timestamp", "$candidate-name"],
+    )
+    values = np.random.rand(len(index), len(metrics)) * 10000
+    values[np.random.rand(*values.shape) < 0.01] = np.nan
+    return pd.DataFrame(
+        values, index=index, columns=["$" + metric.alias for metric in metrics]
+    )
+
+
+def main():
+    metrics = make_metrics()
+    data_frame = make_data_frame(metrics)
+    dimensions = [
+        mock_dataset.fields.timestamp,
+        mock_dataset.fields["candidate-name"],
+    ]
+    line_chart = HighCharts().axis(
+        *[HighCharts.LineSeries(metric) for metric in metrics]
+    )
+    category_chart = HighCharts().axis(
+        *[HighCharts.ColumnSeries(metric) for metric in metrics]
+    )
+    downsampled_line_chart = HighCharts(max_points=100).axis(
+        *[HighCharts.LineSeries(metric) for metric in metrics]
+    )
+    category_dimensions = dimensions[::-1]
+    category_data_frame = data_frame.swaplevel().sort_index()
+
+    benchmarks = [
+        (
+            "HighCharts.transform(line)",
+            lambda: line_chart.transform(data_frame, mock_dataset, dimensions, []),
+        ),
+        (
+            "HighCharts.transform(line, max_points=100)",
+            lambda: downsampled_line_chart.transform(
+                data_frame, mock_dataset, dimensions, []
+            ),
+        ),
+        (
+            "HighCharts.transform(column)",
+            lambda: category_chart.transform(
+                category_data_frame, mock_dataset, category_dimensions, []
+            ),
+        ),
+    ]
+
+    print(
+        "{} rows x {} metrics ({} cells)".format(
+            len(data_frame), len(metrics), data_frame.size
+        )
+    )
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == "__main__":
+    main()
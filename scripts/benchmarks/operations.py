@@ -0,0 +1,59 @@
+"""
+Benchmarks the cumulative and rolling operations on a data frame with 5000 series of 365 days each.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/operations.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fireant import (
+    CumMean,
+    CumProd,
+    CumSum,
+    RollingMean,
+)
+from fireant.queries.special_cases import adjust_dataframe_for_rolling_window
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_SERIES = 5000
+N_DAYS = 365
+REPEAT = 3
+
+
+def make_data_frame(n_series=N_SERIES, n_days=N_DAYS):
+    index = pd.MultiIndex.from_product(
+        [pd.date_range("2019-01-01", periods=n_days), np.arange(n_series)],
+        names=["$timestamp", "$candidate-id"],
+    )
+    return pd.DataFrame(
+        {"$votes": np.random.randint(0, 1000, len(index)).astype(float)}, index=index
+    )
+
+
+def main():
+    data_frame = make_data_frame()
+    votes = mock_dataset.fields.votes
+    benchmarks = [
+        ("CumSum", lambda: CumSum(votes).apply(data_frame, None)),
+        ("CumProd", lambda: CumProd(votes).apply(data_frame, None)),
+        ("CumMean", lambda: CumMean(votes).apply(data_frame, None)),
+        ("RollingMean(7)", lambda: RollingMean(votes, 7).apply(data_frame, None)),
+        (
+            "adjust_dataframe_for_rolling_window(7)",
+            lambda: adjust_dataframe_for_rolling_window(
+                [RollingMean(votes, 7)], data_frame
+            ),
+        ),
+    ]
+
+    print("{} series x {} days ({} rows)".format(N_SERIES, N_DAYS, len(data_frame)))
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmarks the group pagination of a data frame with 500 series of 2000 days each and the simple pagination of the top
+rows of the same data frame.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/pagination.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fireant.queries.pagination import (
+    _group_paginate,
+    _simple_paginate,
+)
+from fireant.tests.dataset.mocks import mock_dataset
+from pypika import Order
+
+N_SERIES = 500
+N_DAYS = 2000
+REPEAT = 3
+
+
+def make_data_frame(n_series=N_SERIES, n_days=N_DAYS):
+    index = pd.MultiIndex.from_product(
+        [pd.date_range("2014-01-01", periods=n_days), np.arange(n_series)],
+        names=["$timestamp", "$candidate-id"],
+    )
+    return pd.DataFrame(
+        {"$votes": np.random.randint(0, 1000, len(index)).astype(float)}, index=index
+    )
+
+
+def main():
+    data_frame = make_data_frame()
+    orders = [(mock_dataset.fields.votes, Order.desc)]
+    benchmarks = [
+        ("_group_paginate(limit=10)", lambda: _group_paginate(data_frame, 0, 10)),
+        (
+            "_group_paginate(limit=10, offset=10, orders)",
+            lambda: _group_paginate(data_frame, 10, 20, orders),
+        ),
+        (
+            "_simple_paginate(limit=50, orders)",
+            lambda: _simple_paginate(data_frame, 0, 50, orders),
+        ),
+        (
+            "sort_values(orders)[0:50] (full sort)",
+            lambda: data_frame.sort_values(
+                by="$votes", ascending=False, kind="mergesort"
+            )[0:50],
+        ),
+    ]
+
+    print("{} series x {} days ({} rows)".format(N_SERIES, N_DAYS, len(data_frame)))
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == "__main__":
+    main()
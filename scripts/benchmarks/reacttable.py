@@ -0,0 +1,113 @@
+"""
+Benchmarks the transformation of a data frame with 20000 rows and 30 metrics into table widgets.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/reacttable.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fireant import (
+    DataType,
+    Field,
+    Pandas,
+    ReactTable,
+)
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_DAYS = 1000
+N_CANDIDATES = 20
+N_METRICS = 30
+REPEAT = 3
+
+
+def make_metrics(n_metrics=N_METRICS):
+    formats = [
+        dict(),
+        dict(thousands=","),
+        dict(precision=2, suffix="%"),
+        dict(prefix="$", thousands=",", precision=0),
+    ]
+    return [
+        Field(
+            "metric{}".format(i),
+            None,
+            label="Metric {}".format(i),
+            data_type=DataType.number,
+            **formats[i % len(formats)]
+        )
+        for i in range(n_metrics)
+    ]
+
+
+def make_data_frame(metrics, n_days=N_DAYS, n_candidates=N_CANDIDATES):
+    index = pd.MultiIndex.from_product(
+        [
+            pd.date_range("2016-01-01", periods=n_days),
+            ["Candidate {}".format(i) for i in range(n_candidates)],
+        ],
+        names=["$timestamp", "$candidate"],
+    )
+    values = np.random.rand(len(index), len(metrics)) * 10000
+    values[np.random.rand(*values.shape) < 0.01] = np.nan
+    return pd.DataFrame(
+        values, index=index, columns=["$" + metric.alias for metric in metrics]
+    )
+
+
+def main():
+    metrics = make_metrics()
+    data_frame = make_data_frame(metrics)
+    # Only a tenth of the candidates have values on each day
+    sparse_data_frame = data_frame.sample(frac=0.1, random_state=0).sort_index()
+    dimensions = [
+        mock_dataset.fields.timestamp,
+        Field("candidate", None, label="Candidate", data_type=DataType.text),
+    ]
+    widget = ReactTable(*metrics)
+    pivoted_widget = ReactTable(*metrics[:3], pivot=[dimensions[1]])
+    sparse_pivoted_widget = ReactTable(*metrics[:3], pivot=[dimensions[1]], sparse=True)
+    pandas_widget = Pandas(*metrics)
+
+    # Each run transforms a new result set, so that pivoted data frames are not shared between runs
+    benchmarks = [
+        (
+            "ReactTable.transform",
+            lambda: widget.transform(
+                data_frame.copy(deep=False), mock_dataset, dimensions, []
+            ),
+        ),
+        (
+            "ReactTable.transform(pivot)",
+            lambda: pivoted_widget.transform(
+                data_frame.copy(deep=False), mock_dataset, dimensions, []
+            ),
+        ),
+        (
+            "ReactTable.transform(pivot, sparse)",
+            lambda: sparse_pivoted_widget.transform(
+                sparse_data_frame.copy(deep=False), mock_dataset, dimensions, []
+            ),
+        ),
+        (
+            "Pandas.transform",
+            lambda: pandas_widget.transform(
+                data_frame.copy(deep=False), mock_dataset, dimensions, []
+            ),
+        ),
+    ]
+
+    print(
+        "{} rows x {} metrics ({} cells)".format(
+            len(data_frame), len(metrics), data_frame.size
+        )
+    )
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == "__main__":
+    main()
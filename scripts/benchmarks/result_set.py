@@ -0,0 +1,76 @@
+"""
+Benchmarks reducing a result set with totals and scrubbing the totals of share operations, on a data frame with 1000
+days and 1000 candidates with totals for the candidates.
+
+Usage:
+    PYTHONPATH=. python scripts/benchmarks/result_set.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fireant.dataset.totals import scrub_totals_from_share_results
+from fireant.queries.execution import reduce_result_set
+from fireant.queries.result_set import ResultSet
+from fireant.tests.dataset.mocks import mock_dataset
+
+N_DAYS = 1000
+N_CANDIDATES = 1000
+REPEAT = 3
+
+
+def make_results(n_days=N_DAYS, n_candidates=N_CANDIDATES):
+    timestamps = pd.date_range("2019-01-01", periods=n_days)
+    base = pd.DataFrame(
+        {
+            "$timestamp": timestamps.repeat(n_candidates),
+            "$candidate-name": np.tile(
+                ["candidate {}".format(i) for i in range(n_candidates)], n_days
+            ),
+            "$votes": np.random.randint(0, 1000, n_days * n_candidates).astype(float),
+            "$wins": np.random.randint(0, 2, n_days * n_candidates).astype(float),
+        }
+    )
+    totals = pd.DataFrame(
+        {
+            "$timestamp": timestamps,
+            "$candidate-name": None,
+            "$votes": np.random.randint(0, 1000, n_days).astype(float),
+            "$wins": np.random.randint(0, 2, n_days).astype(float),
+        }
+    )
+    return [base, totals]
+
+
+def main():
+    results = make_results()
+    dimensions = [mock_dataset.fields.timestamp, mock_dataset.fields["candidate-name"]]
+    data_frame = reduce_result_set(results, (), dimensions, dimensions[1:])
+    result_set = ResultSet.from_data_frame(data_frame)
+
+    benchmarks = [
+        (
+            "reduce_result_set",
+            lambda: reduce_result_set(results, (), dimensions, dimensions[1:]),
+        ),
+        (
+            "scrub_totals_from_share_results",
+            lambda: scrub_totals_from_share_results(data_frame, dimensions),
+        ),
+        ("ResultSet.from_data_frame", lambda: ResultSet.from_data_frame(data_frame)),
+        ("ResultSet.to_data_frame", lambda: result_set.to_data_frame()),
+    ]
+
+    print(
+        "{} days x {} candidates ({} rows)".format(
+            N_DAYS, N_CANDIDATES, len(data_frame)
+        )
+    )
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        print("{:<45}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == "__main__":
+    main()